@@ -2,11 +2,22 @@
 京东Cookie自动获取项目 - 青龙API基类模块
 
 本模块提供青龙API的基类，用于消除QlApi和QlOpenApi之间的重复代码。
+所有请求共用一个带连接池的session，设置了超时，幂等请求在连接异常和5xx时按指数退避重试，
+token过期(401)时使用登录时的凭据自动重新登录后重放请求。
 """
 
+import asyncio
+import time
 from urllib.parse import urljoin
 import aiohttp
-from typing import Union
+from loguru import logger
+from typing import Any, Dict, Optional, Union
+from core.metrics import qinglong_request_duration, qinglong_requests
+from utils import json_codec
+
+
+# 重复执行不会产生副作用的请求方法, 只有这些请求会在失败时重试
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE", "HEAD", "OPTIONS"}
 
 
 class BaseQlApi:
@@ -15,28 +26,181 @@ class BaseQlApi:
     提供通用的API请求方法
     """
 
-    def __init__(self, url: str, uri_class):
+    def __init__(
+        self,
+        url: str,
+        uri_class,
+        timeout: float = 30,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        pool_size: int = 10,
+    ):
         """
         初始化青龙API基类
 
         Args:
             url: 青龙面板URL
             uri_class: URI枚举类
+            timeout: 单次请求的超时秒数
+            max_retries: 幂等请求失败后的最大重试次数
+            retry_delay: 重试的基础等待秒数, 每次重试翻倍
+            pool_size: 连接池大小
         """
         self.url = url
         self.uri_class = uri_class
         self.token = None
         self.headers = None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.pool_size = pool_size
         self._session = None
+        self._auth_lock = asyncio.Lock()
 
     async def _get_session(self):
         """
         获取或创建 aiohttp session
         """
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json_codec.dumps,
+            )
         return self._session
 
+    @staticmethod
+    def _encode(data: Any) -> Union[str, bytes, None]:
+        """
+        编码请求体, 已经是str或bytes的数据原样返回
+        """
+        if data is None or isinstance(data, (str, bytes)):
+            return data
+        return json_codec.dumpb(data)
+
+    @staticmethod
+    async def _decode(response: aiohttp.ClientResponse):
+        """
+        解析响应体, 非JSON的错误响应转换成与青龙一致的结构
+        """
+        try:
+            return await response.json(loads=json_codec.loads, content_type=None)
+        except ValueError:
+            text = await response.text()
+            return {"code": response.status, "message": text}
+
+    @staticmethod
+    def _is_unauthorized(status: int, body: Any) -> bool:
+        return status == 401 or (isinstance(body, dict) and body.get("code") == 401)
+
+    async def _reauthenticate(self) -> bool:
+        """
+        使用登录时的凭据重新获取token, 由子类实现
+
+        Returns:
+            bool: 是否重新登录成功
+        """
+        return False
+
+    async def _refresh_token(self, expired_token: Optional[str]) -> bool:
+        """
+        token过期后重新登录, 并发请求同时过期时只登录一次
+        """
+        async with self._auth_lock:
+            if self.token != expired_token:
+                return True
+            logger.info("青龙token已失效, 正在重新登录......")
+            ok = await self._reauthenticate()
+            if not ok:
+                logger.error("青龙重新登录失败")
+            return ok
+
+    async def _request(
+        self,
+        method: str,
+        uri: str,
+        data: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        auth: bool = True,
+    ):
+        """
+        发请求的通用方法
+
+        Args:
+            method: 请求方法
+            uri: 相对于青龙面板URL的路径
+            data: 请求体, dict和list会被序列化为JSON
+            params: 查询参数
+            headers: 请求头, 为空时使用登录后的请求头
+            auth: token过期时是否自动重新登录并重放请求
+
+        Returns:
+            青龙接口的响应结果
+        """
+        with logger.contextualize(stage="qinglong"):
+            return await self._send(method, uri, data, params, headers, auth)
+
+    async def _send(
+        self,
+        method: str,
+        uri: str,
+        data: Any,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        auth: bool,
+    ):
+        session = await self._get_session()
+        body = self._encode(data)
+        retries = self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+        reauthenticated = False
+        attempt = 0
+        while True:
+            token = self.token
+            start = time.perf_counter()
+            try:
+                async with session.request(
+                    method,
+                    url=urljoin(self.url, uri),
+                    data=body,
+                    params=params,
+                    headers=headers or self.headers,
+                ) as response:
+                    result = await self._decode(response)
+                    status = response.status
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self._observe(method, uri, "error", time.perf_counter() - start)
+                if attempt >= retries:
+                    raise
+                error = repr(e)
+            else:
+                duration = time.perf_counter() - start
+                self._observe(method, uri, f"{status // 100}xx", duration)
+                logger.bind(
+                    attempt=attempt + 1,
+                    duration_ms=round(duration * 1000),
+                ).debug(f"{method.upper()} {uri} {status}")
+                if auth and not reauthenticated and self._is_unauthorized(status, result):
+                    reauthenticated = True
+                    if await self._refresh_token(token):
+                        continue
+                    return result
+                if status < 500 or attempt >= retries:
+                    return result
+                error = f"HTTP {status}"
+            attempt += 1
+            delay = self.retry_delay * 2 ** (attempt - 1)
+            logger.bind(attempt=attempt).warning(
+                f"请求青龙接口{uri}失败, {delay}秒后第{attempt}次重试, 错误: {error}"
+            )
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _observe(method: str, uri: str, status: str, duration: float):
+        method = method.upper()
+        qinglong_requests.inc(method=method, uri=uri, status=status)
+        qinglong_request_duration.observe(duration, method=method, uri=uri)
+
     async def close(self):
         """
         关闭 session
@@ -54,53 +218,31 @@ class BaseQlApi:
         """
         获取环境变量列表
         """
-        session = await self._get_session()
-        async with session.get(
-            url=urljoin(self.url, self.uri_class.envs.value), headers=self.headers
-        ) as response:
-            return await response.json()
+        return await self._request("get", self.uri_class.envs.value)
 
-    async def set_envs(self, data: Union[str, None] = None):
+    async def set_envs(self, data: Union[dict, str, None] = None):
         """
         设置环境变量
 
         Args:
-            data: 环境变量数据
+            data: 环境变量数据, dict会被序列化为JSON
         """
-        session = await self._get_session()
-        async with session.put(
-            url=urljoin(self.url, self.uri_class.envs.value),
-            data=data,
-            headers=self.headers,
-        ) as response:
-            return await response.json()
+        return await self._request("put", self.uri_class.envs.value, data=data)
 
-    async def envs_enable(self, data: bytes):
+    async def envs_enable(self, data: Union[list, bytes]):
         """
         启用环境变量
 
         Args:
-            data: 环境变量ID数据
+            data: 环境变量ID列表, 或已序列化的ID数据
         """
-        session = await self._get_session()
-        async with session.put(
-            url=urljoin(self.url, self.uri_class.envs_enable.value),
-            data=data,
-            headers=self.headers,
-        ) as response:
-            return await response.json()
+        return await self._request("put", self.uri_class.envs_enable.value, data=data)
 
-    async def envs_disable(self, data: bytes):
+    async def envs_disable(self, data: Union[list, bytes]):
         """
         禁用环境变量
 
         Args:
-            data: 环境变量ID数据
+            data: 环境变量ID列表, 或已序列化的ID数据
         """
-        session = await self._get_session()
-        async with session.put(
-            url=urljoin(self.url, self.uri_class.envs_disable.value),
-            data=data,
-            headers=self.headers,
-        ) as response:
-            return await response.json()
+        return await self._request("put", self.uri_class.envs_disable.value, data=data)
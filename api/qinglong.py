@@ -1,8 +1,4 @@
-from urllib.parse import urljoin
-import aiohttp
 from enum import Enum
-from typing import Union
-from utils.tools import send_request
 from api.base_qinglong import BaseQlApi
 
 
@@ -25,8 +21,27 @@ class QlApi(BaseQlApi):
     青龙面板API类
     """
 
-    def __init__(self, url: str):
-        super().__init__(url, QlUri)
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, QlUri, **kwargs)
+        self._username = None
+        self._password = None
+
+    def set_credentials(self, user: str, password: str):
+        """
+        设置token失效后重新登录使用的用户名密码
+
+        Args:
+            user: 用户名
+            password: 密码
+        """
+        self._username = user
+        self._password = password
+
+    async def _reauthenticate(self) -> bool:
+        if not (self._username and self._password):
+            return False
+        response = await self.login_by_username(self._username, self._password)
+        return response.get("code") == 200
 
     def login_by_token(self, token: str):
         """
@@ -53,11 +68,9 @@ class QlApi(BaseQlApi):
         """
         data = {"username": user, "password": password}
         headers = {"Content-Type": "application/json"}
-        response = await send_request(
-            url=urljoin(self.url, QlUri.user_login.value),
-            method="post",
-            headers=headers,
-            data=data,
+        self.set_credentials(user, password)
+        response = await self._request(
+            "post", QlUri.user_login.value, data=data, headers=headers, auth=False
         )
         if response["code"] == 200:
             self.token = "Bearer " + response["data"]["token"]
@@ -71,8 +84,16 @@ class QlOpenApi(BaseQlApi):
     青龙面板开放API类
     """
 
-    def __init__(self, url: str):
-        super().__init__(url, QlOpenUri)
+    def __init__(self, url: str, **kwargs):
+        super().__init__(url, QlOpenUri, **kwargs)
+        self._client_id = None
+        self._client_secret = None
+
+    async def _reauthenticate(self) -> bool:
+        if not (self._client_id and self._client_secret):
+            return False
+        response = await self.login(self._client_id, self._client_secret)
+        return response.get("code") == 200
 
     async def login(self, client_id: str, client_secret: str):
         """
@@ -87,11 +108,10 @@ class QlOpenApi(BaseQlApi):
         """
         headers = {"Content-Type": "application/json"}
         params = {"client_id": client_id, "client_secret": client_secret}
-        response = await send_request(
-            url=urljoin(self.url, QlOpenUri.auth_token.value),
-            method="get",
-            headers=headers,
-            params=params,
+        self._client_id = client_id
+        self._client_secret = client_secret
+        response = await self._request(
+            "get", QlOpenUri.auth_token.value, params=params, headers=headers, auth=False
         )
         if response["code"] == 200:
             self.token = "Bearer " + response["data"]["token"]
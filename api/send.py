@@ -1,10 +1,14 @@
 import aiohttp
+import asyncio
 import base64
 import hashlib
 import hmac
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import urllib
+from loguru import logger
+from core.metrics import notifications
+from utils import json_codec
 
 
 def generate_sign(secret):
@@ -26,8 +30,62 @@ async def send_message(url: str, data: Dict[str, Any], session: aiohttp.ClientSe
     headers = {
         "Content-Type": "application/json",
     }
-    async with session.post(url, json=data, headers=headers) as response:
-        return await response.json()
+    async with session.post(url, data=json_codec.dumpb(data), headers=headers) as response:
+        response.raise_for_status()
+        return await response.json(loads=json_codec.loads)
+
+
+# 各通知渠道单条消息内容的UTF-8字节上限, 超出时按行拆成多条发送
+MESSAGE_LIMITS = {
+    "send_wecom": 2048,
+    "send_dingtalk": 20000,
+    "send_feishu": 18000,
+    "send_pushplus": 20000,
+    "send_serverchan": 32000,
+    "send_webhook": 20000,
+}
+
+
+def split_message(msg: str, limit: Optional[int]) -> List[str]:
+    """
+    按UTF-8字节上限拆分消息, 尽量在换行处拆分, 拆成多条时每条带上(序号/总数)前缀
+
+    Args:
+        msg: 消息内容
+        limit: 单条消息的字节上限, None表示不拆分
+
+    Returns:
+        List[str]: 拆分后的消息列表
+    """
+    if not limit or len(msg.encode("utf-8")) <= limit:
+        return [msg]
+    # 给序号前缀预留空间
+    limit = max(limit - 16, 1)
+    chunks, current, size = [], [], 0
+    for line in msg.split("\n"):
+        encoded = line.encode("utf-8")
+        # 单行超长时按字节硬拆, 不截断多字节字符
+        while len(encoded) > limit:
+            cut = limit
+            while cut and (encoded[cut] & 0xC0) == 0x80:
+                cut -= 1
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(encoded[:cut].decode("utf-8"))
+            encoded = encoded[cut:]
+        line = encoded.decode("utf-8")
+        line_size = len(encoded) + (1 if current else 0)
+        if current and size + line_size > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+            line_size = len(encoded)
+        current.append(line)
+        size += line_size
+    if current:
+        chunks.append("\n".join(current))
+    total = len(chunks)
+    return [f"({index}/{total})\n{chunk}" for index, chunk in enumerate(chunks, 1)]
 
 
 class SendApi(object):
@@ -40,7 +98,7 @@ class SendApi(object):
         获取或创建 aiohttp session
         """
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            self._session = aiohttp.ClientSession(json_serialize=json_codec.dumps)
         return self._session
 
     async def close(self):
@@ -56,26 +114,21 @@ class SendApi(object):
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
-    @staticmethod
-    async def send_webhook(url, msg):
+    async def send_webhook(self, url, msg):
         """
         webhook
         """
         data = {"content": msg}
-        async with aiohttp.ClientSession() as session:
-            return await send_message(url, data, session)
+        return await send_message(url, data, await self._get_session())
 
-    @staticmethod
-    async def send_wecom(url, msg):
+    async def send_wecom(self, url, msg):
         """
         企业微信
         """
         data = {"msgtype": "text", "text": {"content": msg}}
-        async with aiohttp.ClientSession() as session:
-            return await send_message(url, data, session)
+        return await send_message(url, data, await self._get_session())
 
-    @staticmethod
-    async def send_dingtalk(url: str, msg: str) -> Dict[str, Any]:
+    async def send_dingtalk(self, url: str, msg: str) -> Dict[str, Any]:
         """
         钉钉
         """
@@ -90,20 +143,16 @@ class SendApi(object):
             timestamp, sign = generate_sign(secret)
             url = f"{url}&timestamp={timestamp}&sign={sign}"
         data = {"msgtype": "text", "text": {"content": msg}}
-        async with aiohttp.ClientSession() as session:
-            return await send_message(url, data, session)
+        return await send_message(url, data, await self._get_session())
 
-    @staticmethod
-    async def send_feishu(url: str, msg: str) -> Dict[str, Any]:
+    async def send_feishu(self, url: str, msg: str) -> Dict[str, Any]:
         """
         飞书
         """
         data = {"msg_type": "text", "content": {"text": msg}}
-        async with aiohttp.ClientSession() as session:
-            return await send_message(url, data, session)
+        return await send_message(url, data, await self._get_session())
 
-    @staticmethod
-    async def send_pushplus(url: str, msg: str) -> Dict[str, Any]:
+    async def send_pushplus(self, url: str, msg: str) -> Dict[str, Any]:
         """
         发送 Pushplus 消息。
 
@@ -115,11 +164,9 @@ class SendApi(object):
             Dict[str, Any]: 返回发送消息的结果。
         """
         data = {"content": msg}
-        async with aiohttp.ClientSession() as session:
-            return await send_message(url, data, session)
+        return await send_message(url, data, await self._get_session())
 
-    @staticmethod
-    async def send_serverchan(url: str, msg: str) -> Dict[str, Any]:
+    async def send_serverchan(self, url: str, msg: str) -> Dict[str, Any]:
         """
         发送 Server酱 消息。
 
@@ -131,5 +178,340 @@ class SendApi(object):
             Dict[str, Any]: 返回发送消息的结果。
         """
         data = {"title": "自动更新京东Cookie通知", "desp": msg}
-        async with aiohttp.ClientSession() as session:
-            return await send_message(url, data, session)
+        return await send_message(url, data, await self._get_session())
+
+
+class NotificationDispatcher(object):
+    """
+    通知分发器类
+    所有通知渠道共用SendApi的session, 一条消息同时发往所有地址, 每个地址单独超时和重试.
+    start之后submit只把消息放进后台队列, 不会阻塞刷新流程
+    """
+
+    def __init__(
+        self,
+        send_api: SendApi,
+        timeout: float = 10,
+        retries: int = 2,
+        retry_delay: float = 1,
+        queue_size: int = 100,
+        digest_interval: Optional[float] = None,
+    ):
+        """
+        初始化通知分发器
+
+        Args:
+            send_api: 发送消息的SendApi实例
+            timeout: 单个通知地址的超时秒数
+            retries: 发送失败后的重试次数
+            retry_delay: 重试的基础等待秒数, 每次重试翻倍
+            queue_size: 后台队列长度, 队列满时丢弃新消息
+            digest_interval: 不为None时开启汇总模式, 每隔多少秒发送一次汇总, 0表示只在结束时发送
+        """
+        self.send_api = send_api
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue_size = queue_size
+        self.digest: Optional[NotificationDigest] = None
+        if digest_interval is not None:
+            self.digest = NotificationDigest(self, digest_interval)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    @staticmethod
+    def _should_retry(error: Exception) -> bool:
+        """
+        超时、连接错误、429和5xx需要重试, 其余错误重试也不会成功
+        """
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+    async def deliver(self, channel: str, url: str, msg: str) -> Dict[str, Any]:
+        """
+        发送到单个通知地址, 失败时按指数退避重试
+
+        Args:
+            channel: 通知渠道, 即SendApi的方法名, 例如send_wecom
+            url: 通知地址
+            msg: 消息内容
+
+        Returns:
+            Dict[str, Any]: 包含channel、url、ok、attempts以及response或error的发送结果
+        """
+        result = {"channel": channel, "url": url, "ok": False, "attempts": 0}
+        method = getattr(self.send_api, channel, None)
+        if method is None:
+            result["error"] = "不支持的通知渠道"
+            return result
+
+        # 超出渠道长度上限的消息拆成多条按顺序发送
+        responses = []
+        for chunk in split_message(msg, MESSAGE_LIMITS.get(channel)):
+            attempt = 0
+            while True:
+                attempt += 1
+                result["attempts"] += 1
+                try:
+                    response = await asyncio.wait_for(method(url, chunk), self.timeout)
+                    logger.info(f"发送消息到 {url}, 响应:{response}")
+                    responses.append(response)
+                    break
+                except Exception as e:
+                    error = repr(e)
+                    if attempt > self.retries or not self._should_retry(e):
+                        logger.error(f"发送消息到 {url} 失败, 已尝试{attempt}次, 错误: {error}")
+                        result["error"] = error
+                        return result
+                    delay = self.retry_delay * 2 ** (attempt - 1)
+                    logger.warning(f"发送消息到 {url} 失败, {delay}秒后重试, 错误: {error}")
+                    await asyncio.sleep(delay)
+        result.update(ok=True, response=responses[0] if len(responses) == 1 else responses)
+        return result
+
+    async def dispatch(self, msg: str, targets: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        """
+        把消息同时发往所有渠道的所有地址
+
+        Args:
+            msg: 消息内容
+            targets: 渠道到地址列表的映射, 格式与config.send_info一致
+
+        Returns:
+            List[Dict[str, Any]]: 每个地址的发送结果
+        """
+        results = await asyncio.gather(
+            *[
+                self.deliver(channel, url, msg)
+                for channel, urls in targets.items()
+                for url in urls
+            ]
+        )
+        for result in results:
+            notifications.inc(
+                channel=result["channel"].removeprefix("send_"),
+                result="success" if result["ok"] else "failed",
+            )
+        return list(results)
+
+    def start(self):
+        """
+        启动后台发送队列, 需要在事件循环中调用
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.create_task(self._run())
+        if self.digest:
+            self.digest.start()
+
+    def submit(self, msg: str, targets: Dict[str, List[str]]) -> bool:
+        """
+        把消息放进后台队列, 未启动时返回False
+
+        Args:
+            msg: 消息内容
+            targets: 渠道到地址列表的映射
+
+        Returns:
+            bool: 是否已入队
+        """
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait((msg, targets))
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"通知队列已满, 丢弃消息: {msg}")
+            for channel, urls in targets.items():
+                notifications.inc(
+                    len(urls), channel=channel.removeprefix("send_"), result="dropped"
+                )
+            return False
+
+    async def _run(self):
+        while True:
+            msg, targets = await self._queue.get()
+            try:
+                await self.dispatch(msg, targets)
+            except Exception as e:
+                logger.error(f"通知发送异常: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def close(self, timeout: Optional[float] = None):
+        """
+        等待队列中的消息发送完毕后关闭, 并关闭SendApi的session
+
+        Args:
+            timeout: 最多等待的秒数, None表示一直等待
+        """
+        if self.digest:
+            await self.digest.close()
+        if self.running:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"通知队列未能及时发送完, 丢弃{self._queue.qsize()}条消息")
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.send_api.close()
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class NotificationDigest(object):
+    """
+    通知汇总类
+    汇总模式下每个账号的结果先缓存起来, 结束时或每隔interval秒合并成一条消息发送
+    """
+
+    def __init__(self, dispatcher: NotificationDispatcher, interval: float = 0):
+        """
+        初始化通知汇总
+
+        Args:
+            dispatcher: 发送汇总消息的通知分发器
+            interval: 每隔多少秒发送一次汇总, 0表示只在close时发送
+        """
+        self.dispatcher = dispatcher
+        self.interval = interval
+        self.events: List[Dict[str, Any]] = []
+        self.targets: Dict[str, List[str]] = {}
+        self._since = time.time()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(
+        self,
+        ok: bool,
+        msg: str,
+        targets: Dict[str, List[str]],
+        duration: Optional[float] = None,
+    ):
+        """
+        缓存一条通知
+
+        Args:
+            ok: 是否为成功消息
+            msg: 消息内容
+            targets: 渠道到地址列表的映射
+            duration: 该账号的更新耗时秒数
+        """
+        self.targets = targets
+        self.events.append({"ok": ok, "msg": msg, "duration": duration})
+
+    def render(self, events: List[Dict[str, Any]]) -> str:
+        """
+        把缓存的通知合并成一条汇总消息
+
+        Args:
+            events: 缓存的通知列表
+
+        Returns:
+            str: 汇总消息
+        """
+        succeeded = [x for x in events if x["ok"]]
+        failed = [x for x in events if not x["ok"]]
+        durations = [x["duration"] for x in events if x["duration"] is not None]
+        since = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._since))
+        until = time.strftime("%Y-%m-%d %H:%M:%S")
+        lines = [
+            "京东Cookie更新汇总",
+            f"时间: {since} ~ {until}",
+            f"成功: {len(succeeded)}, 失败: {len(failed)}",
+        ]
+        if durations:
+            total = sum(durations)
+            lines.append(
+                f"账号耗时: 合计{total:.1f}秒, 平均{total / len(durations):.1f}秒"
+            )
+        for title, items in (("失败明细:", failed), ("成功明细:", succeeded)):
+            if not items:
+                continue
+            lines.append(title)
+            for item in items:
+                line = f"- {item['msg']}"
+                if item["duration"] is not None:
+                    line += f" (耗时{item['duration']:.1f}秒)"
+                lines.append(line)
+        return "\n".join(lines)
+
+    async def flush(self):
+        """
+        发送当前缓存的汇总, 没有缓存时不发送
+        """
+        if not self.events:
+            return
+        events, self.events = self.events, []
+        msg = self.render(events)
+        self._since = time.time()
+        if not self.dispatcher.submit(msg, self.targets):
+            await self.dispatcher.dispatch(msg, self.targets)
+
+    def start(self):
+        """
+        启动定时汇总, interval为0时不启动
+        """
+        if self.interval and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"发送通知汇总异常: {e}")
+
+    async def close(self):
+        """
+        停止定时汇总并发送剩余的缓存
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+def get_notification_dispatcher(name: str = "ql") -> NotificationDispatcher:
+    """
+    按通知配置创建通知分发器
+
+    Args:
+        name: SendApi名称
+
+    Returns:
+        NotificationDispatcher: 通知分发器实例
+    """
+    from config import notification_config
+
+    return NotificationDispatcher(
+        SendApi(name),
+        timeout=notification_config.send_timeout,
+        retries=notification_config.send_retries,
+        retry_delay=notification_config.send_retry_delay,
+        queue_size=notification_config.send_queue_size,
+        digest_interval=(
+            notification_config.digest_interval
+            if notification_config.digest_mode
+            else None
+        ),
+    )
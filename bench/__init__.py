@@ -0,0 +1,36 @@
+"""
+京东Cookie自动获取项目 - 离线性能评测模块
+
+本模块提供不依赖京东线上页面的离线评测工具，通过 python -m bench 运行。
+"""
+
+import math
+from typing import Dict, List
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """
+    统计耗时的分位数
+
+    Args:
+        latencies: 耗时列表, 单位毫秒
+
+    Returns:
+        Dict[str, float]: 包含count、mean、p50、p90、p99、max的统计结果
+    """
+    if not latencies:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        index = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+        return ordered[index]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": ordered[-1],
+    }
@@ -0,0 +1,89 @@
+"""
+离线性能评测入口
+
+用法:
+    python -m bench captcha --dataset captcha_dataset
+    python -m bench qinglong --envs 20000 --concurrency 10
+    python -m bench importtime --max-ms 1500
+"""
+
+import argparse
+
+
+def parse_args():
+    """
+    解析参数
+    """
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    captcha_parser = subparsers.add_parser("captcha", help="回放验证码数据集, 评测识别器")
+    captcha_parser.add_argument(
+        "--dataset", default="captcha_dataset", help="验证码数据集目录"
+    )
+    captcha_parser.add_argument(
+        "--kind",
+        action="append",
+        choices=["slide", "shape", "color", "text"],
+        help="只评测指定类型, 可重复指定",
+    )
+    captcha_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+
+    ql_parser = subparsers.add_parser("qinglong", help="评测青龙面板客户端吞吐")
+    ql_parser.add_argument("--url", default=None, help="面板地址, 为空时启动内置模拟面板")
+    ql_parser.add_argument("--username", default="admin", help="面板用户名")
+    ql_parser.add_argument("--password", default="admin", help="面板密码")
+    ql_parser.add_argument("--envs", type=int, default=20000, help="模拟面板的环境变量数量")
+    ql_parser.add_argument("--rounds", type=int, default=5, help="获取环境变量的重复次数")
+    ql_parser.add_argument("--updates", type=int, default=500, help="更新/启用/禁用的次数")
+    ql_parser.add_argument("--concurrency", type=int, default=10, help="并发度")
+    ql_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+
+    it_parser = subparsers.add_parser("importtime", help="评测入口模块的启动导入耗时")
+    it_parser.add_argument(
+        "--module",
+        action="append",
+        help="入口模块, 可重复指定, 默认为main和schedule_main",
+    )
+    it_parser.add_argument("--top", type=int, default=10, help="输出耗时最高的模块数量")
+    it_parser.add_argument("--max-ms", type=float, default=None, help="总导入耗时上限")
+    it_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "captcha":
+        from bench.captcha import run_captcha_bench, print_captcha_bench
+
+        print_captcha_bench(run_captcha_bench(args.dataset, args.kind), args.json)
+    elif args.command == "qinglong":
+        import asyncio
+        from bench.qinglong import run_qinglong_bench, print_qinglong_bench
+
+        results = asyncio.run(
+            run_qinglong_bench(
+                url=args.url,
+                env_count=args.envs,
+                rounds=args.rounds,
+                updates=args.updates,
+                concurrency=args.concurrency,
+                username=args.username,
+                password=args.password,
+            )
+        )
+        print_qinglong_bench(results, args.json)
+    elif args.command == "importtime":
+        import sys
+        from bench.importtime import run_importtime_bench, print_importtime_bench
+
+        results = run_importtime_bench(
+            args.module or ["main", "schedule_main"], args.top, args.max_ms
+        )
+        print_importtime_bench(results, args.json)
+        if not results["passed"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+京东Cookie自动获取项目 - 验证码识别离线评测模块
+
+本模块读取 CaptchaRecorder 记录的数据集，把每条样本回放给对应的识别器，
+统计各识别器的耗时分位数和准确率。
+
+准确率只统计有标注的样本：验证通过的样本以当时执行的动作作为标注，
+也可以在 index.jsonl 中手工补充 truth 字段作为标注。
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from bench import summarize_latencies
+from utils.captcha_recorder import load_dataset
+
+# 滑块距离允许的误差像素
+SLIDE_TOLERANCE = 5
+# 点击坐标允许的误差像素
+POINT_TOLERANCE = 12
+
+
+def get_truth(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    获取样本的标注, 优先使用手工标注的truth字段
+
+    Args:
+        record: 样本记录
+
+    Returns:
+        Optional[Dict[str, Any]]: 标注, 无标注时返回None
+    """
+    if record.get("truth"):
+        return record["truth"]
+    if record.get("passed") and record.get("action"):
+        return record["action"]
+    return None
+
+
+def is_point_close(point, truth_point, tolerance: float = POINT_TOLERANCE) -> bool:
+    if not point or not truth_point or point[0] is None:
+        return False
+    return (
+        abs(point[0] - truth_point[0]) <= tolerance
+        and abs(point[1] - truth_point[1]) <= tolerance
+    )
+
+
+class _ImageFile:
+    """
+    把样本图片写入临时文件, 供只接受文件路径的识别器使用
+    """
+
+    def __init__(self, img_bytes: bytes):
+        self.img_bytes = img_bytes
+        self.path = None
+
+    def __enter__(self) -> str:
+        fd, self.path = tempfile.mkstemp(suffix=".png")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.img_bytes)
+        return self.path
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        os.remove(self.path)
+
+
+def replay_slide(record: Dict[str, Any]):
+    from utils.tools import ddddocr_find_bytes_pic
+
+    images = record["images"]
+    start = time.perf_counter()
+    distance = ddddocr_find_bytes_pic(images["target"], images["background"])
+    elapsed = (time.perf_counter() - start) * 1000
+
+    truth = get_truth(record)
+    correct = None
+    if truth and truth.get("distance") is not None:
+        correct = abs(distance - truth["distance"]) <= SLIDE_TOLERANCE
+    return elapsed, correct
+
+
+def replay_shape(record: Dict[str, Any]):
+    from utils.tools import get_shape_location_by_type
+
+    shape_type = record["prompt"].split("请选出图中的")[1].replace("圆环", "圆形")
+    with _ImageFile(record["images"]["background"]) as path:
+        start = time.perf_counter()
+        point = get_shape_location_by_type(path, shape_type)
+        elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, _check_points(record, [point])
+
+
+def replay_color(record: Dict[str, Any]):
+    from utils.tools import get_shape_location_by_color
+
+    target_color = record["prompt"].split("请选出图中")[1].split("的图形")[0]
+    with _ImageFile(record["images"]["background"]) as path:
+        start = time.perf_counter()
+        point = get_shape_location_by_color(path, target_color)
+        elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, _check_points(record, [point])
+
+
+def replay_text(record: Dict[str, Any]):
+    import cv2
+    import numpy as np
+    from core.captcha.shape import parse_text_targets, locate_text_targets
+    from utils.ocr_manager import get_ocr_manager
+
+    ocr_manager = get_ocr_manager()
+    det = ocr_manager.get_det()
+    my_ocr = ocr_manager.get_my_ocr()
+    images = record["images"]
+    target_char_list = parse_text_targets(record["prompt"])[:4]
+    im = cv2.imdecode(np.frombuffer(images["background"], np.uint8), cv2.IMREAD_COLOR)
+
+    start = time.perf_counter()
+    target_list, _ = locate_text_targets(
+        det,
+        my_ocr,
+        images.get("background_src", images["background"]),
+        im,
+        target_char_list,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, _check_points(record, [target[1] for target in target_list])
+
+
+def _check_points(record: Dict[str, Any], points: list) -> Optional[bool]:
+    truth = get_truth(record)
+    if not truth or not truth.get("points"):
+        return None
+    truth_points = truth["points"]
+    if len(points) != len(truth_points):
+        return False
+    return all(is_point_close(p, t) for p, t in zip(points, truth_points))
+
+
+# 样本类型与识别器的对应关系
+recognizers: Dict[str, Callable] = {
+    "slide": replay_slide,
+    "shape": replay_shape,
+    "color": replay_color,
+    "text": replay_text,
+}
+
+
+def run_captcha_bench(dataset_dir: str, kinds: Optional[List[str]] = None) -> dict:
+    """
+    回放数据集并统计各识别器的耗时和准确率
+
+    Args:
+        dataset_dir: 数据集目录
+        kinds: 只评测指定类型, 默认评测全部支持的类型
+
+    Returns:
+        dict: 以样本类型为key的评测结果
+    """
+    records = load_dataset(dataset_dir)
+    kinds = kinds or list(recognizers)
+    results = {}
+    for kind in kinds:
+        samples = [r for r in records if r["kind"] == kind]
+        latencies, labeled, correct, errors = [], 0, 0, 0
+        for record in samples:
+            try:
+                elapsed, is_correct = recognizers[kind](record)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            if is_correct is not None:
+                labeled += 1
+                correct += int(is_correct)
+        results[kind] = {
+            "samples": len(samples),
+            "errors": errors,
+            "labeled": labeled,
+            "accuracy": correct / labeled if labeled else None,
+            "latency_ms": summarize_latencies(latencies),
+        }
+    return results
+
+
+def print_captcha_bench(results: dict, as_json: bool = False):
+    """
+    打印评测结果
+
+    Args:
+        results: run_captcha_bench的返回值
+        as_json: 是否以JSON格式输出
+    """
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"{'kind':<8}{'samples':>8}{'errors':>8}{'labeled':>8}{'accuracy':>10}"
+        f"{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}"
+    )
+    for kind, result in results.items():
+        latency = result["latency_ms"]
+        accuracy = "-" if result["accuracy"] is None else f"{result['accuracy']:.1%}"
+        print(
+            f"{kind:<8}{result['samples']:>8}{result['errors']:>8}{result['labeled']:>8}"
+            f"{accuracy:>10}{latency['p50']:>10.1f}{latency['p90']:>10.1f}{latency['p99']:>10.1f}"
+        )
@@ -0,0 +1,143 @@
+"""
+京东Cookie自动获取项目 - 启动导入耗时评测模块
+
+本模块在子进程中用 python -X importtime 导入入口模块(默认main和schedule_main)，
+统计总导入耗时和自身耗时最高的模块，并检查验证码相关的重型依赖
+(cv2、ddddocr、onnxruntime、numpy、PIL)是否在启动时就被导入。
+这些依赖只应在真正处理验证码时才加载。
+"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# 启动阶段不应导入的重型依赖(顶层包名)
+HEAVY_MODULES = ("cv2", "ddddocr", "onnxruntime", "numpy", "PIL")
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        output: 子进程的stderr
+
+    Returns:
+        List[Dict]: 每个被导入模块的 name、self_us、cumulative_us、depth
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        raw_name = parts[2].rstrip()
+        name = raw_name.lstrip()
+        records.append(
+            {
+                "name": name,
+                "self_us": int(parts[0]),
+                "cumulative_us": int(parts[1]),
+                "depth": (len(raw_name) - len(name) - 1) // 2,
+            }
+        )
+    return records
+
+
+def measure_import(module: str, cwd: Optional[str] = None, top: int = 10) -> Dict:
+    """
+    在全新的子进程中导入模块并统计耗时
+
+    Args:
+        module: 模块名
+        cwd: 子进程工作目录, 默认为项目根目录
+        top: 输出自身耗时最高的模块数量
+
+    Returns:
+        Dict: total_ms、模块数量、耗时最高的模块以及被导入的重型依赖
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    records = parse_importtime(proc.stderr)
+    total_us = next(
+        (r["cumulative_us"] for r in reversed(records) if r["name"] == module), 0
+    )
+    heavy = sorted(
+        {
+            r["name"].split(".")[0]
+            for r in records
+            if r["name"].split(".")[0] in HEAVY_MODULES
+        }
+    )
+    slowest = sorted(records, key=lambda r: r["self_us"], reverse=True)[:top]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else "",
+        "total_ms": total_us / 1000,
+        "modules": len(records),
+        "heavy_modules": heavy,
+        "slowest": [
+            {"name": r["name"], "self_ms": r["self_us"] / 1000} for r in slowest
+        ],
+    }
+
+
+def run_importtime_bench(
+    modules: List[str], top: int = 10, max_ms: Optional[float] = None
+) -> Dict:
+    """
+    评测多个入口模块的导入耗时
+
+    Args:
+        modules: 入口模块名列表
+        top: 每个模块输出自身耗时最高的模块数量
+        max_ms: 总导入耗时上限, 超过时评测失败
+
+    Returns:
+        Dict: 每个模块的结果, 以及是否通过
+    """
+    results = [measure_import(module, top=top) for module in modules]
+    passed = all(
+        r["ok"]
+        and not r["heavy_modules"]
+        and (max_ms is None or r["total_ms"] <= max_ms)
+        for r in results
+    )
+    return {"results": results, "max_ms": max_ms, "passed": passed}
+
+
+def print_importtime_bench(results: Dict, as_json: bool = False):
+    """
+    打印评测结果
+
+    Args:
+        results: run_importtime_bench的返回值
+        as_json: 是否以JSON格式输出
+    """
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results["results"]:
+        if not result["ok"]:
+            print(f"{result['module']}: 导入失败 {result['error']}")
+            continue
+        print(
+            f"{result['module']}: 总耗时{result['total_ms']:.1f}ms, "
+            f"导入模块{result['modules']}个"
+        )
+        for item in result["slowest"]:
+            print(f"  {item['self_ms']:>8.1f}ms  {item['name']}")
+        if result["heavy_modules"]:
+            print(f"  启动时导入了重型依赖: {', '.join(result['heavy_modules'])}")
+    if results["max_ms"] is not None:
+        print(f"耗时上限: {results['max_ms']:.0f}ms")
+    print("通过" if results["passed"] else "未通过")
@@ -0,0 +1,193 @@
+"""
+京东Cookie自动获取项目 - 青龙面板客户端吞吐评测模块
+
+本模块针对模拟青龙面板(或指定的面板地址)评测 api.qinglong 客户端：
+获取环境变量的耗时和解析耗时、JD_COOKIE过滤耗时，以及按并发度更新、启用、禁用
+环境变量的吞吐。
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+import aiohttp
+
+from bench import summarize_latencies
+from utils import json_codec
+
+
+async def _timed(coro: Awaitable) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def _run_concurrently(
+    func: Callable[[Any], Awaitable], items: List[Any], concurrency: int
+) -> Dict[str, Any]:
+    """
+    以指定并发度执行请求并统计吞吐
+
+    Returns:
+        Dict[str, Any]: 包含ops_per_sec和latency_ms的统计结果
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(item):
+        async with semaphore:
+            return await _timed(func(item))
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[worker(item) for item in items])
+    elapsed = time.perf_counter() - start
+    return {
+        "ops": len(items),
+        "ops_per_sec": len(items) / elapsed if elapsed else 0.0,
+        "latency_ms": summarize_latencies(list(latencies)),
+    }
+
+
+async def run_qinglong_bench(
+    url: Optional[str] = None,
+    env_count: int = 20000,
+    rounds: int = 5,
+    updates: int = 500,
+    concurrency: int = 10,
+    username: str = "admin",
+    password: str = "admin",
+) -> dict:
+    """
+    评测青龙面板客户端
+
+    Args:
+        url: 面板地址, 为空时启动内置的模拟面板
+        env_count: 模拟面板生成的环境变量数量
+        rounds: 获取环境变量的重复次数
+        updates: 更新、启用、禁用各执行多少次
+        concurrency: 并发度
+        username: 面板用户名
+        password: 面板密码
+
+    Returns:
+        dict: 评测结果
+    """
+    from api.qinglong import QlApi
+    from utils.tools import filter_cks, extract_pt_pin
+
+    server = None
+    if url is None:
+        from mock.qinglong import MockQinglongServer, MockQinglongConfig
+
+        server = MockQinglongServer(
+            MockQinglongConfig(env_count=env_count, username=username, password=password)
+        )
+        url = await server.start(port=0)
+
+    qlapi = QlApi(url)
+    results: Dict[str, Any] = {"url": url, "concurrency": concurrency}
+    try:
+        response = await qlapi.login_by_username(username, password)
+        if response["code"] != 200:
+            raise RuntimeError(f"青龙面板登录失败: {response}")
+
+        # 获取环境变量(网络+解析)
+        latencies, env_data = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            env_data = (await qlapi.get_envs())["data"]
+            latencies.append((time.perf_counter() - start) * 1000)
+        results["envs"] = len(env_data)
+        results["get_envs_ms"] = summarize_latencies(latencies)
+
+        # 单独统计响应体的解析耗时, 同时给出标准库json的耗时作为对照
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                urljoin(url, "api/envs"), headers=qlapi.headers
+            ) as response:
+                body = await response.read()
+        results["body_bytes"] = len(body)
+        results["json_backend"] = json_codec.get_backend()
+        parsers = (("parse_ms", json_codec.loads), ("stdlib_parse_ms", json.loads))
+        for key, parse in parsers:
+            parse_latencies = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                parse(body)
+                parse_latencies.append((time.perf_counter() - start) * 1000)
+            results[key] = summarize_latencies(parse_latencies)
+
+        # 与main.main()一致的JD_COOKIE过滤流程
+        filter_latencies, jd_ck_env_datas = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            jd_ck_env_datas = [
+                {**x, "pt_pin": extract_pt_pin(x["value"])}
+                for x in filter_cks(env_data, name="JD_COOKIE")
+                if extract_pt_pin(x["value"])
+            ]
+            filter_cks(jd_ck_env_datas, status=1, name="JD_COOKIE")
+            filter_latencies.append((time.perf_counter() - start) * 1000)
+        results["jd_cookies"] = len(jd_ck_env_datas)
+        results["filter_ms"] = summarize_latencies(filter_latencies)
+
+        targets = jd_ck_env_datas[:updates]
+
+        async def update(env):
+            fields = ("id", "_id", "name", "value", "remarks")
+            data = {key: env[key] for key in fields if key in env}
+            return await qlapi.set_envs(data=data)
+
+        async def enable(env):
+            env_id = env["id"] if "id" in env else env["_id"]
+            return await qlapi.envs_enable(data=[env_id])
+
+        async def disable(env):
+            env_id = env["id"] if "id" in env else env["_id"]
+            return await qlapi.envs_disable(data=[env_id])
+
+        results["update"] = await _run_concurrently(update, targets, concurrency)
+        results["enable"] = await _run_concurrently(enable, targets, concurrency)
+        results["disable"] = await _run_concurrently(disable, targets, concurrency)
+    finally:
+        await qlapi.close()
+        if server:
+            await server.stop()
+    return results
+
+
+def print_qinglong_bench(results: dict, as_json: bool = False):
+    """
+    打印评测结果
+
+    Args:
+        results: run_qinglong_bench的返回值
+        as_json: 是否以JSON格式输出
+    """
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"面板: {results['url']}, JSON后端: {results['json_backend']}")
+    print(
+        f"环境变量: {results['envs']}个, 响应体{results['body_bytes'] / 1024:.0f}KB, "
+        f"JD_COOKIE: {results['jd_cookies']}个"
+    )
+    for key, title in (
+        ("get_envs_ms", "get_envs"),
+        ("parse_ms", "解析"),
+        ("stdlib_parse_ms", "标准库解析"),
+        ("filter_ms", "过滤"),
+    ):
+        latency = results[key]
+        print(
+            f"{title:<10} p50={latency['p50']:.1f}ms p90={latency['p90']:.1f}ms "
+            f"max={latency['max']:.1f}ms"
+        )
+    for key in ("update", "enable", "disable"):
+        result = results[key]
+        latency = result["latency_ms"]
+        print(
+            f"{key:<10} {result['ops_per_sec']:.0f} ops/s (并发{results['concurrency']}) "
+            f"p50={latency['p50']:.1f}ms p99={latency['p99']:.1f}ms"
+        )
@@ -12,8 +12,13 @@ from models import (
     GlobalConfig,
     NotificationConfig,
     ProxyConfig,
+    ProxyPoolConfig,
+    BackoffConfig,
+    RefresherConfig,
+    JobQueueConfig,
+    AccountStoreConfig,
 )
-from typing import Optional
+from typing import List, Optional, Set
 
 # 配置管理器实例
 _config_manager = get_config_manager()
@@ -42,6 +47,19 @@ def get_qinglong_config() -> QinglongConfig:
     return _config.qinglong_data
 
 
+def get_qinglong_configs() -> List[QinglongConfig]:
+    """
+    获取所有青龙面板配置, qinglong_data在前, URL重复的面板只保留一个
+
+    Returns:
+        List[QinglongConfig]: 青龙面板配置对象列表
+    """
+    configs = {}
+    for ql_config in [_config.qinglong_data, *_config.qinglong_panels]:
+        configs.setdefault(ql_config.url, ql_config)
+    return list(configs.values())
+
+
 def get_global_config() -> GlobalConfig:
     """
     获取全局配置
@@ -72,6 +90,56 @@ def get_proxy_config() -> Optional[ProxyConfig]:
     return _config.proxy_config
 
 
+def get_proxy_pool_config() -> ProxyPoolConfig:
+    """
+    获取代理池配置
+
+    Returns:
+        ProxyPoolConfig: 代理池配置对象
+    """
+    return _config.proxy_pool_config
+
+
+def get_backoff_config() -> BackoffConfig:
+    """
+    获取账号失败退避配置
+
+    Returns:
+        BackoffConfig: 账号失败退避配置对象
+    """
+    return _config.backoff_config
+
+
+def get_refresher_config() -> RefresherConfig:
+    """
+    获取pt_key刷新链配置
+
+    Returns:
+        RefresherConfig: pt_key刷新链配置对象
+    """
+    return _config.refresher_config
+
+
+def get_job_queue_config() -> JobQueueConfig:
+    """
+    获取分布式任务队列配置
+
+    Returns:
+        JobQueueConfig: 分布式任务队列配置对象
+    """
+    return _config.job_queue_config
+
+
+def get_account_store_config() -> AccountStoreConfig:
+    """
+    获取账号存储配置
+
+    Returns:
+        AccountStoreConfig: 账号存储配置对象
+    """
+    return _config.account_store_config
+
+
 def get_account_configs() -> dict[str, AccountConfig]:
     """
     获取所有账号配置
@@ -97,10 +165,16 @@ def get_account_config(username: str) -> Optional[AccountConfig]:
 
 # 导出常用配置变量
 qinglong_data = get_qinglong_config()
+qinglong_datas = get_qinglong_configs()
 user_datas = get_account_configs()
 global_config = get_global_config()
 notification_config = get_notification_config()
 proxy_config = get_proxy_config()
+proxy_pool_config = get_proxy_pool_config()
+backoff_config = get_backoff_config()
+refresher_config = get_refresher_config()
+job_queue_config = get_job_queue_config()
+account_store_config = get_account_store_config()
 cron_expression = global_config.cron_expression
 is_send_msg = notification_config.is_send_msg
 is_send_success_msg = notification_config.is_send_success_msg
@@ -113,3 +187,50 @@ send_info = {
     "send_pushplus": notification_config.send_pushplus,
     "send_serverchan": notification_config.send_serverchan,
 }
+
+
+def _update_model(target, source):
+    # 原地更新配置对象, 已经 from config import 的引用也能看到新值
+    if target is source:
+        return
+    for name in type(target).model_fields:
+        if hasattr(source, name):
+            setattr(target, name, getattr(source, name))
+
+
+def _on_config_change(config: AppConfig, changed: Set[str]):
+    """
+    配置保存或配置文件重新加载后, 同步本模块导出的配置变量
+    账号字典、面板列表和各配置对象都原地更新, 基本类型的变量重新赋值
+    """
+    global _config, proxy_config, cron_expression
+    global is_send_msg, is_send_success_msg, is_send_fail_msg
+    _config = config
+
+    accounts = dict(config.user_datas)
+    user_datas.clear()
+    user_datas.update(accounts)
+    qinglong_datas[:] = get_qinglong_configs()
+    _update_model(qinglong_data, config.qinglong_data)
+    _update_model(global_config, config.global_config)
+    _update_model(notification_config, config.notification_config)
+    _update_model(proxy_pool_config, config.proxy_pool_config)
+    _update_model(backoff_config, config.backoff_config)
+    _update_model(refresher_config, config.refresher_config)
+    _update_model(job_queue_config, config.job_queue_config)
+    _update_model(account_store_config, config.account_store_config)
+    if proxy_config is not None and config.proxy_config is not None:
+        _update_model(proxy_config, config.proxy_config)
+    else:
+        proxy_config = config.proxy_config
+
+    cron_expression = global_config.cron_expression
+    is_send_msg = notification_config.is_send_msg
+    is_send_success_msg = notification_config.is_send_success_msg
+    is_send_fail_msg = notification_config.is_send_fail_msg
+    send_info.update(
+        {key: getattr(notification_config, key) for key in send_info}
+    )
+
+
+_config_manager.subscribe(_on_config_change)
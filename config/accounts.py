@@ -0,0 +1,496 @@
+"""
+京东Cookie自动获取项目 - 账号存储模块
+
+本模块把账号的读写抽象为账号库, 主程序和Web接口都通过账号库访问账号：
+1. json: 账号保存在config.json的user_datas中, 与原来的行为一致
+2. sqlite: 账号保存在SQLite文件中, 按用户名和pt_pin建立索引, 支持分页、部分更新,
+   只在读取到某个账号时才校验该账号, 适合上千个账号
+
+首次使用sqlite且账号库为空时, 自动导入config.json中的user_datas。也可以用命令行导入导出:
+    python -m config.accounts import config.json
+    python -m config.accounts export accounts.json
+"""
+
+import argparse
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from config.settings import ConfigManager, get_config_manager
+from models import AccountConfig, AccountStoreConfig
+from utils import json_codec
+
+
+class AccountRepository:
+    """
+    账号库基类
+    账号以用户名为key, 同一个pt_pin配置了多个账号时以先添加的账号为准
+    """
+
+    def get(self, username: str) -> Optional[AccountConfig]:
+        """
+        获取指定账号
+
+        Args:
+            username: 用户名
+
+        Returns:
+            Optional[AccountConfig]: 账号配置, 不存在时返回None
+        """
+        raise NotImplementedError
+
+    def iter_accounts(self, batch_size: int = 500) -> Iterator[Tuple[str, AccountConfig]]:
+        """
+        按添加顺序逐个返回账号, 每次只从存储中读取一批
+
+        Args:
+            batch_size: 每批读取的账号数
+
+        Returns:
+            Iterator[Tuple[str, AccountConfig]]: (用户名, 账号配置)
+        """
+        raise NotImplementedError
+
+    def list(
+        self, offset: int = 0, limit: int = 50, keyword: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, AccountConfig]], int]:
+        """
+        分页获取账号
+
+        Args:
+            offset: 跳过的账号数
+            limit: 返回的账号数
+            keyword: 按用户名或pt_pin模糊匹配
+
+        Returns:
+            Tuple[List[Tuple[str, AccountConfig]], int]: 本页账号和匹配的账号总数
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """
+        账号总数
+        """
+        raise NotImplementedError
+
+    def save(self, username: str, account: AccountConfig):
+        """
+        添加或替换账号
+
+        Args:
+            username: 用户名
+            account: 账号配置
+        """
+        raise NotImplementedError
+
+    def delete(self, username: str) -> bool:
+        """
+        删除账号
+
+        Returns:
+            bool: 账号存在并已删除返回True
+        """
+        raise NotImplementedError
+
+    def import_accounts(self, accounts: Dict[str, Any], replace: bool = False) -> int:
+        """
+        导入config.json中user_datas格式的账号
+
+        Args:
+            accounts: 用户名到账号配置(dict或AccountConfig)的字典
+            replace: 是否先清空已有账号
+
+        Returns:
+            int: 导入的账号数
+
+        Raises:
+            ValueError: 账号配置校验失败
+        """
+        raise NotImplementedError
+
+    def get_by_pt_pins(self, pt_pins: Iterable[str]) -> Dict[str, AccountConfig]:
+        """
+        获取持有这些pt_pin的账号
+
+        Args:
+            pt_pins: pt_pin列表
+
+        Returns:
+            Dict[str, AccountConfig]: 用户名到账号配置的字典, 每个pt_pin最多一个账号
+        """
+        wanted = set(pt_pins)
+        found = {}
+        for username, account in self.iter_accounts():
+            if account.pt_pin in wanted:
+                wanted.discard(account.pt_pin)
+                found[username] = account
+                if not wanted:
+                    break
+        return found
+
+    def force_update_pt_pins(self) -> List[str]:
+        """
+        需要强制更新的pt_pin
+        """
+        return [
+            account.pt_pin
+            for _, account in self.iter_accounts()
+            if account.force_update is True
+        ]
+
+    def update(self, username: str, fields: Dict[str, Any]) -> AccountConfig:
+        """
+        部分更新账号, 只修改传入的字段
+
+        Args:
+            username: 用户名
+            fields: 要修改的字段
+
+        Returns:
+            AccountConfig: 更新后的账号配置
+
+        Raises:
+            KeyError: 账号不存在
+            ValueError: 字段不存在或校验失败
+        """
+        account = self.get(username)
+        if account is None:
+            raise KeyError(username)
+        unknown = set(fields) - set(AccountConfig.model_fields)
+        if unknown:
+            raise ValueError(f"未知的账号字段: {', '.join(sorted(unknown))}")
+        account = AccountConfig.model_validate({**account.model_dump(), **fields})
+        self.save(username, account)
+        return account
+
+    def export_accounts(self) -> Dict[str, Dict[str, Any]]:
+        """
+        导出为config.json中user_datas的格式
+        """
+        return {
+            username: account.model_dump(exclude_none=True)
+            for username, account in self.iter_accounts()
+        }
+
+    @staticmethod
+    def validate_accounts(accounts: Dict[str, Any]) -> Dict[str, AccountConfig]:
+        """
+        校验待导入的账号, 任何一个账号不合法时都不导入
+        """
+        validated = {}
+        for username, account in accounts.items():
+            if isinstance(account, AccountConfig):
+                validated[username] = account
+                continue
+            try:
+                validated[username] = AccountConfig.model_validate(
+                    {"username": username, **account}
+                )
+            except Exception as e:
+                raise ValueError(f"账号{username}配置错误: {e}") from e
+        return validated
+
+    def close(self):
+        pass
+
+
+class JsonAccountRepository(AccountRepository):
+    """
+    config.json账号库, 读写都经过配置管理器
+    """
+
+    def __init__(self, config_manager: Optional[ConfigManager] = None):
+        """
+        初始化config.json账号库
+
+        Args:
+            config_manager: 配置管理器, 为空时使用全局配置管理器
+        """
+        self.config_manager = config_manager or get_config_manager()
+
+    @property
+    def _accounts(self) -> Dict[str, AccountConfig]:
+        return self.config_manager.get_config().user_datas
+
+    def get(self, username: str) -> Optional[AccountConfig]:
+        return self._accounts.get(username)
+
+    def iter_accounts(self, batch_size: int = 500) -> Iterator[Tuple[str, AccountConfig]]:
+        yield from list(self._accounts.items())
+
+    def list(
+        self, offset: int = 0, limit: int = 50, keyword: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, AccountConfig]], int]:
+        items = list(self._accounts.items())
+        if keyword:
+            items = [
+                (username, account)
+                for username, account in items
+                if keyword in username or keyword in account.pt_pin
+            ]
+        return items[offset : offset + limit], len(items)
+
+    def count(self) -> int:
+        return len(self._accounts)
+
+    def save(self, username: str, account: AccountConfig):
+        self.config_manager.update_account(username, account)
+
+    def delete(self, username: str) -> bool:
+        if username not in self._accounts:
+            return False
+        self.config_manager.remove_account(username)
+        return True
+
+    def import_accounts(self, accounts: Dict[str, Any], replace: bool = False) -> int:
+        validated = self.validate_accounts(accounts)
+        self.config_manager.import_accounts(validated, replace)
+        return len(validated)
+
+
+class SqliteAccountRepository(AccountRepository):
+    """
+    SQLite账号库
+    账号配置以JSON保存, 用户名为主键, pt_pin和force_update单独成列并建立索引
+    """
+
+    def __init__(self, path: str = "accounts.db"):
+        """
+        初始化SQLite账号库
+
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "username TEXT PRIMARY KEY, pt_pin TEXT NOT NULL, "
+            "force_update INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS accounts_pt_pin ON accounts (pt_pin)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS accounts_force_update ON accounts (force_update)"
+        )
+
+    @staticmethod
+    def _load(data: str) -> AccountConfig:
+        return AccountConfig.model_validate(json_codec.loads(data))
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _upsert(self, accounts: Dict[str, AccountConfig]):
+        self._conn.executemany(
+            # 使用UPSERT而不是REPLACE, 修改账号不改变其rowid, 保持添加顺序
+            "INSERT INTO accounts (username, pt_pin, force_update, data) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(username) DO UPDATE SET "
+            "pt_pin = excluded.pt_pin, force_update = excluded.force_update, "
+            "data = excluded.data",
+            [
+                (
+                    username,
+                    account.pt_pin,
+                    int(account.force_update),
+                    json_codec.dumps(account.model_dump(exclude_none=True)),
+                )
+                for username, account in accounts.items()
+            ],
+        )
+
+    def get(self, username: str) -> Optional[AccountConfig]:
+        rows = self._query("SELECT data FROM accounts WHERE username = ?", (username,))
+        return self._load(rows[0][0]) if rows else None
+
+    def iter_accounts(self, batch_size: int = 500) -> Iterator[Tuple[str, AccountConfig]]:
+        last = 0
+        while True:
+            rows = self._query(
+                "SELECT rowid, username, data FROM accounts WHERE rowid > ? "
+                "ORDER BY rowid LIMIT ?",
+                (last, batch_size),
+            )
+            for _, username, data in rows:
+                yield username, self._load(data)
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def list(
+        self, offset: int = 0, limit: int = 50, keyword: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, AccountConfig]], int]:
+        where, params = "", ()
+        if keyword:
+            for char in "\\%_":
+                keyword = keyword.replace(char, "\\" + char)
+            pattern = f"%{keyword}%"
+            where = " WHERE username LIKE ? ESCAPE '\\' OR pt_pin LIKE ? ESCAPE '\\'"
+            params = (pattern, pattern)
+        total = self._query(f"SELECT COUNT(*) FROM accounts{where}", params)[0][0]
+        rows = self._query(
+            f"SELECT username, data FROM accounts{where} ORDER BY rowid LIMIT ? OFFSET ?",
+            params + (limit, offset),
+        )
+        return [(username, self._load(data)) for username, data in rows], total
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM accounts")[0][0]
+
+    def get_by_pt_pins(self, pt_pins: Iterable[str]) -> Dict[str, AccountConfig]:
+        pt_pins = list(set(pt_pins))
+        found = {}
+        # SQLite的参数个数有限制, 分批查询
+        for i in range(0, len(pt_pins), 500):
+            batch = pt_pins[i : i + 500]
+            rows = self._query(
+                "SELECT username, data FROM accounts WHERE rowid IN ("
+                "SELECT MIN(rowid) FROM accounts WHERE pt_pin IN "
+                f"({', '.join('?' * len(batch))}) GROUP BY pt_pin)",
+                tuple(batch),
+            )
+            for username, data in rows:
+                found[username] = self._load(data)
+        return found
+
+    def force_update_pt_pins(self) -> List[str]:
+        return [
+            row[0]
+            for row in self._query("SELECT pt_pin FROM accounts WHERE force_update = 1")
+        ]
+
+    def save(self, username: str, account: AccountConfig):
+        with self._lock:
+            self._upsert({username: account})
+
+    def update(self, username: str, fields: Dict[str, Any]) -> AccountConfig:
+        # 读取和写入放在同一个事务中, 并发的部分更新不会互相覆盖
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM accounts WHERE username = ?", (username,)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(username)
+                unknown = set(fields) - set(AccountConfig.model_fields)
+                if unknown:
+                    raise ValueError(f"未知的账号字段: {', '.join(sorted(unknown))}")
+                account = AccountConfig.model_validate(
+                    {**json_codec.loads(row[0]), **fields}
+                )
+                self._upsert({username: account})
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return account
+
+    def delete(self, username: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM accounts WHERE username = ?", (username,)
+            )
+        return cursor.rowcount == 1
+
+    def import_accounts(self, accounts: Dict[str, Any], replace: bool = False) -> int:
+        validated = self.validate_accounts(accounts)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if replace:
+                    self._conn.execute("DELETE FROM accounts")
+                self._upsert(validated)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(validated)
+
+    def close(self):
+        self._conn.close()
+
+
+_account_repository: Optional[AccountRepository] = None
+_account_repository_key: Optional[tuple] = None
+
+
+def create_account_repository(config: AccountStoreConfig) -> AccountRepository:
+    """
+    按配置创建账号库, sqlite账号库为空时导入config.json中的user_datas
+
+    Args:
+        config: 账号存储配置
+
+    Returns:
+        AccountRepository: 账号库实例
+    """
+    if config.backend != "sqlite":
+        return JsonAccountRepository()
+    repository = SqliteAccountRepository(config.sqlite_path)
+    user_datas = get_config_manager().get_config().user_datas
+    if user_datas and repository.count() == 0:
+        count = repository.import_accounts(user_datas)
+        logger.info(f"已把config.json中的{count}个账号导入{config.sqlite_path}")
+    return repository
+
+
+def get_account_repository(config: Optional[AccountStoreConfig] = None) -> AccountRepository:
+    """
+    获取账号库单例, 账号存储配置变化后重新创建
+
+    Args:
+        config: 账号存储配置, 为空时使用config.json中的account_store_config
+
+    Returns:
+        AccountRepository: 账号库实例
+    """
+    global _account_repository, _account_repository_key
+    if config is None:
+        from config import account_store_config as config
+
+    key = (config.backend, config.sqlite_path if config.backend == "sqlite" else None)
+    if _account_repository is None or key != _account_repository_key:
+        if _account_repository is not None:
+            _account_repository.close()
+        _account_repository = create_account_repository(config)
+        _account_repository_key = key
+    return _account_repository
+
+
+def parse_args():
+    """
+    解析参数
+    """
+    parser = argparse.ArgumentParser(description="账号库导入导出")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="从JSON文件导入账号")
+    import_parser.add_argument("path", help="config.json或只包含user_datas内容的JSON文件")
+    import_parser.add_argument("--replace", action="store_true", help="先清空已有账号")
+    export_parser = subparsers.add_parser("export", help="把账号导出为JSON文件")
+    export_parser.add_argument("path", help="导出的文件路径")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    repository = get_account_repository()
+    if args.command == "import":
+        with open(args.path, "rb") as f:
+            data = json_codec.loads(f.read())
+        data = data.get("user_datas", data)
+        count = repository.import_accounts(data, replace=args.replace)
+        logger.info(f"已导入{count}个账号")
+    else:
+        with open(args.path, "w", encoding="utf-8") as f:
+            f.write(json_codec.dumps({"user_datas": repository.export_accounts()}, indent=True))
+        logger.info(f"已导出{repository.count()}个账号到{args.path}")
+    repository.close()
@@ -9,12 +9,20 @@
 4. 全局配置管理
 5. 通知配置管理
 6. 代理配置管理
+7. 配置文件的原子写入(先写临时文件再改名), 以及监听配置文件变化并在防抖后重新加载,
+   配置变化时通知订阅者, 调度器和刷新流程无需重启即可看到新的账号和配置
 """
 
-import json
+import hashlib
 import os
+import stat
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Set
+
+from loguru import logger
 from models import (
     AppConfig,
     AccountConfig,
@@ -23,6 +31,10 @@ from models import (
     NotificationConfig,
     ProxyConfig,
 )
+from utils import json_codec
+
+# 订阅者回调, 参数为新配置和发生变化的顶层配置项名称(例如 user_datas、global_config)
+ConfigListener = Callable[[AppConfig, Set[str]], None]
 
 
 class ConfigManager:
@@ -40,6 +52,14 @@ class ConfigManager:
         """
         self.config_path = Path(config_path)
         self._config: Optional[AppConfig] = None
+        self._lock = threading.RLock()
+        self._listeners: List[ConfigListener] = []
+        # 最近一次读写的配置文件内容摘要和(mtime, size), 用于跳过没有变化的写入和重新加载
+        self._digest: Optional[str] = None
+        self._signature = None
+        self._snapshot: dict = {}
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
 
     def load_config(self) -> AppConfig:
         """
@@ -55,23 +75,26 @@ class ConfigManager:
             如果配置文件不存在，则创建默认配置
             如果配置已加载，则直接返回缓存的配置
         """
-        if self._config is not None:
-            return self._config
-
-        if not self.config_path.exists():
-            self._config = AppConfig(
-                qinglong_data=QinglongConfig(url="http://127.0.0.1:5700")
-            )
-            self.save_config()
-            return self._config
+        with self._lock:
+            if self._config is not None:
+                return self._config
 
-        try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self._config = AppConfig(**data)
+            if not self.config_path.exists():
+                self._config = AppConfig(
+                    qinglong_data=QinglongConfig(url="http://127.0.0.1:5700")
+                )
+                self.save_config()
                 return self._config
-        except Exception as e:
-            raise RuntimeError(f"加载配置文件失败: {e}")
+
+            try:
+                content = self.config_path.read_bytes()
+                self._config = AppConfig(**json_codec.loads(content))
+            except Exception as e:
+                raise RuntimeError(f"加载配置文件失败: {e}")
+            self._digest = hashlib.sha256(content).hexdigest()
+            self._signature = self._file_signature()
+            self._snapshot = self._config.model_dump(mode="json")
+            return self._config
 
     def save_config(self):
         """
@@ -80,18 +103,180 @@ class ConfigManager:
         Raises:
             RuntimeError: 配置文件保存失败时抛出异常
         """
-        if self._config is None:
-            raise RuntimeError("配置未初始化")
+        with self._lock:
+            if self._config is None:
+                raise RuntimeError("配置未初始化")
+            snapshot = self._config.model_dump(mode="json")
+            content = json_codec.dumpb(snapshot, indent=True)
+            digest = hashlib.sha256(content).hexdigest()
+            if digest != self._digest:
+                try:
+                    self._write_atomic(content)
+                except Exception as e:
+                    raise RuntimeError(f"保存配置文件失败: {e}")
+                self._digest = digest
+                self._signature = self._file_signature()
+            changed = self._changed_sections(snapshot)
+            self._snapshot = snapshot
+            config = self._config
+        self._notify(config, changed)
+
+    def _write_atomic(self, content: bytes):
+        """
+        写入同目录下的临时文件并fsync后改名覆盖配置文件, 写入中途退出不会留下半个配置文件
+        """
+        directory = self.config_path.parent
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{self.config_path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if self.config_path.exists():
+                os.chmod(tmp_path, stat.S_IMODE(self.config_path.stat().st_mode))
+            try:
+                os.replace(tmp_path, self.config_path)
+            except OSError as e:
+                # 例如Docker中单独挂载的配置文件不能被改名覆盖, 只能原地写入
+                logger.warning(f"配置文件无法原子替换, 改为原地写入: {e}")
+                with open(self.config_path, "wb") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.unlink(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _file_signature(self):
         try:
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    self._config.model_dump(mode="json"),
-                    f,
-                    ensure_ascii=False,
-                    indent=2,
+            st = self.config_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _changed_sections(self, snapshot: dict) -> Set[str]:
+        changed = {
+            key
+            for key in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(key) != self._snapshot.get(key)
+        }
+        if "user_datas" in changed:
+            old, new = self._snapshot.get("user_datas") or {}, snapshot["user_datas"]
+            added = new.keys() - old.keys()
+            removed = old.keys() - new.keys()
+            updated = {k for k in new.keys() & old.keys() if new[k] != old[k]}
+            if added or removed or updated:
+                logger.info(
+                    f"账号配置变化: 新增{len(added)}个, 删除{len(removed)}个, 修改{len(updated)}个"
                 )
-        except Exception as e:
-            raise RuntimeError(f"保存配置文件失败: {e}")
+        return changed
+
+    def reload(self) -> bool:
+        """
+        重新读取配置文件, 内容变化时替换当前配置并通知订阅者
+        配置文件不合法时保留当前配置
+
+        Returns:
+            bool: 配置是否发生变化
+        """
+        with self._lock:
+            try:
+                content = self.config_path.read_bytes()
+            except FileNotFoundError:
+                logger.warning(f"配置文件{self.config_path}不存在, 保留当前配置")
+                return False
+            signature = self._file_signature()
+            digest = hashlib.sha256(content).hexdigest()
+            if digest == self._digest:
+                self._signature = signature
+                return False
+            try:
+                config = AppConfig(**json_codec.loads(content))
+            except Exception as e:
+                logger.error(f"重新加载配置文件失败, 保留当前配置: {e}")
+                # 记录下来, 文件再次变化前不重复报错
+                self._signature = signature
+                return False
+            snapshot = config.model_dump(mode="json")
+            changed = self._changed_sections(snapshot)
+            self._config = config
+            self._snapshot = snapshot
+            self._digest = digest
+            self._signature = signature
+        logger.info(f"配置文件已重新加载, 变化的配置项: {', '.join(sorted(changed)) or '无'}")
+        self._notify(config, changed)
+        return True
+
+    def subscribe(self, listener: ConfigListener):
+        """
+        订阅配置变化, 保存配置或重新加载配置文件后调用
+        配置文件变化时在监听线程中调用, 回调应尽快返回
+
+        Args:
+            listener: 回调, 参数为新配置和发生变化的顶层配置项名称
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ConfigListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, config: AppConfig, changed: Set[str]):
+        if not changed:
+            return
+        for listener in list(self._listeners):
+            try:
+                listener(config, changed)
+            except Exception as e:
+                logger.error(f"配置变化回调异常: {e}")
+
+    def start_watching(self, interval: float = 1.0, debounce: float = 0.5):
+        """
+        在后台线程中监听配置文件变化, 文件停止变化debounce秒后重新加载, 重复调用只启动一次
+
+        Args:
+            interval: 检查间隔秒数
+            debounce: 防抖秒数, 编辑器连续多次写入时只重新加载一次
+        """
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self.load_config()
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(interval, debounce), name="config-watcher", daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        """
+        停止监听配置文件
+        """
+        self._watch_stop.set()
+        if self._watch_thread:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _watch(self, interval: float, debounce: float):
+        last_seen = self._signature
+        changed_at = time.monotonic()
+        while not self._watch_stop.wait(interval):
+            signature = self._file_signature()
+            now = time.monotonic()
+            if signature != last_seen:
+                last_seen, changed_at = signature, now
+                continue
+            if signature is None or signature == self._signature:
+                continue
+            if now - changed_at >= debounce:
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"重新加载配置文件异常: {e}")
 
     def update_config(self, config: AppConfig):
         """
@@ -100,8 +285,9 @@ class ConfigManager:
         Args:
             config: 新的配置对象
         """
-        self._config = config
-        self.save_config()
+        with self._lock:
+            self._config = config
+            self.save_config()
 
     def add_account(self, username: str, account: AccountConfig):
         """
@@ -111,10 +297,10 @@ class ConfigManager:
             username: 用户名
             account: 账号配置对象
         """
-        if self._config is None:
+        with self._lock:
             self.load_config()
-        self._config.user_datas[username] = account
-        self.save_config()
+            self._config.user_datas[username] = account
+            self.save_config()
 
     def remove_account(self, username: str):
         """
@@ -123,11 +309,11 @@ class ConfigManager:
         Args:
             username: 用户名
         """
-        if self._config is None:
+        with self._lock:
             self.load_config()
-        if username in self._config.user_datas:
-            del self._config.user_datas[username]
-            self.save_config()
+            if username in self._config.user_datas:
+                del self._config.user_datas[username]
+                self.save_config()
 
     def update_account(self, username: str, account: AccountConfig):
         """
@@ -137,10 +323,25 @@ class ConfigManager:
             username: 用户名
             account: 账号配置对象
         """
-        if self._config is None:
+        with self._lock:
+            self.load_config()
+            self._config.user_datas[username] = account
+            self.save_config()
+
+    def import_accounts(self, accounts: Dict[str, AccountConfig], replace: bool = False):
+        """
+        批量添加账号配置, 只写入一次配置文件
+
+        Args:
+            accounts: 用户名到账号配置对象的字典
+            replace: 是否先删除已有账号
+        """
+        with self._lock:
             self.load_config()
-        self._config.user_datas[username] = account
-        self.save_config()
+            if replace:
+                self._config.user_datas.clear()
+            self._config.user_datas.update(accounts)
+            self.save_config()
 
     def update_qinglong_config(self, config: QinglongConfig):
         """
@@ -149,10 +350,10 @@ class ConfigManager:
         Args:
             config: 青龙面板配置对象
         """
-        if self._config is None:
+        with self._lock:
             self.load_config()
-        self._config.qinglong_data = config
-        self.save_config()
+            self._config.qinglong_data = config
+            self.save_config()
 
     def update_global_config(self, config: GlobalConfig):
         """
@@ -161,10 +362,10 @@ class ConfigManager:
         Args:
             config: 全局配置对象
         """
-        if self._config is None:
+        with self._lock:
             self.load_config()
-        self._config.global_config = config
-        self.save_config()
+            self._config.global_config = config
+            self.save_config()
 
     def update_notification_config(self, config: NotificationConfig):
         """
@@ -173,10 +374,10 @@ class ConfigManager:
         Args:
             config: 通知配置对象
         """
-        if self._config is None:
+        with self._lock:
             self.load_config()
-        self._config.notification_config = config
-        self.save_config()
+            self._config.notification_config = config
+            self.save_config()
 
     def update_proxy_config(self, config: Optional[ProxyConfig]):
         """
@@ -185,10 +386,10 @@ class ConfigManager:
         Args:
             config: 代理配置对象，None表示清除代理
         """
-        if self._config is None:
+        with self._lock:
             self.load_config()
-        self._config.proxy_config = config
-        self.save_config()
+            self._config.proxy_config = config
+            self.save_config()
 
     def get_config(self) -> AppConfig:
         """
@@ -0,0 +1,274 @@
+"""
+京东Cookie自动获取项目 - 账号失败退避与熔断模块
+
+本模块按pt_pin记录账号登录失败情况，对失败进行分类，并基于失败类型计算
+带抖动的指数退避时间。处于熔断状态的账号在退避期内直接跳过，避免反复消耗
+浏览器和验证码识别的资源。
+"""
+
+import json
+import random
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Optional, Union
+from loguru import logger
+
+from utils.tools import hash_pt_pin
+
+
+class FailureType(Enum):
+    """
+    登录失败类型枚举
+    """
+
+    RISK = "risk"
+    WRONG_PASSWORD = "wrong_password"
+    CAPTCHA = "captcha"
+    CONFIG = "config"
+    UNKNOWN = "unknown"
+
+
+class BreakerState(Enum):
+    """
+    熔断器状态枚举
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+# 失败关键字与失败类型的对应关系, 按顺序匹配
+# 短信/语音验证的配置报错(例如"sms_func为no关闭, 跳过短信验证码识别环节")含有"验证码",
+# 需在CAPTCHA之前匹配
+_failure_keywords = [
+    (FailureType.RISK, ("账号存在风险", "实名认证", "安全验证")),
+    (FailureType.WRONG_PASSWORD, ("密码错误", "账号或密码不正确", "账户名与密码不匹配", "密码不正确")),
+    (FailureType.CONFIG, ("sms_func", "voice_func", "sms_webhook未配置")),
+    (FailureType.CAPTCHA, ("滑块验证失败", "二次验证失败", "验证码")),
+]
+
+
+def classify_failure(error: Union[BaseException, str, None]) -> FailureType:
+    """
+    根据异常或报错信息对登录失败进行分类
+
+    Args:
+        error: 异常对象或报错信息
+
+    Returns:
+        FailureType: 失败类型
+    """
+    if error is None:
+        return FailureType.UNKNOWN
+    message = str(error)
+    for failure_type, keywords in _failure_keywords:
+        if any(keyword in message for keyword in keywords):
+            return failure_type
+    return FailureType.UNKNOWN
+
+
+class AccountBreaker:
+    """
+    账号熔断器类
+    按pt_pin维护熔断状态，并持久化到状态文件，跨多次运行生效
+    """
+
+    def __init__(
+        self,
+        state_path: str = "tmp/account_backoff.json",
+        base_delays: Optional[Dict[str, int]] = None,
+        thresholds: Optional[Dict[str, int]] = None,
+        max_delay: int = 7 * 24 * 3600,
+        jitter: float = 0.2,
+    ):
+        """
+        初始化账号熔断器
+
+        Args:
+            state_path: 状态文件路径
+            base_delays: 各失败类型的基础退避秒数
+            thresholds: 各失败类型连续失败多少次后熔断
+            max_delay: 最大退避秒数
+            jitter: 抖动比例, 0.2表示退避时间上下浮动20%
+        """
+        self.state_path = Path(state_path)
+        self.base_delays = base_delays or {}
+        self.thresholds = thresholds or {}
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._states: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取账号熔断状态失败, 将重新记录: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(self._states, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning(f"保存账号熔断状态失败: {e}")
+
+    def _compute_delay(self, failure_type: FailureType, failures: int) -> float:
+        """
+        计算带抖动的指数退避时间
+
+        Args:
+            failure_type: 失败类型
+            failures: 连续失败次数
+
+        Returns:
+            float: 退避秒数
+        """
+        base = self.base_delays.get(failure_type.value, 600)
+        threshold = self.thresholds.get(failure_type.value, 1)
+        exponent = max(failures - threshold, 0)
+        delay = min(base * (2**exponent), self.max_delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def get_state(self, pt_pin: str, now: Optional[float] = None) -> BreakerState:
+        """
+        获取账号当前的熔断状态
+
+        Args:
+            pt_pin: 京东pt_pin
+            now: 当前时间戳, 默认取系统时间
+
+        Returns:
+            BreakerState: 熔断状态
+        """
+        now = now or time.time()
+        state = self._states.get(pt_pin)
+        if not state or not state.get("open_until"):
+            return BreakerState.CLOSED
+        if now < state["open_until"]:
+            return BreakerState.OPEN
+        return BreakerState.HALF_OPEN
+
+    def allow(self, pt_pin: str, now: Optional[float] = None) -> bool:
+        """
+        判断账号本次是否允许尝试登录
+
+        Args:
+            pt_pin: 京东pt_pin
+            now: 当前时间戳, 默认取系统时间
+
+        Returns:
+            bool: 熔断中返回False, 否则返回True
+        """
+        return self.get_state(pt_pin, now) != BreakerState.OPEN
+
+    def should_report(self, pt_pin: str) -> bool:
+        """
+        判断熔断中的账号是否需要上报, 每次熔断只上报一次
+
+        Args:
+            pt_pin: 京东pt_pin
+
+        Returns:
+            bool: 需要上报返回True
+        """
+        with self._lock:
+            state = self._states.get(pt_pin)
+            if not state or state.get("reported"):
+                return False
+            state["reported"] = True
+            self._save()
+            return True
+
+    def get_info(self, pt_pin: str) -> Optional[dict]:
+        """
+        获取账号的熔断记录
+
+        Args:
+            pt_pin: 京东pt_pin
+
+        Returns:
+            Optional[dict]: 熔断记录, 无记录时返回None
+        """
+        state = self._states.get(pt_pin)
+        return dict(state) if state else None
+
+    def record_success(self, pt_pin: str):
+        """
+        记录登录成功, 关闭熔断
+
+        Args:
+            pt_pin: 京东pt_pin
+        """
+        with self._lock:
+            if self._states.pop(pt_pin, None) is not None:
+                self._save()
+
+    def record_failure(
+        self, pt_pin: str, error: Union[BaseException, str, None] = None
+    ) -> BreakerState:
+        """
+        记录登录失败, 达到阈值后打开熔断
+
+        Args:
+            pt_pin: 京东pt_pin
+            error: 失败的异常或报错信息
+
+        Returns:
+            BreakerState: 记录后的熔断状态
+        """
+        failure_type = classify_failure(error)
+        now = time.time()
+        with self._lock:
+            state = self._states.setdefault(pt_pin, {"failures": 0})
+            state["failures"] += 1
+            state["failure_type"] = failure_type.value
+            state["last_error"] = str(error) if error else ""
+            state["last_failure_at"] = now
+
+            threshold = self.thresholds.get(failure_type.value, 1)
+            if state["failures"] < threshold:
+                self._save()
+                return BreakerState.CLOSED
+
+            delay = self._compute_delay(failure_type, state["failures"])
+            state["open_until"] = now + delay
+            state["reported"] = False
+            self._save()
+
+        logger.warning(
+            f"账号{hash_pt_pin(pt_pin)}连续失败{state['failures']}次({failure_type.value}), "
+            f"熔断{int(delay)}秒"
+        )
+        return BreakerState.OPEN
+
+
+_account_breaker: Optional[AccountBreaker] = None
+
+
+def get_account_breaker() -> AccountBreaker:
+    """
+    获取账号熔断器单例
+
+    Returns:
+        AccountBreaker: 账号熔断器实例
+    """
+    global _account_breaker
+    if _account_breaker is None:
+        from config import backoff_config
+
+        _account_breaker = AccountBreaker(
+            state_path=backoff_config.state_path,
+            base_delays=backoff_config.base_delays,
+            thresholds=backoff_config.thresholds,
+            max_delay=backoff_config.max_delay,
+            jitter=backoff_config.jitter,
+        )
+    return _account_breaker
@@ -9,13 +9,13 @@ import asyncio
 import os
 import random
 import re
-import cv2
 from loguru import logger
 from utils.tools import (
     save_img,
     get_img_bytes,
     get_shape_location_by_type,
     get_shape_location_by_color,
+    resolve_color_name,
     rgba2rgb,
     expand_coordinates,
     cv2_save_img,
@@ -23,8 +23,74 @@ from utils.tools import (
     get_word,
     ddddocr_find_files_pic,
 )
-from utils.consts import supported_types, supported_colors
+from utils.consts import supported_types
 from utils.ocr_manager import get_ocr_manager
+from utils.captcha_recorder import get_captcha_recorder
+from core.progress import get_progress_reporter
+from core.metrics import captcha_recognize_duration
+
+
+def parse_text_targets(word: str) -> list:
+    """
+    从文字点选验证码的提示中解析出需要依次点击的文字
+
+    Args:
+        word: 提示文字
+
+    Returns:
+        list: 需要依次点击的文字列表
+
+    Raises:
+        IndexError: 提示文字无法解析时抛出
+    """
+    target_char_list = []
+    if word.find("依次") > 0:
+        target_char_list = list(re.findall(r"[\u4e00-\u9fff]+", word)[1])
+    if word.find("按照次序点选") > 0:
+        target_char_list = list(word.split("请按照次序点选")[1])
+    return target_char_list
+
+
+def locate_text_targets(
+    det, my_ocr, background_bytes: bytes, im, target_char_list: list
+):
+    """
+    检测背景图中的文字并识别, 返回每个目标文字的中心坐标
+
+    Args:
+        det: 文字检测OCR实例
+        my_ocr: 单字识别OCR实例
+        background_bytes: 背景图的bytes, 用于文字检测
+        im: 背景图的cv2图像, 用于裁剪单字
+        target_char_list: 需要依次点击的文字列表
+
+    Returns:
+        tuple: ([[文字, [x, y]], ...], 命中的文字数量)
+    """
+    # 定义【文字, 坐标】的列表
+    target_list = [[x, []] for x in target_char_list]
+    bboxes = det.detection(background_bytes)
+
+    count = 0
+    for bbox in bboxes:
+        # 左上角
+        x1, y1, x2, y2 = bbox
+        # 做了一下扩大
+        expanded_x1, expanded_y1, expanded_x2, expanded_y2 = expand_coordinates(
+            x1, y1, x2, y2, 10
+        )
+        im2 = im[expanded_y1:expanded_y2, expanded_x1:expanded_x2]
+        img_path = cv2_save_img("word", im2)
+        image_bytes = open(img_path, "rb").read()
+        result = my_ocr.classification(image_bytes)
+        if result in target_char_list:
+            for index, target in enumerate(target_list):
+                if result == target[0] and target[0] is not None:
+                    x = x1 + (x2 - x1) / 2
+                    y = y1 + (y2 - y1) / 2
+                    target_list[index][1] = [x, y]
+                    count += 1
+    return target_list, count
 
 
 async def auto_shape(page: Page, retry_times: int = 5):
@@ -35,275 +101,291 @@ async def auto_shape(page: Page, retry_times: int = 5):
         page: Playwright页面对象
         retry_times: 重试次数
     """
+    import cv2
+
     logger.info("开始二次验证")
     ocr_manager = get_ocr_manager()
     ocr = ocr_manager.get_ocr(beta=True)
     det = ocr_manager.get_det()
     my_ocr = ocr_manager.get_my_ocr()
+    recorder = get_captcha_recorder()
 
     for i in range(retry_times + 1):
-        try:
-            # 查找小图
-            await page.wait_for_selector(
-                "div.captcha_footer img", state="visible", timeout=3000
-            )
-        except Exception as e:
-            # 未找到元素，认为成功，退出循环
-            logger.info("未找到二次验证图,退出二次验证识别")
-            break
-
-        # 二次验证失败了
-        if i + 1 == retry_times + 1:
-            raise Exception("二次验证失败了")
-
-        logger.info(f"第{i + 1}次自动识别形状中...")
-        tmp_dir = get_tmp_dir()
-
-        background_img_path = os.path.join(tmp_dir, f"background_img.png")
-        # 获取大图元素，尝试多种选择器
-        background_locator = None
-        background_bounding_box = None
-        
-        # 尝试不同的背景图选择器
-        selectors = ["#cpc_img", "img.captcha-img", ".captcha_background"]
-        for selector in selectors:
+        with logger.contextualize(stage="captcha_shape", attempt=i + 1):
             try:
-                locator = page.locator(selector)
-                if await locator.count() > 0:
-                    background_locator = locator
-                    # 等待元素可见
-                    await locator.wait_for(state="visible", timeout=2000)
-                    # 获取元素的位置和尺寸
-                    background_bounding_box = await locator.bounding_box()
-                    if background_bounding_box:
-                        break
+                # 查找小图
+                await page.wait_for_selector(
+                    "div.captcha_footer img", state="visible", timeout=3000
+                )
             except Exception as e:
-                logger.debug(f"选择器 {selector} 无法找到元素或获取位置: {e}")
+                # 未找到元素，认为成功，退出循环
+                logger.info("未找到二次验证图,退出二次验证识别")
+                recorder.commit(True)
+                break
+
+            # 验证码还在, 上一次的尝试没有通过
+            recorder.commit(False)
+
+            # 二次验证失败了
+            if i + 1 == retry_times + 1:
+                raise Exception("二次验证失败了")
+
+            logger.info(f"第{i + 1}次自动识别形状中...")
+            get_progress_reporter().captcha_attempt("shape", i + 1)
+            tmp_dir = get_tmp_dir()
+
+            background_img_path = os.path.join(tmp_dir, f"background_img.png")
+            # 获取大图元素，尝试多种选择器
+            background_locator = None
+            background_bounding_box = None
         
-        # 如果没有找到合适的元素，刷新重试
-        if not background_locator or not background_bounding_box:
-            logger.info("无法找到背景图元素，尝试刷新验证码")
-            refresh_button = page.locator(".jcap_refresh")
-            if await refresh_button.count() > 0:
-                await refresh_button.click()
-                await asyncio.sleep(random.uniform(1, 3))
-                continue
-            else:
-                logger.error("无法找到刷新按钮，跳过本次尝试")
-                continue
+            # 尝试不同的背景图选择器
+            selectors = ["#cpc_img", "img.captcha-img", ".captcha_background"]
+            for selector in selectors:
+                try:
+                    locator = page.locator(selector)
+                    if await locator.count() > 0:
+                        background_locator = locator
+                        # 等待元素可见
+                        await locator.wait_for(state="visible", timeout=2000)
+                        # 获取元素的位置和尺寸
+                        background_bounding_box = await locator.bounding_box()
+                        if background_bounding_box:
+                            break
+                except Exception as e:
+                    logger.debug(f"选择器 {selector} 无法找到元素或获取位置: {e}")
         
-        backend_top_left_x = background_bounding_box["x"]
-        backend_top_left_y = background_bounding_box["y"]
-
-        # 截取元素区域
-        await page.screenshot(path=background_img_path, clip=background_bounding_box)
+            # 如果没有找到合适的元素，刷新重试
+            if not background_locator or not background_bounding_box:
+                logger.info("无法找到背景图元素，尝试刷新验证码")
+                refresh_button = page.locator(".jcap_refresh")
+                if await refresh_button.count() > 0:
+                    await refresh_button.click()
+                    await asyncio.sleep(random.uniform(1, 3))
+                    continue
+                else:
+                    logger.error("无法找到刷新按钮，跳过本次尝试")
+                    continue
+        
+            backend_top_left_x = background_bounding_box["x"]
+            backend_top_left_y = background_bounding_box["y"]
 
-        # 获取 图片的src 属性和button按键
-        word_img_src = await page.locator("div.captcha_footer img").get_attribute("src")
-        button = page.locator("div.captcha_footer button#submit-btn")
+            # 截取元素区域
+            await page.screenshot(path=background_img_path, clip=background_bounding_box)
 
-        # 找到刷新按钮
-        refresh_button = page.locator(".jcap_refresh")
+            # 获取 图片的src 属性和button按键
+            word_img_src = await page.locator("div.captcha_footer img").get_attribute("src")
+            button = page.locator("div.captcha_footer button#submit-btn")
 
-        # 获取文字图并保存
-        word_img_bytes = get_img_bytes(word_img_src)
-        rgba_word_img_path = save_img("rgba_word_img", word_img_bytes)
+            # 找到刷新按钮
+            refresh_button = page.locator(".jcap_refresh")
 
-        # 图像识别的解法，东哥求放过啊，写不动了
-        if page.locator("div.sp_msg.tip_text", has_text="请点击上图中的").is_visible():
-            logger.info("检测为图像, 开始图像识别......")
-            from utils.tools import crop_center_contour
+            # 获取文字图并保存
+            word_img_bytes = get_img_bytes(word_img_src)
+            rgba_word_img_path = save_img("rgba_word_img", word_img_bytes)
 
-            small_img_path = os.path.join(tmp_dir, f"small_img.png")
-            # 这里是一个标准算法偏差
-            slide_difference = 10
+            # 图像识别的解法，东哥求放过啊，写不动了
+            if await page.locator(
+                "div.sp_msg.tip_text", has_text="请点击上图中的"
+            ).is_visible():
+                logger.info("检测为图像, 开始图像识别......")
+                from utils.tools import crop_center_contour
 
-            try:
-                # 将中间的图截取出来，才能更好的识别
-                result = crop_center_contour(
-                    rgba_word_img_path, small_img_path, min_area=100, padding=1
-                )
-                if result is None:
-                    raise IndexError("截图异常")
-                # 获取要移动的长度
-                target_dict = ddddocr_find_files_pic(
-                    small_img_path, background_img_path, return_dict=True
+                small_img_path = os.path.join(tmp_dir, f"small_img.png")
+                # 这里是一个标准算法偏差
+                slide_difference = 10
+                recorder.begin(
+                    "image",
+                    images={"background": background_img_path, "prompt": word_img_bytes},
+                    bbox=background_bounding_box,
                 )
-                # 提取坐标
-                x1, y1, x2, y2 = target_dict["target"]
-                center_x = (x1 + slide_difference + x2) // 2
-                center_y = (y1 + y2) // 2
-                await asyncio.sleep(random.uniform(0, 1))
 
-                logger.info("已检测到图像，尝试点击中")
-                x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
-                # 点击图片
-                await page.mouse.click(x, y)
-            except IndexError:
-                logger.info(f"识别图像出错,刷新中......")
-                await refresh_button.click()
-
-            await asyncio.sleep(random.uniform(2, 4))
-            continue
-
-        # 文字图是RGBA的，有蒙板识别不了，需要转成RGB
-        rgb_word_img_path = rgba2rgb("rgb_word_img", rgba_word_img_path)
-
-        # 获取问题的文字
-        word = get_word(ocr, rgb_word_img_path)
-
-        if word.find("色") > 0:
-            target_color = word.split("请选出图中")[1].split("的图形")[0]
-            if target_color in supported_colors:
-                logger.info(f"正在点击中......")
-                # 获取点的中心点
-                center_x, center_y = get_shape_location_by_color(
-                    background_img_path, target_color
-                )
-                if center_x is None and center_y is None:
-                    logger.info(f"识别失败,刷新中......")
+                try:
+                    # 将中间的图截取出来，才能更好的识别
+                    result = crop_center_contour(
+                        rgba_word_img_path, small_img_path, min_area=100, padding=1
+                    )
+                    if result is None:
+                        raise IndexError("截图异常")
+                    # 获取要移动的长度
+                    with captcha_recognize_duration.time(type="image"):
+                        target_dict = ddddocr_find_files_pic(
+                            small_img_path, background_img_path, return_dict=True
+                        )
+                    # 提取坐标
+                    x1, y1, x2, y2 = target_dict["target"]
+                    center_x = (x1 + slide_difference + x2) // 2
+                    center_y = (y1 + y2) // 2
+                    await asyncio.sleep(random.uniform(0, 1))
+
+                    logger.info("已检测到图像，尝试点击中")
+                    recorder.update_action({"points": [[center_x, center_y]]})
+                    x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
+                    # 点击图片
+                    await page.mouse.click(x, y)
+                except IndexError:
+                    logger.info(f"识别图像出错,刷新中......")
                     await refresh_button.click()
-                    await asyncio.sleep(random.uniform(2, 4))
-                    continue
-                # 得到网页上的中心点
-                x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
-                # 点击图片
-                await page.mouse.click(x, y)
-                await asyncio.sleep(random.uniform(1, 4))
-                # 点击确定
-                await button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
-            else:
-                logger.info(f"不支持{target_color},刷新中......")
-                # 刷新
-                await refresh_button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
 
-        # 这里是文字验证码了
-        elif word.find("依次") > 0 or word.find("按照次序点选") > 0:
-            logger.info(f"开始文字识别,点击中......")
-            # 获取文字的顺序列表
-            try:
-                if word.find("依次") > 0:
-                    target_char_list = list(re.findall(r"[\u4e00-\u9fff]+", word)[1])
-                if word.find("按照次序点选") > 0:
-                    target_char_list = list(word.split("请按照次序点选")[1])
-            except IndexError:
-                logger.info(f"识别文字出错,刷新中......")
-                await refresh_button.click()
                 await asyncio.sleep(random.uniform(2, 4))
                 continue
 
-            target_char_len = len(target_char_list)
+            # 文字图是RGBA的，有蒙板识别不了，需要转成RGB
+            rgb_word_img_path = rgba2rgb("rgb_word_img", rgba_word_img_path)
 
-            # 识别字数不对
-            if target_char_len < 4:
-                logger.info(f"识别的字数小于4,刷新中......")
-                await refresh_button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
+            # 获取问题的文字
+            word = get_word(ocr, rgb_word_img_path)
+            if word.find("色") > 0:
+                kind = "color"
+            elif word.find("依次") > 0 or word.find("按照次序点选") > 0:
+                kind = "text"
+            else:
+                kind = "shape"
+            recorder.begin(
+                kind,
+                images={"background": background_img_path, "prompt": word_img_bytes},
+                prompt=word,
+                bbox=background_bounding_box,
+            )
+
+            if word.find("色") > 0:
+                target_color = word.split("请选出图中")[1].split("的图形")[0]
+                if resolve_color_name(target_color) is not None:
+                    logger.info(f"正在点击中......")
+                    # 获取点的中心点
+                    with captcha_recognize_duration.time(type="color"):
+                        center_x, center_y = get_shape_location_by_color(
+                            background_img_path, target_color
+                        )
+                    if center_x is None and center_y is None:
+                        logger.info(f"识别失败,刷新中......")
+                        await refresh_button.click()
+                        await asyncio.sleep(random.uniform(2, 4))
+                        continue
+                    recorder.update_action({"points": [[center_x, center_y]]})
+                    # 得到网页上的中心点
+                    x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
+                    # 点击图片
+                    await page.mouse.click(x, y)
+                    await asyncio.sleep(random.uniform(1, 4))
+                    # 点击确定
+                    await button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
+                else:
+                    logger.info(f"不支持{target_color},刷新中......")
+                    # 刷新
+                    await refresh_button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
 
-            # 取前4个的文字
-            target_char_list = target_char_list[:4]
+            # 这里是文字验证码了
+            elif word.find("依次") > 0 or word.find("按照次序点选") > 0:
+                logger.info(f"开始文字识别,点击中......")
+                # 获取文字的顺序列表
+                try:
+                    target_char_list = parse_text_targets(word)
+                except IndexError:
+                    logger.info(f"识别文字出错,刷新中......")
+                    await refresh_button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
 
-            # 定义【文字, 坐标】的列表
-            target_list = [[x, []] for x in target_char_list]
+                target_char_len = len(target_char_list)
 
-            # 获取大图的二进制
-            if not background_locator:
-                # 重新尝试获取背景图元素
-                background_locator = page.locator("#cpc_img")
-                if await background_locator.count() == 0:
-                    logger.info("无法找到背景图元素，刷新中......")
+                # 识别字数不对
+                if target_char_len < 4:
+                    logger.info(f"识别的字数小于4,刷新中......")
                     await refresh_button.click()
                     await asyncio.sleep(random.uniform(2, 4))
                     continue
+
+                # 取前4个的文字
+                target_char_list = target_char_list[:4]
+
+                # 获取大图的二进制
+                if not background_locator:
+                    # 重新尝试获取背景图元素
+                    background_locator = page.locator("#cpc_img")
+                    if await background_locator.count() == 0:
+                        logger.info("无法找到背景图元素，刷新中......")
+                        await refresh_button.click()
+                        await asyncio.sleep(random.uniform(2, 4))
+                        continue
             
-            background_locator_src = await background_locator.get_attribute("src")
-            if not background_locator_src:
-                logger.info("无法获取背景图URL，刷新中......")
-                await refresh_button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
+                background_locator_src = await background_locator.get_attribute("src")
+                if not background_locator_src:
+                    logger.info("无法获取背景图URL，刷新中......")
+                    await refresh_button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
                 
-            background_locator_bytes = get_img_bytes(background_locator_src)
-            bboxes = det.detection(background_locator_bytes)
-
-            count = 0
-            im = cv2.imread(background_img_path)
-            for bbox in bboxes:
-                # 左上角
-                x1, y1, x2, y2 = bbox
-                # 做了一下扩大
-                expanded_x1, expanded_y1, expanded_x2, expanded_y2 = expand_coordinates(
-                    x1, y1, x2, y2, 10
-                )
-                im2 = im[expanded_y1:expanded_y2, expanded_x1:expanded_x2]
-                img_path = cv2_save_img("word", im2)
-                image_bytes = open(img_path, "rb").read()
-                result = my_ocr.classification(image_bytes)
-                if result in target_char_list:
-                    for index, target in enumerate(target_list):
-                        if result == target[0] and target[0] is not None:
-                            x = x1 + (x2 - x1) / 2
-                            y = y1 + (y2 - y1) / 2
-                            target_list[index][1] = [x, y]
-                            count += 1
-
-            if count != target_char_len:
-                logger.info(f"文字识别失败,刷新中......")
-                await refresh_button.click()
+                background_locator_bytes = get_img_bytes(background_locator_src)
+                recorder.add_images({"background_src": background_locator_bytes})
+                with captcha_recognize_duration.time(type="text"):
+                    target_list, count = locate_text_targets(
+                        det,
+                        my_ocr,
+                        background_locator_bytes,
+                        cv2.imread(background_img_path),
+                        target_char_list,
+                    )
+
+                if count != target_char_len:
+                    logger.info(f"文字识别失败,刷新中......")
+                    await refresh_button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
+
+                recorder.update_action({"points": [char[1] for char in target_list]})
+                await asyncio.sleep(random.uniform(0, 1))
+                try:
+                    for char in target_list:
+                        center_x = char[1][0]
+                        center_y = char[1][1]
+                        # 得到网页上的中心点
+                        x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
+                        # 点击图片
+                        await page.mouse.click(x, y)
+                        await asyncio.sleep(random.uniform(1, 4))
+                except IndexError:
+                    logger.info(f"识别文字出错,刷新中......")
+                    await refresh_button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
+                # 点击确定
+                await button.click()
                 await asyncio.sleep(random.uniform(2, 4))
-                continue
 
-            await asyncio.sleep(random.uniform(0, 1))
-            try:
-                for char in target_list:
-                    center_x = char[1][0]
-                    center_y = char[1][1]
+            else:
+                shape_type = word.split("请选出图中的")[1]
+                if shape_type in supported_types:
+                    logger.info(f"已找到图形,点击中......")
+                    if shape_type == "圆环":
+                        shape_type = shape_type.replace("圆环", "圆形")
+                    # 获取点的中心点
+                    with captcha_recognize_duration.time(type="shape"):
+                        center_x, center_y = get_shape_location_by_type(
+                            background_img_path, shape_type
+                        )
+                    if center_x is None and center_y is None:
+                        logger.info(f"识别失败,刷新中......")
+                        await refresh_button.click()
+                        await asyncio.sleep(random.uniform(2, 4))
+                        continue
+                    recorder.update_action({"points": [[center_x, center_y]]})
                     # 得到网页上的中心点
                     x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
                     # 点击图片
                     await page.mouse.click(x, y)
                     await asyncio.sleep(random.uniform(1, 4))
-            except IndexError:
-                logger.info(f"识别文字出错,刷新中......")
-                await refresh_button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
-            # 点击确定
-            await button.click()
-            await asyncio.sleep(random.uniform(2, 4))
-
-        else:
-            shape_type = word.split("请选出图中的")[1]
-            if shape_type in supported_types:
-                logger.info(f"已找到图形,点击中......")
-                if shape_type == "圆环":
-                    shape_type = shape_type.replace("圆环", "圆形")
-                # 获取点的中心点
-                center_x, center_y = get_shape_location_by_type(
-                    background_img_path, shape_type
-                )
-                if center_x is None and center_y is None:
-                    logger.info(f"识别失败,刷新中......")
+                    # 点击确定
+                    await button.click()
+                    await asyncio.sleep(random.uniform(2, 4))
+                    continue
+                else:
+                    logger.info(f"不支持{shape_type},刷新中......")
+                    # 刷新
                     await refresh_button.click()
                     await asyncio.sleep(random.uniform(2, 4))
                     continue
-                # 得到网页上的中心点
-                x, y = backend_top_left_x + center_x, backend_top_left_y + center_y
-                # 点击图片
-                await page.mouse.click(x, y)
-                await asyncio.sleep(random.uniform(1, 4))
-                # 点击确定
-                await button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
-            else:
-                logger.info(f"不支持{shape_type},刷新中......")
-                # 刷新
-                await refresh_button.click()
-                await asyncio.sleep(random.uniform(2, 4))
-                continue
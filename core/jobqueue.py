@@ -0,0 +1,582 @@
+"""
+京东Cookie自动获取项目 - 分布式任务队列模块
+
+本模块提供多台机器共同刷新同一批账号用的任务队列：
+1. 协调进程(main)把每个待刷新账号作为任务入队, 然后收集结果
+2. 工作进程(queue_worker.py, 可以运行在不同机器、使用不同代理)领取任务时获得租约,
+   执行期间定时续约, 完成后确认并写回结果
+3. 租约过期未续约的任务(例如工作进程崩溃)会被重新分配, 超过最大领取次数后以失败结果返回
+任务至少执行一次, 同一账号在极端情况下可能被刷新两次, 不会丢失。
+
+后端:
+- sqlite: 单机多进程共用一个SQLite文件, 依靠SQLite的文件锁保证领取互斥
+- redis: 使用Redis协议(RESP), 多台机器共用, 测试时可用 mock.redis 替代;
+  领取、续约、确认和回收都在 WATCH/MULTI/EXEC 事务中完成, 工作进程在任意两条命令之间崩溃,
+  任务都仍在队列或租约中
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from models import JobQueueConfig
+from utils import json_codec
+
+
+class JobQueue:
+    """
+    任务队列基类
+    任务为dict: id、run_id、payload、attempts; 结果为dict, 至少包含job_id
+    """
+
+    def __init__(self, max_attempts: int = 3):
+        """
+        初始化任务队列
+
+        Args:
+            max_attempts: 任务最多被领取的次数
+        """
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def expired_result(job_id: str, attempts: int) -> Dict[str, Any]:
+        """
+        超过最大领取次数的任务的失败结果
+        """
+        return {
+            "job_id": job_id,
+            "worker": None,
+            "pt_key": None,
+            "error": f"任务租约过期{attempts}次, 不再重新分配",
+        }
+
+    async def enqueue(self, run_id: str, job_id: str, payload: Dict[str, Any]):
+        """
+        任务入队
+
+        Args:
+            run_id: 本次运行的ID, 结果按run_id收集
+            job_id: 任务ID
+            payload: 任务内容
+        """
+        raise NotImplementedError
+
+    async def lease(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        领取一个任务
+
+        Args:
+            worker_id: 工作进程ID
+            lease_seconds: 租约秒数
+
+        Returns:
+            Optional[Dict[str, Any]]: 任务, 队列为空时返回None
+        """
+        raise NotImplementedError
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        续约
+
+        Returns:
+            bool: 租约是否仍属于该工作进程
+        """
+        raise NotImplementedError
+
+    async def ack(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        确认任务完成并写回结果
+
+        Returns:
+            bool: 是否写入成功, 租约已被重新分配时返回False
+        """
+        raise NotImplementedError
+
+    async def fetch_results(self, run_id: str) -> List[Dict[str, Any]]:
+        """
+        取出该次运行已完成的结果, 取出后从队列中删除
+        """
+        raise NotImplementedError
+
+    async def purge(self, run_id: str, job_ids: List[str]):
+        """
+        删除该次运行中未完成的任务和未取出的结果, 协调进程放弃等待时调用
+
+        Args:
+            run_id: 本次运行的ID
+            job_ids: 未完成的任务ID
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SqliteJobQueue(JobQueue):
+    """
+    SQLite任务队列
+    适合单机多进程, 领取任务在 BEGIN IMMEDIATE 事务中完成, 由SQLite文件锁保证互斥
+    """
+
+    def __init__(self, path: str = "jobs.db", max_attempts: int = 3):
+        """
+        初始化SQLite任务队列
+
+        Args:
+            path: SQLite文件路径
+            max_attempts: 任务最多被领取的次数
+        """
+        super().__init__(max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, run_id TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, worker TEXT, lease_until REAL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, result TEXT, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)"
+        )
+
+    def _transaction(self, func, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    async def _run(self, func, *args):
+        return await asyncio.to_thread(self._transaction, func, *args)
+
+    def _enqueue(self, run_id: str, job_id: str, payload: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, run_id, payload, status, created) "
+            "VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, run_id, json_codec.dumps(payload), time.time()),
+        )
+
+    def _lease(self, worker_id: str, lease_seconds: float):
+        now = time.time()
+        expired = self._conn.execute(
+            "SELECT id, attempts FROM jobs WHERE status = 'leased' AND lease_until < ?",
+            (now,),
+        ).fetchall()
+        for job_id, attempts in expired:
+            if attempts >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'done', result = ? WHERE id = ?",
+                    (json_codec.dumps(self.expired_result(job_id, attempts)), job_id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?",
+                    (job_id,),
+                )
+        row = self._conn.execute(
+            "SELECT id, run_id, payload, attempts FROM jobs WHERE status = 'queued' "
+            "ORDER BY created LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, "
+            "attempts = attempts + 1 WHERE id = ?",
+            (worker_id, now + lease_seconds, row[0]),
+        )
+        return {
+            "id": row[0],
+            "run_id": row[1],
+            "payload": json_codec.loads(row[2]),
+            "attempts": row[3] + 1,
+        }
+
+    def _heartbeat(self, job_id: str, worker_id: str, lease_seconds: float):
+        cursor = self._conn.execute(
+            "UPDATE jobs SET lease_until = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def _ack(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = 'done', result = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (json_codec.dumps({**result, "job_id": job_id}), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def _fetch_results(self, run_id: str):
+        rows = self._conn.execute(
+            "SELECT id, result FROM jobs WHERE run_id = ? AND status = 'done'",
+            (run_id,),
+        ).fetchall()
+        self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(r[0],) for r in rows])
+        return [json_codec.loads(r[1]) for r in rows]
+
+    def _purge(self, run_id: str):
+        self._conn.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+
+    async def enqueue(self, run_id: str, job_id: str, payload: Dict[str, Any]):
+        await self._run(self._enqueue, run_id, job_id, payload)
+
+    async def lease(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        return await self._run(self._lease, worker_id, lease_seconds)
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return await self._run(self._heartbeat, job_id, worker_id, lease_seconds)
+
+    async def ack(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return await self._run(self._ack, job_id, worker_id, result)
+
+    async def fetch_results(self, run_id: str) -> List[Dict[str, Any]]:
+        return await self._run(self._fetch_results, run_id)
+
+    async def purge(self, run_id: str, job_ids: List[str]):
+        await self._run(self._purge, run_id)
+
+    async def close(self):
+        self._conn.close()
+
+
+class RespClient:
+    """
+    最小的Redis协议(RESP)客户端, 只支持请求/响应式命令
+    """
+
+    def __init__(self, url: str = "redis://127.0.0.1:6379/0"):
+        """
+        初始化客户端
+
+        Args:
+            url: redis://[:password@]host:port/db
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._call("AUTH", self.password)
+        if self.db:
+            await self._call("SELECT", self.db)
+
+    @staticmethod
+    def _pack(args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = (await self._reader.readline()).rstrip(b"\r\n")
+        if not line:
+            raise ConnectionError("Redis连接已断开")
+        prefix, rest = line[:1], line[1:]
+        if prefix == b"+":
+            return rest.decode()
+        if prefix == b"-":
+            raise RuntimeError(f"Redis返回错误: {rest.decode()}")
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if prefix == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RuntimeError(f"无法解析的Redis响应: {line!r}")
+
+    async def _call(self, *args):
+        self._writer.write(self._pack(args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self, *args):
+        """
+        执行一条命令, 连接断开时重连一次
+        """
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                await self._connect()
+            try:
+                return await self._call(*args)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self._connect()
+                return await self._call(*args)
+
+    async def transaction(
+        self,
+        keys: Sequence[str],
+        build: Callable[[Callable[..., Awaitable[Any]]], Awaitable[Optional[List[tuple]]]],
+        max_retries: int = 20,
+    ) -> Optional[list]:
+        """
+        乐观事务: WATCH keys 后由 build 读取数据并返回要执行的命令, 再用 MULTI/EXEC 原子执行;
+        keys 在此期间被其它连接修改时EXEC不执行任何命令, 重新调用 build
+
+        Args:
+            keys: 要WATCH的键, 为空时只用MULTI/EXEC保证原子执行
+            build: 参数为执行单条命令的函数, 返回命令列表, 返回空时不执行事务
+            max_retries: 冲突时的最大重试次数
+
+        Returns:
+            Optional[list]: 各命令的返回值, build返回空时为None
+        """
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                await self._connect()
+            try:
+                for _ in range(max_retries):
+                    if keys:
+                        await self._call("WATCH", *keys)
+                    commands = await build(self._call)
+                    if not commands:
+                        if keys:
+                            await self._call("UNWATCH")
+                        return None
+                    await self._call("MULTI")
+                    for command in commands:
+                        await self._call(*command)
+                    replies = await self._call("EXEC")
+                    if replies is not None:
+                        return replies
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # 连接断开时服务端丢弃未执行的事务, 下一条命令重新连接
+                self._writer.close()
+                raise
+        raise RuntimeError(f"Redis事务冲突{max_retries}次, 放弃执行")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._writer = None
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Redis协议任务队列
+    {prefix}:queue 为待领取任务ID列表, {prefix}:leases 为租约有序集合(分数为到期时间),
+    {prefix}:job:{id} 保存任务内容, {prefix}:results:{run_id} 为结果列表
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://127.0.0.1:6379/0",
+        prefix: str = "jd_cookie",
+        max_attempts: int = 3,
+    ):
+        """
+        初始化Redis协议任务队列
+
+        Args:
+            url: Redis地址
+            prefix: 键名前缀
+            max_attempts: 任务最多被领取的次数
+        """
+        super().__init__(max_attempts)
+        self.client = RespClient(url)
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    async def enqueue(self, run_id: str, job_id: str, payload: Dict[str, Any]):
+        async def build(call):
+            return [
+                (
+                    "HSET",
+                    self._key("job", job_id),
+                    "run_id",
+                    run_id,
+                    "payload",
+                    json_codec.dumps(payload),
+                    "attempts",
+                    0,
+                ),
+                ("RPUSH", self._key("queue"), job_id),
+            ]
+
+        await self.client.transaction([], build)
+
+    async def _reclaim_expired(self):
+        """
+        把租约过期的任务放回队列头部, 超过最大领取次数的直接写失败结果
+        每个任务在WATCH任务键的事务中处理, 续约、确认和回收都会修改任务键,
+        多个工作进程同时回收或者回收时刚好续约, 只有一个会生效
+        """
+        expired = await self.client.execute(
+            "ZRANGEBYSCORE", self._key("leases"), "-inf", time.time()
+        )
+        for job_id in expired or []:
+            job_key = self._key("job", job_id)
+
+            async def build(call):
+                score = await call("ZSCORE", self._key("leases"), job_id)
+                # 已被其它工作进程回收, 或者刚刚续约
+                if score is None or float(score) > time.time():
+                    return None
+                job = self._parse_job(job_id, await call("HGETALL", job_key))
+                commands = [("ZREM", self._key("leases"), job_id)]
+                if job is None:
+                    return commands
+                if job["attempts"] >= self.max_attempts:
+                    result = self.expired_result(job_id, job["attempts"])
+                    return commands + [
+                        ("RPUSH", self._key("results", job["run_id"]), json_codec.dumps(result)),
+                        ("DEL", job_key),
+                    ]
+                return commands + [
+                    ("HSET", job_key, "worker", ""),
+                    ("LPUSH", self._key("queue"), job_id),
+                ]
+
+            await self.client.transaction([job_key], build)
+
+    @staticmethod
+    def _parse_job(job_id: str, values: Optional[list]) -> Optional[Dict[str, Any]]:
+        fields = dict(zip(values[::2], values[1::2])) if values else {}
+        if "run_id" not in fields or "payload" not in fields:
+            return None
+        return {
+            "id": job_id,
+            "run_id": fields["run_id"],
+            "payload": json_codec.loads(fields["payload"]),
+            "attempts": int(fields.get("attempts") or 0),
+            "worker": fields.get("worker") or None,
+        }
+
+    async def lease(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        await self._reclaim_expired()
+        queue_key = self._key("queue")
+        job_id = None
+
+        async def build(call):
+            # 先查看队首任务, 再在事务中出队并加上租约, 出队和加租约之间不会丢失任务
+            nonlocal job_id
+            job_id = await call("LINDEX", queue_key, 0)
+            if job_id is None:
+                return None
+            job_key = self._key("job", job_id)
+            return [
+                ("LPOP", queue_key),
+                ("ZADD", self._key("leases"), time.time() + lease_seconds, job_id),
+                ("HSET", job_key, "worker", worker_id),
+                ("HINCRBY", job_key, "attempts", 1),
+                ("HGETALL", job_key),
+            ]
+
+        replies = await self.client.transaction([queue_key], build)
+        if replies is None:
+            return None
+        job = self._parse_job(job_id, replies[-1])
+        if job is None:
+            await self.client.execute("ZREM", self._key("leases"), job_id)
+            await self.client.execute("DEL", self._key("job", job_id))
+            return None
+        job.pop("worker")
+        return job
+
+    async def _owned(self, call, job_id: str, worker_id: str) -> bool:
+        owner = await call("HGET", self._key("job", job_id), "worker")
+        score = await call("ZSCORE", self._key("leases"), job_id)
+        return owner == worker_id and score is not None
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        async def build(call):
+            if not await self._owned(call, job_id, worker_id):
+                return None
+            return [
+                ("ZADD", self._key("leases"), time.time() + lease_seconds, job_id),
+                # 同时修改任务键, 使正在回收该任务的事务失效
+                ("HSET", self._key("job", job_id), "worker", worker_id),
+            ]
+
+        return await self.client.transaction([self._key("job", job_id)], build) is not None
+
+    async def ack(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        job_key = self._key("job", job_id)
+
+        async def build(call):
+            if not await self._owned(call, job_id, worker_id):
+                return None
+            run_id = await call("HGET", job_key, "run_id")
+            return [
+                ("ZREM", self._key("leases"), job_id),
+                (
+                    "RPUSH",
+                    self._key("results", run_id),
+                    json_codec.dumps({**result, "job_id": job_id}),
+                ),
+                ("DEL", job_key),
+            ]
+
+        return await self.client.transaction([job_key], build) is not None
+
+    async def fetch_results(self, run_id: str) -> List[Dict[str, Any]]:
+        results = []
+        while True:
+            data = await self.client.execute("LPOP", self._key("results", run_id))
+            if data is None:
+                return results
+            results.append(json_codec.loads(data))
+
+    async def purge(self, run_id: str, job_ids: List[str]):
+        for job_id in job_ids:
+            await self.client.execute("LREM", self._key("queue"), 0, job_id)
+            await self.client.execute("ZREM", self._key("leases"), job_id)
+            await self.client.execute("DEL", self._key("job", job_id))
+        await self.client.execute("DEL", self._key("results", run_id))
+
+    async def close(self):
+        await self.client.close()
+
+
+def get_job_queue(config: Optional[JobQueueConfig] = None) -> JobQueue:
+    """
+    按配置创建任务队列
+
+    Args:
+        config: 任务队列配置, 为空时使用config.json中的job_queue_config
+
+    Returns:
+        JobQueue: 任务队列实例
+    """
+    if config is None:
+        from config import job_queue_config as config
+
+    if config.backend == "redis":
+        logger.info(f"使用Redis协议任务队列: {config.redis_url}")
+        return RedisJobQueue(config.redis_url, config.prefix, config.max_attempts)
+    logger.info(f"使用SQLite任务队列: {config.sqlite_path}")
+    return SqliteJobQueue(config.sqlite_path, config.max_attempts)
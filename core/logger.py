@@ -6,7 +6,9 @@
 
 from loguru import logger
 import os
+import traceback
 from config import global_config
+from utils import json_codec
 
 # 确保日志目录存在
 LOG_DIR = "logs"
@@ -15,6 +17,9 @@ os.makedirs(LOG_DIR, exist_ok=True)
 # 移除默认的控制台输出
 logger.remove()
 
+# 运行ID和pt_pin标识通过 logger.contextualize 绑定, 未绑定时写入占位值
+logger.configure(extra={"run_id": "-", "pt_pin": "-"})
+
 # 配置控制台输出
 logger.add(
     sink=lambda msg: print(msg, end=""),  # 使用lambda确保日志输出正确
@@ -27,11 +32,12 @@ logger.add(
 logger.add(
     sink=os.path.join(LOG_DIR, "app.log"),
     level=global_config.log_level or "INFO",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+    format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {extra[run_id]} | {extra[pt_pin]} | {name}:{function}:{line} - {message}",
     rotation="1 week",  # 每周轮换一次日志文件
     retention="4 weeks",  # 保留4周的日志文件
     compression="zip",  # 压缩旧日志文件
-    encoding="utf-8"
+    encoding="utf-8",
+    enqueue=True,  # 在后台线程中写文件, 不阻塞事件循环
 )
 
 # 配置错误日志输出
@@ -42,8 +48,64 @@ logger.add(
     rotation="1 week",
     retention="4 weeks",
     compression="zip",
-    encoding="utf-8"
+    encoding="utf-8",
+    enqueue=True,
 )
 
+
+def json_format(record) -> str:
+    """
+    把日志转换为一行JSON, 通过 logger.contextualize 或 logger.bind 绑定的
+    run_id、pt_pin、stage、attempt、duration_ms 等字段作为顶层字段输出
+
+    Args:
+        record: loguru的日志record
+
+    Returns:
+        str: loguru格式字符串
+    """
+    data = {
+        "time": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "message": record["message"],
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+    }
+    for key, value in record["extra"].items():
+        if key == "json" or value == "-" or value is None:
+            continue
+        data[key] = value if isinstance(value, (str, int, float, bool)) else str(value)
+    if record["exception"]:
+        data["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json"] = json_codec.dumps(data)
+    return "{extra[json]}\n"
+
+
+# 配置JSON Lines日志输出, 供日志统计和Web日志查看使用
+if global_config.enable_json_log:
+    logger.add(
+        sink=os.path.join(LOG_DIR, "app.jsonl"),
+        level=global_config.log_level or "INFO",
+        format=json_format,
+        rotation="1 week",
+        retention="4 weeks",
+        compression="zip",
+        encoding="utf-8",
+        enqueue=True,
+    )
+
+# 写日志的同时增量更新app.log的检索索引, 在后台线程中执行, 不阻塞写日志的一方;
+# 索引模块自己的日志不触发解析, 避免sink重入
+if global_config.enable_log_index:
+    from core.logindex import get_log_index
+
+    logger.add(
+        sink=get_log_index().sink,
+        level=global_config.log_level or "INFO",
+        filter=lambda record: record["name"] != "core.logindex",
+        enqueue=True,
+    )
+
 # 导出logger实例
 __all__ = ["logger"]
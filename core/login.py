@@ -7,15 +7,76 @@
 from playwright.async_api import Playwright, Page
 import asyncio
 import random
+import time
 from loguru import logger
-from typing import Union, Optional
+from typing import Dict, Union, Optional
 import traceback
 from utils.consts import jd_login_url, user_agent as default_user_agent
-from config import global_config, proxy_config
+import config
+from config import global_config
 from core.captcha import auto_move_slide, auto_shape
-from utils.tools import validate_proxy_config, desensitize_account
+from utils.tools import validate_proxy_config, desensitize_account, hash_pt_pin
 from api.send import SendApi
 from utils.tools import send_msg
+from core.backoff import classify_failure
+from core.exceptions import LoginError
+from core.metrics import browser_launches, login_duration, logins
+
+# 记录每个账号最近一次登录失败的原因, 供调用方做失败分类
+_login_errors: Dict[str, str] = {}
+
+
+def pop_login_error(user: str) -> Optional[str]:
+    """
+    取出账号最近一次登录失败的原因
+
+    Args:
+        user: 用户名
+
+    Returns:
+        Optional[str]: 失败原因，无记录时返回None
+    """
+    return _login_errors.pop(user, None)
+
+
+def get_login_error(user: str) -> Optional[str]:
+    """
+    查看账号最近一次登录失败的原因, 不取出
+
+    Args:
+        user: 用户名
+
+    Returns:
+        Optional[str]: 失败原因, 无记录时返回None
+    """
+    return _login_errors.get(user)
+
+
+_default_proxy: Optional[dict] = None
+_default_proxy_key: Optional[tuple] = None
+
+
+def get_default_proxy() -> Optional[dict]:
+    """
+    获取proxy_config中的代理, proxy_config变化(包括热加载)后重新校验
+
+    Returns:
+        Optional[dict]: playwright的proxy参数, 未配置或配置无效时返回None
+    """
+    global _default_proxy, _default_proxy_key
+    # 热加载可能把proxy_config从None换成新对象, 每次从config模块读取
+    proxy = config.proxy_config.model_dump(exclude_none=True) if config.proxy_config else {}
+    key = tuple(sorted(proxy.items()))
+    if key != _default_proxy_key:
+        _default_proxy_key = key
+        _default_proxy = None
+        if proxy:
+            is_proxy_valid, msg = validate_proxy_config(proxy)
+            if not is_proxy_valid:
+                logger.error(msg)
+            else:
+                _default_proxy = proxy
+    return _default_proxy
 
 
 async def check_notice(page: Page):
@@ -25,8 +86,8 @@ async def check_notice(page: Page):
     Args:
         page: Playwright页面对象
     """
+    logger.info("检查登录是否报错")
     try:
-        logger.info("检查登录是否报错")
         notice = await page.wait_for_function(
             """
             () => {
@@ -36,10 +97,10 @@ async def check_notice(page: Page):
             """,
             timeout=3000,
         )
-        raise RuntimeError(notice)
     except Exception:
         logger.info("登录未发现报错")
         return
+    raise LoginError(await notice.json_value())
 
 
 async def sms_recognition(
@@ -212,6 +273,7 @@ async def get_jd_pt_key(
     sms_func: str = "no",
     sms_webhook: Optional[str] = None,
     voice_func: str = "no",
+    proxy: Optional[dict] = None,
 ) -> Union[str, None]:
     """
     获取京东pt_key
@@ -227,10 +289,58 @@ async def get_jd_pt_key(
         sms_func: 短信验证码处理方式
         sms_webhook: 短信验证码webhook地址
         voice_func: 语音验证码处理方式
+        proxy: 代理池分配的代理, 为空时使用proxy_config
 
     Returns:
         Union[str, None]: 京东pt_key，获取失败返回None
     """
+    start = time.perf_counter()
+    with logger.contextualize(pt_pin=hash_pt_pin(pt_pin), stage="browser"):
+        try:
+            pt_key = await _get_jd_pt_key(
+                playwright,
+                user,
+                password,
+                user_type,
+                auto_switch,
+                mode,
+                sms_func,
+                sms_webhook,
+                voice_func,
+                proxy,
+            )
+        except Exception:
+            logins.inc(outcome="error")
+            login_duration.observe(time.perf_counter() - start, outcome="error")
+            raise
+        duration = time.perf_counter() - start
+        logger.bind(duration_ms=round(duration * 1000)).info(
+            f"浏览器登录结束, {'已' if pt_key else '未'}获取到pt_key"
+        )
+    if pt_key:
+        outcome = "success"
+    else:
+        outcome = classify_failure(get_login_error(user)).value
+    logins.inc(outcome=outcome)
+    login_duration.observe(duration, outcome=outcome)
+    return pt_key
+
+
+async def _get_jd_pt_key(
+    playwright: Playwright,
+    user: str,
+    password: str,
+    user_type: str,
+    auto_switch: bool,
+    mode: str,
+    sms_func: str,
+    sms_webhook: Optional[str],
+    voice_func: str,
+    proxy: Optional[dict],
+) -> Union[str, None]:
+    """
+    使用浏览器登录京东获取pt_key, 参数见get_jd_pt_key
+    """
     import random
 
     headless = global_config.headless
@@ -242,25 +352,25 @@ async def get_jd_pt_key(
     )
 
     # 检查代理配置
-    proxy = None
-    if proxy_config:
-        is_proxy_valid, msg = validate_proxy_config(
-            proxy_config.model_dump(exclude_none=True)
-        )
-        if not is_proxy_valid:
-            logger.error(msg)
-        else:
-            proxy = proxy_config.model_dump(exclude_none=True)
-            logger.info(f"使用代理: {proxy['server']}")
+    proxy = proxy or get_default_proxy()
+    if proxy and proxy.get("server") != "http://":
+        logger.info(f"使用代理: {proxy['server']}")
     else:
+        proxy = None
         logger.info("未配置代理")
 
-    browser = await playwright.chromium.launch(
-        headless=headless, args=args, proxy=proxy
-    )
+    try:
+        browser = await playwright.chromium.launch(
+            headless=headless, args=args, proxy=proxy
+        )
+    except Exception:
+        browser_launches.inc(result="failed")
+        raise
+    browser_launches.inc(result="success")
     
     desensitized_user = desensitize_account(user, global_config.enable_desensitize)
-    
+    _login_errors.pop(user, None)
+
     try:
         # 使用配置的UA或默认UA
         user_agent = global_config.user_agent or default_user_agent
@@ -274,8 +384,9 @@ async def get_jd_pt_key(
             page.on("pageerror", lambda error: logger.error(f"页面错误: {error}"))
             page.on("requestfailed", lambda request: logger.warning(f"请求失败: {request.url} - {request.failure}"))
             
-            logger.info(f"开始登录京东，访问登录页面: {jd_login_url}")
-            await page.goto(jd_login_url, wait_until="networkidle", timeout=30000)
+            login_url = global_config.jd_login_url or jd_login_url
+            logger.info(f"开始登录京东，访问登录页面: {login_url}")
+            await page.goto(login_url, wait_until="networkidle", timeout=30000)
 
             if user_type == "qq":
                 await page.get_by_role("checkbox").check(timeout=5000)
@@ -453,6 +564,7 @@ async def get_jd_pt_key(
                         
                     except Exception as e:
                         logger.error(f"{desensitized_user} 验证码处理失败: {e}")
+                        _login_errors[user] = str(e)
                         traceback.print_exc()
                         return None
 
@@ -490,10 +602,12 @@ async def get_jd_pt_key(
                     return pt_key
 
             logger.warning(f"{desensitized_user} 未在cookie中找到pt_key")
+            _login_errors.setdefault(user, "未在cookie中找到pt_key")
             return None
 
         except Exception as e:
             logger.error(f"{desensitized_user} 登录过程中发生错误: {e}")
+            _login_errors[user] = str(e)
             traceback.print_exc()
             return None
 
@@ -501,6 +615,7 @@ async def get_jd_pt_key(
             await context.close()
     except Exception as e:
         logger.error(f"{desensitized_user} 浏览器操作过程中发生错误: {e}")
+        _login_errors[user] = str(e)
         traceback.print_exc()
         return None
     finally:
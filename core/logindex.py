@@ -0,0 +1,417 @@
+"""
+京东Cookie自动获取项目 - 日志检索索引模块
+
+本模块为 logs/app.log 及其轮换后的文件(app.<时间>.log、app.<时间>.log.zip)建立SQLite索引：
+1. 作为loguru sink在写日志的同时增量解析新写入的行, 每个文件只记录已解析到的偏移量
+2. 文件以第一行的哈希识别, app.log轮换改名、压缩后不会重复解析; 被loguru按保留期删除的文件,
+   对应的索引也一并删除
+3. 按时间范围、级别、pt_pin标识、运行ID和关键字检索, 使用(时间, ID)游标分页, 不需要读取日志文件
+索引作为sink挂在它所解析的logger上, 本模块不通过loguru输出日志, 解析失败只写到stderr,
+避免索引自己的日志再次触发解析。
+"""
+
+import hashlib
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# app.log的行格式, 兼容不带运行ID和pt_pin标识的旧格式
+_LINE_RE = re.compile(
+    r"^(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d{3})?) \| "
+    r"(?P<level>\w+)\s*\| "
+    r"(?:(?P<run_id>[\w-]+) \| (?P<pt_pin>[\w-]+) \| )?"
+    r"(?P<location>\S+:\S+:\d+) - (?P<message>.*)$"
+)
+
+_LEVELS = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+
+# 格式中未绑定运行ID或pt_pin时的占位值
+EMPTY_FIELD = "-"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    fingerprint TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0,
+    last_entry INTEGER
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT NOT NULL,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    levelno INTEGER NOT NULL,
+    run_id TEXT,
+    pt_pin TEXT,
+    location TEXT,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries (ts, id);
+CREATE INDEX IF NOT EXISTS idx_entries_pt_pin ON entries (pt_pin, ts);
+CREATE INDEX IF NOT EXISTS idx_entries_run_id ON entries (run_id, ts);
+CREATE INDEX IF NOT EXISTS idx_entries_file ON entries (file);
+"""
+
+
+def _parse_time(text: str) -> float:
+    # 比strptime快很多, 首次为大文件建索引时有明显差别
+    return datetime(
+        int(text[0:4]),
+        int(text[5:7]),
+        int(text[8:10]),
+        int(text[11:13]),
+        int(text[14:16]),
+        int(text[17:19]),
+        int(text[20:23]) * 1000 if len(text) > 19 else 0,
+    ).timestamp()
+
+
+@contextmanager
+def _open_log(path: Path) -> Iterator:
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            with archive.open(archive.namelist()[0]) as f:
+                yield f
+    else:
+        with open(path, "rb") as f:
+            yield f
+
+
+class LogIndex:
+    """
+    日志检索索引类
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        db_path: str = "tmp/log_index.db",
+        name: str = "app",
+        interval: float = 2,
+        batch_size: int = 1000,
+    ):
+        """
+        初始化日志索引
+
+        Args:
+            log_dir: 日志目录
+            db_path: 索引文件路径
+            name: 日志文件名(不含扩展名)
+            interval: 作为sink时两次增量解析的最小间隔秒数
+            batch_size: 每批写入索引的行数
+        """
+        self.log_dir = Path(log_dir)
+        self.db_path = Path(db_path)
+        self.name = name
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_update = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.db_path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        """
+        关闭索引文件
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def log_files(self) -> List[Path]:
+        """
+        当前和轮换后的日志文件, 当前的app.log排在最后
+        """
+        files = sorted(
+            set(self.log_dir.glob(f"{self.name}.*.log"))
+            | set(self.log_dir.glob(f"{self.name}.*.log.zip"))
+        )
+        current = self.log_dir / f"{self.name}.log"
+        if current.exists():
+            files.append(current)
+        return files
+
+    def sink(self, message):
+        """
+        loguru sink, 距离上次解析超过interval秒时增量解析日志文件, 应以enqueue=True注册
+        """
+        if time.monotonic() - self._last_update >= self.interval:
+            self.update()
+
+    def update(self) -> int:
+        """
+        增量解析所有日志文件
+
+        Returns:
+            int: 新增的索引条数
+        """
+        with self._lock:
+            self._last_update = time.monotonic()
+            conn = self._connect()
+            added = 0
+            seen = set()
+            for path in self.log_files():
+                try:
+                    fingerprint, count = self._index_file(
+                        conn, path, path.name == f"{self.name}.log"
+                    )
+                except (OSError, zipfile.BadZipFile) as e:
+                    # 文件可能正在被轮换或压缩, 下次再解析
+                    print(f"解析日志文件{path}失败: {e}", file=sys.stderr)
+                    continue
+                if fingerprint:
+                    seen.add(fingerprint)
+                added += count
+            self._remove_deleted(conn, seen)
+            return added
+
+    def _index_file(self, conn: sqlite3.Connection, path: Path, current: bool):
+        with _open_log(path) as f:
+            first = f.readline()
+            if not first.endswith(b"\n"):
+                return None, 0
+            fingerprint = hashlib.sha1(first).hexdigest()
+            row = conn.execute(
+                "SELECT offset, complete, last_entry, path FROM files WHERE fingerprint = ?",
+                (fingerprint,),
+            ).fetchone()
+            if row and row[1]:
+                if row[3] != str(path):
+                    conn.execute(
+                        "UPDATE files SET path = ? WHERE fingerprint = ?",
+                        (str(path), fingerprint),
+                    )
+                return fingerprint, 0
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 其它进程可能已经解析了这部分, 在写锁内重新读取偏移量
+                row = conn.execute(
+                    "SELECT offset, complete, last_entry FROM files WHERE fingerprint = ?",
+                    (fingerprint,),
+                ).fetchone()
+                offset, complete, last_entry = row if row else (0, 0, None)
+                if complete:
+                    conn.execute("COMMIT")
+                    return fingerprint, 0
+                f.seek(offset)
+                added, offset, last_entry = self._index_lines(
+                    conn, f, fingerprint, offset, last_entry
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (fingerprint, path, offset, complete, last_entry) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (fingerprint, str(path), offset, 0 if current else 1, last_entry),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return fingerprint, added
+
+    def _index_lines(self, conn, f, fingerprint: str, offset: int, last_entry):
+        added = 0
+        rows: List[list] = []
+        # 上一次解析的最后一条日志可能还有未写完的续行(例如异常堆栈)
+        continuation: List[str] = []
+
+        def flush():
+            nonlocal last_entry
+            if continuation and last_entry is not None:
+                conn.execute(
+                    "UPDATE entries SET message = message || ? WHERE id = ?",
+                    ("\n" + "\n".join(continuation), last_entry),
+                )
+            continuation.clear()
+            if rows:
+                conn.executemany(
+                    "INSERT INTO entries (file, ts, level, levelno, run_id, pt_pin, location, message) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                last_entry = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                rows.clear()
+
+        for line in f:
+            if not line.endswith(b"\n"):
+                # 还没写完的行留到下次解析
+                break
+            offset += len(line)
+            text = line.decode("utf-8", "replace").rstrip("\r\n")
+            match = _LINE_RE.match(text)
+            if match is None:
+                if rows:
+                    rows[-1][7] += "\n" + text
+                else:
+                    continuation.append(text)
+                continue
+            if len(rows) >= self.batch_size:
+                flush()
+            level = match["level"]
+            rows.append(
+                [
+                    fingerprint,
+                    _parse_time(match["time"]),
+                    level,
+                    _LEVELS.get(level, _LEVELS["INFO"]),
+                    match["run_id"] or EMPTY_FIELD,
+                    match["pt_pin"] or EMPTY_FIELD,
+                    match["location"],
+                    match["message"],
+                ]
+            )
+            added += 1
+        flush()
+        return added, offset, last_entry
+
+    @staticmethod
+    def _remove_deleted(conn: sqlite3.Connection, seen: set):
+        rows = conn.execute("SELECT fingerprint FROM files WHERE complete = 1").fetchall()
+        for (fingerprint,) in rows:
+            if fingerprint in seen:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM entries WHERE file = ?", (fingerprint,))
+            conn.execute("DELETE FROM files WHERE fingerprint = ?", (fingerprint,))
+            conn.execute("COMMIT")
+
+    def search(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        level: Optional[str] = None,
+        pt_pin: Optional[str] = None,
+        run_id: Optional[str] = None,
+        keyword: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        检索日志, 按时间从新到旧返回
+
+        Args:
+            start: 开始时间(包含)
+            end: 结束时间(不包含)
+            level: 最低日志级别, 例如 WARNING 返回 WARNING、ERROR、CRITICAL
+            pt_pin: pt_pin标识, 即 utils.tools.hash_pt_pin 的结果
+            run_id: 运行ID
+            keyword: 日志内容包含的关键字
+            cursor: 上一页返回的next_cursor
+            limit: 每页条数
+
+        Returns:
+            Dict[str, Any]: items为日志列表, next_cursor为下一页游标, 没有下一页时为None
+
+        Raises:
+            ValueError: 级别或游标无效
+        """
+        self.update()
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end.timestamp())
+        if level:
+            if level.upper() not in _LEVELS:
+                raise ValueError(f"未知的日志级别: {level}")
+            clauses.append("levelno >= ?")
+            params.append(_LEVELS[level.upper()])
+        if pt_pin:
+            clauses.append("pt_pin = ?")
+            params.append(pt_pin)
+        if run_id:
+            clauses.append("run_id = ?")
+            params.append(run_id)
+        if keyword:
+            clauses.append("instr(message, ?) > 0")
+            params.append(keyword)
+        if cursor:
+            try:
+                cursor_ts, cursor_id = cursor.split(":")
+                cursor_ts, cursor_id = float(cursor_ts), int(cursor_id)
+            except ValueError:
+                raise ValueError(f"无效的游标: {cursor}")
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params.extend([cursor_ts, cursor_ts, cursor_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT id, ts, level, run_id, pt_pin, location, message FROM entries "
+                    f"{where} ORDER BY ts DESC, id DESC LIMIT ?",
+                    (*params, limit + 1),
+                )
+                .fetchall()
+            )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][1]!r}:{rows[-1][0]}"
+        return {
+            "items": [
+                {
+                    "id": row[0],
+                    "timestamp": datetime.fromtimestamp(row[1]).isoformat(
+                        sep=" ", timespec="milliseconds"
+                    ),
+                    "level": row[2],
+                    "run_id": None if row[3] == EMPTY_FIELD else row[3],
+                    "pt_pin": None if row[4] == EMPTY_FIELD else row[4],
+                    "location": row[5],
+                    "message": row[6],
+                }
+                for row in rows
+            ],
+            "next_cursor": next_cursor,
+        }
+
+
+_log_index: Optional[LogIndex] = None
+
+
+def get_log_index() -> Optional[LogIndex]:
+    """
+    获取日志索引单例, 未启用日志索引时返回None
+
+    Returns:
+        Optional[LogIndex]: 日志索引实例
+    """
+    global _log_index
+    from config import global_config
+
+    if not global_config.enable_log_index:
+        return None
+    if _log_index is None:
+        _log_index = LogIndex(db_path=global_config.log_index_path)
+    return _log_index
@@ -0,0 +1,395 @@
+"""
+京东Cookie自动获取项目 - 运行指标模块
+
+本模块提供Prometheus文本格式的运行指标, 不依赖prometheus_client：
+1. 计数器和直方图, 按标签区分, 可以在任意线程中更新
+2. Web服务通过 /metrics 暴露指标; 定时任务和任务队列工作进程可以启动独立的指标端口
+3. 多进程模式下工作进程随结果把增量指标发回协调进程合并,
+   子进程运行时把指标写入文件, 由调度器合并
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+# 默认的直方图分桶, 单位为秒, 覆盖识别器的毫秒级到浏览器登录的分钟级
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """
+    指标基类
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        初始化指标
+
+        Args:
+            name: 指标名
+            documentation: 指标说明
+            labelnames: 标签名
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"指标{self.name}的标签应为{self.labelnames}, 实际为{tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """
+        返回 (样本名, 标签名, 标签值, 值)
+        """
+        raise NotImplementedError
+
+    def snapshot(self, reset: bool = False) -> List[list]:
+        """
+        导出各标签的值, 可以序列化为JSON或在进程间传递
+
+        Args:
+            reset: 导出后是否清零
+        """
+        with self._lock:
+            items = [[list(key), self._copy(value)] for key, value in self._values.items()]
+            if reset:
+                self._values.clear()
+        return items
+
+    def merge(self, items: List[list]):
+        """
+        合并其它进程导出的值
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(Metric):
+    """
+    计数器
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        增加计数
+
+        Args:
+            amount: 增加的值
+            labels: 标签
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """
+        获取指定标签的计数
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, self.labelnames, key, value
+
+    def merge(self, items: List[list]):
+        with self._lock:
+            for key, value in items:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram(Metric):
+    """
+    直方图, 值为 [各分桶计数, 总和, 次数]
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        初始化直方图
+
+        Args:
+            name: 指标名
+            documentation: 指标说明
+            labelnames: 标签名
+            buckets: 分桶上界, 自动补上+Inf
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+    def observe(self, value: float, **labels):
+        """
+        记录一次观测值
+
+        Args:
+            value: 观测值
+            labels: 标签
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        记录代码块的耗时(秒), 代码块抛出异常时同样记录
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        """
+        获取指定标签的观测次数
+        """
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, self._copy(value)) for key, value in self._values.items())
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", names, key + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", self.labelnames, key, total
+            yield f"{self.name}_count", self.labelnames, key, count
+
+    def merge(self, items: List[list]):
+        with self._lock:
+            for key, (counts, total, count) in items:
+                key = tuple(key)
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+                for i, bucket_count in enumerate(counts[: len(self.buckets)]):
+                    state[0][i] += bucket_count
+                state[1] += total
+                state[2] += count
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"指标{metric.name}已注册为不同的类型或标签")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        注册计数器, 同名指标已存在时返回已有的指标
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        注册直方图, 同名指标已存在时返回已有的指标
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        输出Prometheus文本格式
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labelnames, labelvalues, value in metric.samples():
+                lines.append(
+                    f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, reset: bool = False) -> Dict[str, List[list]]:
+        """
+        导出所有指标的值
+
+        Args:
+            reset: 导出后是否清零, 工作进程用来发送增量
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        items = {metric.name: metric.snapshot(reset) for metric in metrics}
+        return {name: values for name, values in items.items() if values}
+
+    def merge(self, snapshot: Optional[Dict[str, List[list]]]):
+        """
+        合并其它进程导出的值, 未注册的指标忽略
+        """
+        for name, items in (snapshot or {}).items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            try:
+                metric.merge(items)
+            except Exception as e:
+                logger.warning(f"合并指标{name}失败: {e}")
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    获取指标注册表单例
+
+    Returns:
+        MetricsRegistry: 指标注册表
+    """
+    return _registry
+
+
+cookie_checks = _registry.counter(
+    "jdcookie_cookie_checks_total", "JD_COOKIE检测次数", ("result",)
+)
+refreshes = _registry.counter(
+    "jdcookie_refreshes_total", "账号刷新次数", ("result",)
+)
+logins = _registry.counter(
+    "jdcookie_logins_total", "浏览器登录次数, outcome为success或失败类型", ("outcome",)
+)
+login_duration = _registry.histogram(
+    "jdcookie_login_duration_seconds", "浏览器登录耗时", ("outcome",)
+)
+browser_launches = _registry.counter(
+    "jdcookie_browser_launches_total", "浏览器启动次数", ("result",)
+)
+captcha_attempts = _registry.counter(
+    "jdcookie_captcha_attempts_total",
+    "验证码尝试次数, type为slide/shape/color/text/image",
+    ("type", "result"),
+)
+captcha_recognize_duration = _registry.histogram(
+    "jdcookie_captcha_recognize_seconds", "验证码识别耗时", ("type",)
+)
+qinglong_requests = _registry.counter(
+    "jdcookie_qinglong_requests_total",
+    "青龙接口请求次数, status为HTTP状态码分类或error",
+    ("method", "uri", "status"),
+)
+qinglong_request_duration = _registry.histogram(
+    "jdcookie_qinglong_request_duration_seconds", "青龙接口请求耗时", ("method", "uri")
+)
+notifications = _registry.counter(
+    "jdcookie_notifications_total", "通知发送次数", ("channel", "result")
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    在后台线程中启动独立的指标端口, 供没有Web服务的定时任务和工作进程使用
+
+    Args:
+        port: 端口, 0表示随机端口
+        host: 监听地址
+
+    Returns:
+        ThreadingHTTPServer: HTTP服务, 调用shutdown()停止
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Prometheus指标地址: http://{host}:{server.server_address[1]}/metrics")
+    return server
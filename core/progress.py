@@ -0,0 +1,171 @@
+"""
+京东Cookie自动获取项目 - 刷新进度模块
+
+本模块收集每个账号的刷新进度(阶段、耗时、验证码尝试次数)，推送给订阅者(例如Web的websocket)：
+1. track(user) 标记当前协程正在处理的账号, 之后的刷新阶段和验证码尝试自动归属到该账号
+2. emit 发出进度事件, 没有订阅者时只更新快照, 不影响刷新速度
+3. snapshot 返回每个账号的最新进度和成功失败计数
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# 当前协程正在处理的账号, 随await传递, 并发处理多个账号时互不影响
+_current_account: ContextVar[Optional[dict]] = ContextVar(
+    "progress_account", default=None
+)
+
+# 结束状态, 收到后该账号计入完成数
+FINAL_STAGES = ("success", "failed", "skipped", "cancelled")
+
+
+class ProgressReporter:
+    """
+    刷新进度上报类
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        """
+        初始化进度上报
+
+        Args:
+            queue_size: 每个订阅者的队列长度, 满了丢弃最旧的事件
+        """
+        self.queue_size = queue_size
+        self._subscribers: List[asyncio.Queue] = []
+        self.task_id: Optional[str] = None
+        self.started_at = time.time()
+        self.accounts: Dict[str, dict] = {}
+
+    def reset(self, task_id: Optional[str] = None):
+        """
+        开始新的一次运行, 清空快照
+
+        Args:
+            task_id: 任务ID
+        """
+        self.task_id = task_id
+        self.started_at = time.time()
+        self.accounts = {}
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        订阅进度事件
+
+        Returns:
+            asyncio.Queue: 事件队列
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    @staticmethod
+    def _display_name(user: str) -> str:
+        from config import global_config
+        from utils.tools import desensitize_account
+
+        return desensitize_account(user, global_config.enable_desensitize)
+
+    def emit(self, stage: str, user: Optional[str] = None, **fields: Any):
+        """
+        发出进度事件
+
+        Args:
+            stage: 阶段, 例如 start、http、browser、captcha、update、success、failed
+            user: 用户名, 为空时使用track标记的账号
+            fields: 其它字段, 例如 detail、duration
+        """
+        account = _current_account.get()
+        if user is None:
+            if account is None:
+                return
+            user = account["user"]
+        now = time.time()
+        event = {
+            "type": "progress",
+            "task_id": self.task_id,
+            "user": self._display_name(user),
+            "stage": stage,
+            "timestamp": now,
+            **fields,
+        }
+        if account is not None and account["user"] == user:
+            event.setdefault("elapsed", round(now - account["start"], 3))
+            event.setdefault("captcha_attempts", account["captcha_attempts"])
+        self.accounts[event["user"]] = event
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def captcha_attempt(self, kind: str, attempt: int):
+        """
+        记录一次验证码尝试
+
+        Args:
+            kind: 验证码类型, 例如 slide、shape
+            attempt: 第几次尝试
+        """
+        account = _current_account.get()
+        if account is None:
+            return
+        account["captcha_attempts"] += 1
+        self.emit("captcha", detail=kind, attempt=attempt)
+
+    @contextmanager
+    def track(self, user: str):
+        """
+        标记当前协程正在处理的账号
+
+        Args:
+            user: 用户名
+        """
+        token = _current_account.set(
+            {"user": user, "start": time.time(), "captcha_attempts": 0}
+        )
+        self.emit("start")
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.emit("cancelled")
+            raise
+        finally:
+            _current_account.reset(token)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        进度快照: 每个账号的最新事件, 以及完成数、成功数、失败数和每分钟完成数
+        """
+        finished = [e for e in self.accounts.values() if e["stage"] in FINAL_STAGES]
+        minutes = max(time.time() - self.started_at, 1) / 60
+        return {
+            "task_id": self.task_id,
+            "accounts": dict(self.accounts),
+            "finished": len(finished),
+            "success": sum(e["stage"] == "success" for e in finished),
+            "failed": sum(e["stage"] == "failed" for e in finished),
+            "per_minute": round(len(finished) / minutes, 2),
+        }
+
+
+_progress_reporter: Optional[ProgressReporter] = None
+
+
+def get_progress_reporter() -> ProgressReporter:
+    """
+    获取进度上报单例
+
+    Returns:
+        ProgressReporter: 进度上报实例
+    """
+    global _progress_reporter
+    if _progress_reporter is None:
+        _progress_reporter = ProgressReporter()
+    return _progress_reporter
@@ -0,0 +1,471 @@
+"""
+京东Cookie自动获取项目 - 代理池模块
+
+本模块管理多个出口代理：
+1. 代理配置只在加载时校验一次, 校验失败的代理直接丢弃
+2. 定期通过每个代理请求探测地址, 记录是否可用和首字节耗时(TTFB)
+3. 按最近登录成功率和TTFB给代理评分, 账号优先使用评分最高且当前占用最少的代理
+4. pt_pin与代理的绑定关系持久化到状态文件, 跨多次运行保持同一出口IP,
+   绑定的代理不可用或评分过低时才重新分配
+分配和归还代理只修改内存, 变化由后台任务定期在线程中写入状态文件, 关闭时再写入一次。
+多进程模式和任务队列模式下每个进程各自持有代理池, 保存时合并其它进程写入的状态;
+按占用数分散出口只在本进程内生效。
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl, 只依赖原子替换
+    fcntl = None
+
+import aiohttp
+from loguru import logger
+
+from core.backoff import FailureType, classify_failure
+from models import ProxyConfig
+from utils.tools import validate_proxy_config
+
+# TTFB的参考值(秒), TTFB等于该值时延迟系数为0.5
+_REFERENCE_TTFB = 1.0
+# TTFB的指数平滑系数
+_TTFB_ALPHA = 0.3
+# 探测结果的字段, 保存时本进程探测过的代理以本进程为准
+_PROBE_KEYS = ("ttfb", "healthy", "probe_failures")
+
+
+@contextmanager
+def _state_file_lock(path: Path):
+    """
+    跨进程锁住状态文件的读取-合并-写入过程
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_json_atomic(path: Path, data: dict):
+    """
+    写入同目录下的临时文件后改名覆盖, 写入中途退出不会留下不完整的JSON
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ProxyPool:
+    """
+    代理池类
+    负责代理的健康探测、评分、分配以及账号与代理的绑定
+    """
+
+    def __init__(
+        self,
+        proxies: List[ProxyConfig],
+        probe_url: str = "https://plogin.m.jd.com/login/login",
+        probe_interval: float = 300,
+        probe_timeout: float = 10,
+        window: int = 20,
+        min_score: float = 0.2,
+        state_path: str = "tmp/proxy_pool.json",
+        save_interval: float = 10,
+    ):
+        """
+        初始化代理池
+
+        Args:
+            proxies: 代理列表
+            probe_url: 健康探测地址
+            probe_interval: 健康探测间隔秒数
+            probe_timeout: 健康探测超时秒数
+            window: 参与评分的最近登录次数
+            min_score: 账号绑定的代理评分低于该值时重新分配
+            state_path: 状态文件路径
+            save_interval: 后台写入状态文件的间隔秒数
+        """
+        self.proxies: Dict[str, dict] = {}
+        for proxy in proxies:
+            data = proxy.model_dump(exclude_none=True)
+            ok, msg = validate_proxy_config(data)
+            if not ok or data.get("server") in (None, "http://"):
+                logger.error(f"代理{data.get('server')}配置无效, 已忽略: {msg}")
+                continue
+            self.proxies[data["server"]] = data
+        self.probe_url = probe_url
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.window = window
+        self.min_score = min_score
+        self.state_path = Path(state_path)
+        self.save_interval = save_interval
+        self.in_use: Dict[str, int] = {server: 0 for server in self.proxies}
+        self._lock = threading.Lock()
+        # 串行化本进程内的保存, 跨进程由状态文件锁保证
+        self._save_lock = threading.Lock()
+        self._probe_task: Optional[asyncio.Task] = None
+        self._save_task: Optional[asyncio.Task] = None
+        self._started = False
+        # 自上次保存以来本进程的变化, 保存时合并到状态文件中
+        self._affinity_changes: Dict[str, str] = {}
+        self._pending_results: Dict[str, List[int]] = {}
+        self._probed: set = set()
+        state = self._load()
+        self.affinity: Dict[str, str] = {
+            pt_pin: server
+            for pt_pin, server in state.get("affinity", {}).items()
+            if server in self.proxies
+        }
+        self.stats: Dict[str, dict] = {
+            server: {
+                "results": [],
+                "ttfb": None,
+                "healthy": True,
+                "probe_failures": 0,
+                **state.get("stats", {}).get(server, {}),
+            }
+            for server in self.proxies
+        }
+
+    def _load(self) -> dict:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取代理池状态失败, 将重新记录: {e}")
+            return {}
+
+    def _take_changes(self) -> Optional[dict]:
+        """
+        取出自上次保存以来本进程的变化, 调用方需持有self._lock
+
+        Returns:
+            Optional[dict]: 变化和当前状态的副本, 没有变化时返回None
+        """
+        if not (self._affinity_changes or self._pending_results or self._probed):
+            return None
+        changes = {
+            "affinity": dict(self._affinity_changes),
+            "results": {s: list(r) for s, r in self._pending_results.items()},
+            "probed": set(self._probed),
+            "stats": {
+                server: dict(stats, results=list(stats["results"]))
+                for server, stats in self.stats.items()
+            },
+        }
+        self._affinity_changes.clear()
+        self._pending_results.clear()
+        self._probed.clear()
+        return changes
+
+    def _restore_changes(self, changes: dict):
+        """
+        保存失败时把取出的变化放回, 下次保存时重试, 调用方需持有self._lock
+        """
+        for pt_pin, server in changes["affinity"].items():
+            self._affinity_changes.setdefault(pt_pin, server)
+        for server, results in changes["results"].items():
+            self._pending_results[server] = results + self._pending_results.get(server, [])
+        self._probed |= changes["probed"]
+
+    def _write_state(self, changes: dict) -> tuple:
+        """
+        合并状态文件中其它进程保存的状态后原子写入, 不访问本进程的可变状态
+        本进程修改过的绑定关系以本进程为准, 其余采用文件中的; 本进程的登录结果追加到文件中的结果之后;
+        本进程探测过的代理使用本进程的探测结果
+
+        Returns:
+            tuple: 合并后的 (绑定关系, 代理统计)
+        """
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with _state_file_lock(self.state_path):
+            state = self._load()
+            affinity = {
+                pt_pin: server
+                for pt_pin, server in state.get("affinity", {}).items()
+                if server in self.proxies
+            }
+            affinity.update(changes["affinity"])
+            saved_stats = state.get("stats", {})
+            merged_stats = {}
+            for server, stats in changes["stats"].items():
+                saved = saved_stats.get(server)
+                merged_stats[server] = stats
+                if saved is None:
+                    continue
+                if server not in changes["probed"]:
+                    for key in _PROBE_KEYS:
+                        if key in saved:
+                            stats[key] = saved[key]
+                results = list(saved.get("results", []))
+                results.extend(changes["results"].get(server, []))
+                stats["results"] = results[-self.window :]
+            _write_json_atomic(
+                self.state_path, {"affinity": affinity, "stats": merged_stats}
+            )
+        return affinity, merged_stats
+
+    def _apply_state(self, affinity: Dict[str, str], stats: Dict[str, dict]):
+        """
+        采用合并后的状态, 保留写入期间本进程新产生的变化, 调用方需持有self._lock
+        """
+        affinity.update(self._affinity_changes)
+        for server, merged in stats.items():
+            merged["results"] = (
+                merged["results"] + self._pending_results.get(server, [])
+            )[-self.window :]
+            if server in self._probed:
+                for key in _PROBE_KEYS:
+                    merged[key] = self.stats[server][key]
+        self.affinity = affinity
+        self.stats = stats
+
+    def _save(self):
+        """
+        把本进程的变化写入状态文件, 会读写文件和等待跨进程锁, 不要在事件循环中直接调用
+        """
+        with self._save_lock:
+            with self._lock:
+                changes = self._take_changes()
+            if changes is None:
+                return
+            try:
+                affinity, stats = self._write_state(changes)
+            except Exception as e:
+                logger.warning(f"保存代理池状态失败: {e}")
+                with self._lock:
+                    self._restore_changes(changes)
+                return
+            with self._lock:
+                self._apply_state(affinity, stats)
+
+    async def save(self):
+        """
+        在线程中保存状态文件
+        """
+        await asyncio.to_thread(self._save)
+
+    def score(self, server: str) -> float:
+        """
+        代理评分, 范围0~1, 不可用的代理为0
+        成功率使用拉普拉斯平滑, 没有登录记录时为0.5; 延迟系数为 1 / (1 + TTFB / 1秒)
+
+        Args:
+            server: 代理地址
+
+        Returns:
+            float: 评分
+        """
+        stats = self.stats[server]
+        if not stats["healthy"]:
+            return 0.0
+        results = stats["results"]
+        success_rate = (sum(results) + 1) / (len(results) + 2)
+        ttfb = stats["ttfb"]
+        latency_factor = 1.0 if ttfb is None else 1 / (1 + ttfb / _REFERENCE_TTFB)
+        return success_rate * latency_factor
+
+    def _pick(self) -> Optional[str]:
+        if not self.proxies:
+            return None
+        healthy = [s for s in self.proxies if self.stats[s]["healthy"]]
+        if not healthy:
+            logger.warning("代理池中没有探测可用的代理, 使用评分最高的代理")
+            healthy = list(self.proxies)
+        # 占用越多的代理越不优先, 并行登录时分散到不同出口
+        return max(healthy, key=lambda s: self.score(s) / (1 + self.in_use[s]))
+
+    def acquire(self, pt_pin: str) -> Optional[dict]:
+        """
+        为账号分配代理, 优先使用绑定的代理
+
+        Args:
+            pt_pin: 京东pt_pin
+
+        Returns:
+            Optional[dict]: playwright的proxy参数, 代理池为空时返回None
+        """
+        with self._lock:
+            server = self.affinity.get(pt_pin)
+            if server is None or self.score(server) < self.min_score:
+                previous = server
+                server = self._pick()
+                if server is None:
+                    return None
+                if previous and previous != server:
+                    logger.info(
+                        f"账号绑定的代理{previous}评分过低({self.score(previous):.2f}), "
+                        f"改用{server}"
+                    )
+                self.affinity[pt_pin] = server
+                self._affinity_changes[pt_pin] = server
+            self.in_use[server] += 1
+            return dict(self.proxies[server])
+
+    def release(
+        self, server: str, success: bool, error: Optional[str] = None
+    ):
+        """
+        归还代理并记录登录结果
+        账密错误、账号风险和短信验证配置错误与出口无关, 只归还不计入评分
+
+        Args:
+            server: 代理地址
+            success: 是否登录成功
+            error: 登录失败的报错信息
+        """
+        if server not in self.proxies:
+            return
+        with self._lock:
+            self.in_use[server] = max(self.in_use[server] - 1, 0)
+            if not success and classify_failure(error) in (
+                FailureType.WRONG_PASSWORD,
+                FailureType.RISK,
+                FailureType.CONFIG,
+            ):
+                return
+            result = 1 if success else 0
+            results = self.stats[server]["results"]
+            results.append(result)
+            del results[: -self.window]
+            self._pending_results.setdefault(server, []).append(result)
+
+    async def _probe_one(self, session: aiohttp.ClientSession, server: str):
+        proxy = self.proxies[server]
+        if not server.startswith("http"):
+            # aiohttp不支持socks5代理, 这类代理只按登录结果评分
+            return
+        auth = None
+        if proxy.get("username"):
+            auth = aiohttp.BasicAuth(proxy["username"], proxy.get("password", ""))
+        start = time.perf_counter()
+        try:
+            async with session.get(
+                self.probe_url, proxy=server, proxy_auth=auth, allow_redirects=False
+            ) as response:
+                ttfb = time.perf_counter() - start
+                healthy = response.status < 500
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"代理{server}探测失败: {e!r}")
+            ttfb, healthy = None, False
+        with self._lock:
+            # 保存时会替换self.stats, 在锁内获取
+            stats = self.stats[server]
+            self._probed.add(server)
+            if healthy:
+                previous = stats["ttfb"]
+                stats["ttfb"] = (
+                    ttfb
+                    if previous is None
+                    else previous * (1 - _TTFB_ALPHA) + ttfb * _TTFB_ALPHA
+                )
+                stats["probe_failures"] = 0
+            else:
+                stats["probe_failures"] += 1
+            stats["healthy"] = healthy
+
+    async def probe(self):
+        """
+        探测所有代理一次
+        """
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.probe_timeout)
+        ) as session:
+            await asyncio.gather(*[self._probe_one(session, s) for s in self.proxies])
+        await self.save()
+        logger.info(
+            "代理池探测完成: "
+            + ", ".join(f"{s} 评分{self.score(s):.2f}" for s in self.proxies)
+        )
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.warning(f"代理池探测异常: {e}")
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.save()
+
+    async def start(self):
+        """
+        首次使用前探测一次, 然后在后台定期探测
+        """
+        if self._started or not self.proxies:
+            return
+        self._started = True
+        await self.probe()
+        self._probe_task = asyncio.create_task(self._probe_loop())
+        self._save_task = asyncio.create_task(self._save_loop())
+
+    async def close(self):
+        """
+        停止后台探测和保存, 最后保存一次状态
+        """
+        for task in (self._probe_task, self._save_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._probe_task = self._save_task = None
+        self._started = False
+        await self.save()
+
+
+_proxy_pool: Optional[ProxyPool] = None
+_proxy_pool_key: Optional[str] = None
+
+
+def get_proxy_pool() -> Optional[ProxyPool]:
+    """
+    获取代理池单例, 未启用代理池时返回None; proxy_pool_config变化(包括热加载)后重新创建,
+    已创建的代理池由持有它的刷新阶段关闭
+
+    Returns:
+        Optional[ProxyPool]: 代理池实例
+    """
+    global _proxy_pool, _proxy_pool_key
+    from config import proxy_pool_config
+
+    if not proxy_pool_config.enable or not proxy_pool_config.proxies:
+        return None
+    key = proxy_pool_config.model_dump_json()
+    if _proxy_pool is None or key != _proxy_pool_key:
+        _proxy_pool = ProxyPool(
+            proxy_pool_config.proxies,
+            probe_url=proxy_pool_config.probe_url,
+            probe_interval=proxy_pool_config.probe_interval,
+            probe_timeout=proxy_pool_config.probe_timeout,
+            window=proxy_pool_config.window,
+            min_score=proxy_pool_config.min_score,
+            state_path=proxy_pool_config.state_path,
+        )
+        _proxy_pool_key = key
+    return _proxy_pool
@@ -0,0 +1,310 @@
+"""
+京东Cookie自动获取项目 - pt_key刷新链模块
+
+本模块把获取pt_key的方式组织成按成本从低到高排列的刷新链：
+1. http: 调用本地配置的兑换接口(例如wskey兑换、长期会话重放服务)，只发一次HTTP请求
+2. browser: 使用Playwright完整登录京东
+前一阶段失败时才执行下一阶段，不适用于该账号的阶段(例如没有wskey时的http)直接跳过，
+每个阶段单独统计次数、跳过次数、成功率和耗时，用于评估浏览器登录被省下了多少。
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from loguru import logger
+
+from models import AccountConfig
+from utils import json_codec
+
+
+class Refresher:
+    """
+    刷新阶段基类
+    子类实现refresh, 成功返回pt_key, 失败返回None或抛出异常;
+    不适用于某些账号的阶段重写applies, 刷新链会直接跳过
+    """
+
+    name = "base"
+
+    def applies(self, account: AccountConfig) -> bool:
+        return True
+
+    async def refresh(self, user: str, account: AccountConfig) -> Optional[str]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class HttpExchangeRefresher(Refresher):
+    """
+    HTTP兑换刷新阶段
+    POST {"username", "pt_pin", "wskey"} 到兑换接口, 接口返回 {"pt_key": "..."} 或
+    {"cookie": "pt_key=...;pt_pin=...;"}, 返回的pt_key检测有效后才会使用;
+    没有配置wskey的账号不请求兑换接口
+    """
+
+    name = "http"
+
+    def __init__(self, exchange_url: str, timeout: float = 10, verify: bool = True):
+        """
+        初始化HTTP兑换刷新阶段
+
+        Args:
+            exchange_url: 兑换接口地址
+            timeout: 请求超时秒数
+            verify: 是否检测兑换得到的pt_key有效
+        """
+        self.exchange_url = exchange_url
+        self.timeout = timeout
+        self.verify = verify
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json_codec.dumps,
+            )
+        return self._session
+
+    @staticmethod
+    def parse_pt_key(data: Any, pt_pin: str) -> Optional[str]:
+        """
+        从兑换接口的响应中解析pt_key, cookie中的pt_pin与账号不一致时视为失败
+
+        Args:
+            data: 兑换接口的响应
+            pt_pin: 账号的pt_pin
+
+        Returns:
+            Optional[str]: pt_key
+        """
+        if not isinstance(data, dict):
+            return None
+        if isinstance(data.get("data"), dict):
+            data = data["data"]
+        if data.get("pt_key"):
+            return data["pt_key"]
+        cookie = data.get("cookie") or data.get("value") or ""
+        pt_key = re.search(r"pt_key=([^;]+)", cookie)
+        cookie_pt_pin = re.search(r"pt_pin=([^;]+)", cookie)
+        if not pt_key or (cookie_pt_pin and cookie_pt_pin.group(1) != pt_pin):
+            return None
+        return pt_key.group(1)
+
+    def applies(self, account: AccountConfig) -> bool:
+        return bool(account.wskey)
+
+    async def refresh(self, user: str, account: AccountConfig) -> Optional[str]:
+        session = await self._get_session()
+        payload = {"username": user, "pt_pin": account.pt_pin, "wskey": account.wskey}
+        async with session.post(self.exchange_url, json=payload) as response:
+            if response.status != 200:
+                logger.info(f"兑换接口返回{response.status}")
+                return None
+            data = await response.json(loads=json_codec.loads, content_type=None)
+        pt_key = self.parse_pt_key(data, account.pt_pin)
+        if not pt_key or not self.verify:
+            return pt_key
+
+        from utils.ck import check_ck
+
+        result = await check_ck(f"pt_key={pt_key};pt_pin={account.pt_pin};")
+        return pt_key if result["success"] else None
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+class BrowserRefresher(Refresher):
+    """
+    浏览器登录刷新阶段, 调用get_jd_pt_key完整登录京东
+    """
+
+    name = "browser"
+
+    def __init__(self, playwright, mode: Optional[str] = None, proxy_pool=None):
+        """
+        初始化浏览器登录刷新阶段
+
+        Args:
+            playwright: Playwright实例
+            mode: 运行模式
+            proxy_pool: 代理池, 为空时使用proxy_config
+        """
+        self.playwright = playwright
+        self.mode = mode
+        self.proxy_pool = proxy_pool
+
+    async def refresh(self, user: str, account: AccountConfig) -> Optional[str]:
+        from core.login import get_jd_pt_key, get_login_error
+
+        proxy = None
+        if self.proxy_pool:
+            await self.proxy_pool.start()
+            proxy = self.proxy_pool.acquire(account.pt_pin)
+        pt_key = None
+        try:
+            pt_key = await get_jd_pt_key(
+                self.playwright,
+                user,
+                account.password,
+                account.user_type,
+                account.pt_pin,
+                account.auto_switch,
+                self.mode,
+                account.sms_func or "no",
+                account.sms_webhook,
+                account.voice_func or "no",
+                proxy=proxy,
+            )
+        finally:
+            if proxy:
+                self.proxy_pool.release(
+                    proxy["server"], bool(pt_key), get_login_error(user)
+                )
+        return pt_key
+
+    async def close(self):
+        if self.proxy_pool:
+            await self.proxy_pool.close()
+
+
+class RefresherChain:
+    """
+    刷新链类
+    依次执行各刷新阶段, 第一个拿到pt_key的阶段即为结果
+    """
+
+    def __init__(self, refreshers: List[Refresher]):
+        """
+        初始化刷新链
+
+        Args:
+            refreshers: 按成本从低到高排列的刷新阶段
+        """
+        self.refreshers = refreshers
+        self.stats: Dict[str, Dict[str, float]] = {
+            refresher.name: {"attempts": 0, "skips": 0, "successes": 0, "errors": 0, "seconds": 0.0}
+            for refresher in refreshers
+        }
+
+    async def refresh(self, user: str, account: AccountConfig) -> Optional[str]:
+        """
+        获取pt_key
+
+        Args:
+            user: 用户名
+            account: 账号配置
+
+        Returns:
+            Optional[str]: pt_key, 所有阶段都失败时返回None
+        """
+        from core.progress import get_progress_reporter
+
+        progress = get_progress_reporter()
+        for refresher in self.refreshers:
+            stats = self.stats[refresher.name]
+            if not refresher.applies(account):
+                stats["skips"] += 1
+                continue
+            progress.emit(refresher.name)
+            stats["attempts"] += 1
+            start = time.perf_counter()
+            with logger.contextualize(stage=refresher.name):
+                try:
+                    pt_key = await refresher.refresh(user, account)
+                except Exception as e:
+                    logger.warning(f"{refresher.name}刷新阶段异常: {e}")
+                    stats["errors"] += 1
+                    pt_key = None
+                seconds = time.perf_counter() - start
+                stats["seconds"] += seconds
+                stage_logger = logger.bind(duration_ms=round(seconds * 1000))
+                if pt_key:
+                    stats["successes"] += 1
+                    stage_logger.info(f"{refresher.name}刷新阶段获取pt_key成功")
+                    return pt_key
+                stage_logger.info(f"{refresher.name}刷新阶段未获取到pt_key")
+        return None
+
+    def merge_stats(self, stats: Dict[str, Dict[str, float]]):
+        """
+        合并其它刷新链(例如工作进程中的刷新链)的统计
+
+        Args:
+            stats: 另一个刷新链的stats
+        """
+        for name, other in stats.items():
+            current = self.stats.setdefault(
+                name, {"attempts": 0, "skips": 0, "successes": 0, "errors": 0, "seconds": 0.0}
+            )
+            for key, value in other.items():
+                current[key] = current.get(key, 0) + value
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各阶段统计, 包含次数、跳过次数、成功数、异常数、总耗时和平均耗时
+        """
+        result = {}
+        for name, stats in self.stats.items():
+            attempts = stats["attempts"]
+            avg_seconds = stats["seconds"] / attempts if attempts else 0.0
+            result[name] = {**stats, "avg_seconds": avg_seconds}
+        return result
+
+    def summary(self) -> str:
+        """
+        生成各阶段统计的日志文本
+        """
+        parts = [
+            f"{name}: 尝试{int(stats['attempts'])}次, 成功{int(stats['successes'])}次, "
+            f"平均耗时{stats['avg_seconds']:.1f}秒"
+            + (f", 跳过{int(stats['skips'])}次" if stats.get("skips") else "")
+            for name, stats in self.get_stats().items()
+            if stats["attempts"] or stats.get("skips")
+        ]
+        # 浏览器之前的阶段每成功一次, 就省去一次浏览器登录
+        saved = sum(
+            stats["successes"]
+            for name, stats in self.stats.items()
+            if name != BrowserRefresher.name
+        )
+        if len(self.stats) > 1:
+            parts.append(f"省去浏览器登录{int(saved)}次")
+        return "; ".join(parts)
+
+    async def close(self):
+        for refresher in self.refreshers:
+            await refresher.close()
+
+
+def get_refresher_chain(playwright, mode: Optional[str] = None) -> RefresherChain:
+    """
+    按刷新配置创建刷新链, 浏览器登录始终在最后
+
+    Args:
+        playwright: Playwright实例
+        mode: 运行模式
+
+    Returns:
+        RefresherChain: 刷新链实例
+    """
+    from config import refresher_config
+    from core.proxy_pool import get_proxy_pool
+
+    refreshers: List[Refresher] = []
+    if refresher_config.enable_http and refresher_config.exchange_url:
+        refreshers.append(
+            HttpExchangeRefresher(
+                refresher_config.exchange_url,
+                timeout=refresher_config.timeout,
+                verify=refresher_config.verify,
+            )
+        )
+    refreshers.append(BrowserRefresher(playwright, mode, get_proxy_pool()))
+    return RefresherChain(refreshers)
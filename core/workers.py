@@ -0,0 +1,271 @@
+"""
+京东Cookie自动获取项目 - 多进程刷新模块
+
+本模块提供协调进程/工作进程模式：
+1. 协调进程(main)持有青龙客户端和待刷新账号, 负责熔断判断、写入面板和通知
+2. 每个工作进程各自持有Playwright浏览器和OCR模型, 从自己的任务队列中取账号执行刷新链,
+   把结果放回结果队列; 协调进程每次只给空闲的工作进程分配一个账号, 因此知道每个账号在哪个进程上,
+   某个工作进程意外退出时立即把它正在刷新的账号按失败处理
+3. 各工作进程的刷新阶段统计在结束时汇总到协调进程, 运行指标随每个结果把增量发回协调进程
+验证码识别和浏览器页面分散到多个进程, 可以利用多核。
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from core.metrics import get_metrics_registry
+from models import AccountConfig
+
+# 工作进程之间用spawn启动, 避免fork后继承协调进程的事件循环和连接
+_mp_context = multiprocessing.get_context("spawn")
+
+
+def _worker_process(
+    worker_id: int, task_queue, result_queue, mode: Optional[str] = None
+):
+    """
+    工作进程入口
+
+    Args:
+        worker_id: 工作进程编号
+        task_queue: 该工作进程的任务队列, 元素为 (user, 账号配置dict), None表示结束
+        result_queue: 结果队列
+        mode: 运行模式
+    """
+    # 导入logger配置, 工作进程和协调进程写同一份日志
+    import core.logger  # noqa: F401
+
+    asyncio.run(_worker_loop(worker_id, task_queue, result_queue, mode))
+
+
+async def _worker_loop(worker_id: int, task_queue, result_queue, mode: Optional[str]):
+    from playwright.async_api import async_playwright
+
+    from core.login import pop_login_error
+    from core.refresher import get_refresher_chain
+    from utils.tools import hash_pt_pin
+
+    loop = asyncio.get_running_loop()
+    metrics = get_metrics_registry()
+    async with async_playwright() as playwright:
+        refresher = get_refresher_chain(playwright, mode)
+        try:
+            while True:
+                task = await loop.run_in_executor(None, task_queue.get)
+                if task is None:
+                    break
+                user, account_data = task
+                start = time.perf_counter()
+                pt_key = None
+                account = AccountConfig(**account_data)
+                try:
+                    with logger.contextualize(pt_pin=hash_pt_pin(account.pt_pin)):
+                        pt_key = await refresher.refresh(user, account)
+                except Exception as e:
+                    logger.error(f"工作进程{worker_id}刷新异常: {e}")
+                result_queue.put(
+                    {
+                        "type": "result",
+                        "worker": worker_id,
+                        "user": user,
+                        "pt_key": pt_key,
+                        "error": None if pt_key else pop_login_error(user),
+                        "duration": time.perf_counter() - start,
+                        "metrics": metrics.snapshot(reset=True),
+                    }
+                )
+        finally:
+            result_queue.put(
+                {
+                    "type": "stats",
+                    "worker": worker_id,
+                    "stats": refresher.stats,
+                    "metrics": metrics.snapshot(reset=True),
+                }
+            )
+            await refresher.close()
+
+
+class WorkerPool:
+    """
+    工作进程池类
+    协调进程给每个空闲的工作进程分配一个账号, 通过结果队列异步取回刷新结果
+    """
+
+    def __init__(
+        self, workers: int, mode: Optional[str] = None, target: Callable = _worker_process
+    ):
+        """
+        初始化工作进程池
+
+        Args:
+            workers: 工作进程数量
+            mode: 运行模式
+            target: 工作进程入口, 参数与 _worker_process 相同
+        """
+        self.workers = workers
+        self.mode = mode
+        self.target = target
+        self.task_queues = []
+        self.result_queue = _mp_context.Queue()
+        self.processes: List[multiprocessing.Process] = []
+        self.stats: List[Dict[str, Dict[str, float]]] = []
+        self._pending: Dict[str, float] = {}
+        self._backlog: Deque[Tuple[str, dict]] = deque()
+        # 工作进程编号 -> 正在刷新的账号
+        self._assigned: Dict[int, str] = {}
+
+    def start(self):
+        """
+        启动工作进程
+        """
+        for worker_id in range(self.workers):
+            task_queue = _mp_context.Queue()
+            process = _mp_context.Process(
+                target=self.target,
+                args=(worker_id, task_queue, self.result_queue, self.mode),
+                name=f"refresh-worker-{worker_id}",
+                daemon=True,
+            )
+            process.start()
+            self.task_queues.append(task_queue)
+            self.processes.append(process)
+        logger.info(f"已启动{self.workers}个刷新工作进程")
+
+    def submit(self, user: str, account: AccountConfig):
+        """
+        提交一个待刷新的账号, 在 results 中分配给空闲的工作进程
+
+        Args:
+            user: 用户名
+            account: 账号配置
+        """
+        self._pending[user] = time.perf_counter()
+        self._backlog.append((user, account.model_dump()))
+
+    def _alive(self) -> bool:
+        return any(process.is_alive() for process in self.processes)
+
+    def _dispatch(self):
+        """
+        给每个存活且空闲的工作进程分配一个账号
+        """
+        for worker_id, process in enumerate(self.processes):
+            if not self._backlog:
+                return
+            if worker_id in self._assigned or not process.is_alive():
+                continue
+            user, account_data = self._backlog.popleft()
+            self._assigned[worker_id] = user
+            self.task_queues[worker_id].put((user, account_data))
+
+    def _reap(self) -> List[dict]:
+        """
+        找出意外退出的工作进程, 把它们正在刷新的账号按失败处理;
+        工作进程全部退出时, 还未分配的账号也按失败处理
+
+        Returns:
+            List[dict]: 失败结果
+        """
+        failed = []
+        for worker_id, process in enumerate(self.processes):
+            if process.is_alive() or worker_id not in self._assigned:
+                continue
+            user = self._assigned.pop(worker_id)
+            logger.error(
+                f"{process.name}异常退出(退出码{process.exitcode}), 正在刷新的账号按失败处理"
+            )
+            failed.append(self._failed_result(user, worker_id, "刷新工作进程异常退出"))
+        if self._backlog and not self._alive():
+            logger.error(f"刷新工作进程全部退出, {len(self._backlog)}个账号未完成刷新")
+            while self._backlog:
+                user, _ = self._backlog.popleft()
+                failed.append(self._failed_result(user, None, "刷新工作进程异常退出"))
+        return failed
+
+    def _failed_result(self, user: str, worker_id: Optional[int], error: str) -> dict:
+        start = self._pending.pop(user, time.perf_counter())
+        return {
+            "type": "result",
+            "worker": worker_id,
+            "user": user,
+            "pt_key": None,
+            "error": error,
+            "duration": time.perf_counter() - start,
+        }
+
+    async def results(self) -> AsyncIterator[dict]:
+        """
+        按完成顺序返回刷新结果, 所有已提交的账号都有结果后结束
+        工作进程意外退出时, 它正在刷新的账号立即以失败结果返回, 其余账号由存活的工作进程继续刷新
+        """
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            for result in self._reap():
+                yield result
+            if not self._pending:
+                return
+            self._dispatch()
+            try:
+                message = await loop.run_in_executor(
+                    None, self.result_queue.get, True, 1
+                )
+            except queue.Empty:
+                continue
+            get_metrics_registry().merge(message.get("metrics"))
+            if message["type"] == "stats":
+                self.stats.append(message["stats"])
+                continue
+            if self._assigned.get(message["worker"]) == message["user"]:
+                del self._assigned[message["worker"]]
+            if message["user"] not in self._pending:
+                # 已按工作进程异常退出处理过的账号
+                continue
+            self._pending.pop(message["user"])
+            yield message
+    def terminate(self):
+        """
+        立即结束所有工作进程, 正在进行的刷新会被中断
+        """
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        logger.info("已结束所有刷新工作进程")
+
+    async def close(self, timeout: float = 30):
+        """
+        通知工作进程结束, 收集刷新阶段统计后等待进程退出
+
+        Args:
+            timeout: 等待退出的秒数, 超时后强制结束
+        """
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        while len(self.stats) < len(self.processes) and self._alive():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = await loop.run_in_executor(
+                    None, self.result_queue.get, True, min(remaining, 1)
+                )
+            except queue.Empty:
+                continue
+            get_metrics_registry().merge(message.get("metrics"))
+            if message["type"] == "stats":
+                self.stats.append(message["stats"])
+        for process in self.processes:
+            await loop.run_in_executor(
+                None, process.join, max(deadline - time.monotonic(), 0)
+            )
+            if process.is_alive():
+                logger.warning(f"{process.name}未按时退出, 强制结束")
+                process.terminate()
@@ -8,25 +8,36 @@ import aiohttp
 import argparse
 import asyncio
 from api.qinglong import QlApi, QlOpenApi
-from api.send import SendApi
-from utils.ck import get_invalid_ck_ids
+from api.send import get_notification_dispatcher
+from utils.ck import get_invalid_cks
 from config import (
-    qinglong_data,
-    user_datas,
+    qinglong_datas,
     global_config,
     notification_config,
     proxy_config,
+    backoff_config,
+    job_queue_config,
 )
-import json
 from loguru import logger
 import os
+import time
 from playwright.async_api import Playwright, async_playwright
 from playwright._impl._errors import TimeoutError
 import traceback
 from typing import Union
-from utils.tools import send_msg, filter_cks, extract_pt_pin, desensitize_account
-from core.login import get_jd_pt_key
-from core.captcha import auto_move_slide, auto_move_slide_v2, auto_shape
+from utils.tools import (
+    send_msg,
+    filter_cks,
+    extract_pt_pin,
+    desensitize_account,
+    hash_pt_pin,
+)
+from core.login import pop_login_error
+from core.refresher import get_refresher_chain
+from core.backoff import classify_failure, get_account_breaker
+from core.progress import get_progress_reporter
+from core.metrics import get_metrics_registry, refreshes
+from config.accounts import get_account_repository
 
 
 # 账号是否脱敏的开关
@@ -38,207 +49,502 @@ async def get_ql_api(ql_data):
     封装了QL的登录
     """
     logger.info("开始获取QL登录态......")
+    client_options = {
+        "timeout": ql_data.timeout,
+        "max_retries": ql_data.max_retries,
+        "retry_delay": ql_data.retry_delay,
+        "pool_size": ql_data.pool_size,
+    }
 
     # 优化client_id和client_secret
-    client_id = ql_data.get("client_id")
-    client_secret = ql_data.get("client_secret")
+    client_id = ql_data.client_id
+    client_secret = ql_data.client_secret
     if client_id and client_secret:
         logger.info("使用client_id和client_secret登录......")
-        qlapi = QlOpenApi(ql_data["url"])
-        response = await qlapi.login(client_id=client_id, client_secret=client_secret)
+        qlapi = QlOpenApi(ql_data.url, **client_options)
+        try:
+            response = await qlapi.login(client_id=client_id, client_secret=client_secret)
+        except Exception:
+            await qlapi.close()
+            raise
         if response["code"] == 200:
             logger.info("client_id和client_secret正常可用......")
             return qlapi
         else:
             logger.info("client_id和client_secret异常......")
+            await qlapi.close()
 
-    qlapi = QlApi(ql_data["url"])
+    qlapi = QlApi(ql_data.url, **client_options)
 
-    # 其次用token
-    token = ql_data.get("token")
-    if token:
-        logger.info("已设置TOKEN,开始检测TOKEN状态......")
-        qlapi.login_by_token(token)
+    try:
+        # 其次用token
+        token = ql_data.token
+        if token:
+            logger.info("已设置TOKEN,开始检测TOKEN状态......")
+            qlapi.login_by_token(token)
+            # token失效时自动使用账号密码重新登录
+            if ql_data.username and ql_data.password:
+                qlapi.set_credentials(ql_data.username, ql_data.password)
 
-        # 如果token失效，就用账号密码登录
-        response = await qlapi.get_envs()
-        if response["code"] == 401:
-            logger.info("Token已失效, 正使用账号密码获取QL登录态......")
-            response = await qlapi.login_by_username(
-                ql_data.get("username"), ql_data.get("password")
-            )
-            if response["code"] != 200:
-                logger.error(f"账号密码登录失败. response: {response}")
+            response = await qlapi.get_envs()
+            if response["code"] == 401:
+                logger.error(f"Token已失效且账号密码登录失败. response: {response}")
                 raise Exception(f"账号密码登录失败. response: {response}")
+            else:
+                logger.info("QL登录态正常可用......")
         else:
-            logger.info("Token正常可用......")
+            # 最后用账号密码
+            logger.info("正使用账号密码获取QL登录态......")
+            response = await qlapi.login_by_username(ql_data.username, ql_data.password)
+            if response["code"] != 200:
+                logger.error(f"账号密码登录失败.response: {response}")
+                raise Exception(f"账号密码登录失败.response: {response}")
+    except Exception:
+        await qlapi.close()
+        raise
+    return qlapi
+
+
+async def get_ql_apis(ql_datas):
+    """
+    同时登录所有青龙面板, 登录失败的面板跳过
+    """
+    results = await asyncio.gather(
+        *[get_ql_api(ql_data) for ql_data in ql_datas], return_exceptions=True
+    )
+    ql_apis = []
+    for ql_data, result in zip(ql_datas, results):
+        if isinstance(result, Exception):
+            logger.error(f"青龙面板{ql_data.url}登录失败, 跳过该面板, 报错原因为{result}")
+            continue
+        ql_apis.append(result)
+    return ql_apis
+
+
+async def get_jd_ck_env_datas(qlapi):
+    """
+    获取面板中带pt_pin的JD_COOKIE环境变量
+    """
+    response = await qlapi.get_envs()
+    if response["code"] == 200:
+        logger.info(f"获取{qlapi.url}环境变量成功")
     else:
-        # 最后用账号密码
-        logger.info("正使用账号密码获取QL登录态......")
-        response = await qlapi.login_by_username(
-            ql_data.get("username"), ql_data.get("password")
+        logger.error(f"获取{qlapi.url}环境变量失败， response: {response}")
+        raise Exception(f"获取环境变量失败， response: {response}")
+
+    env_data = response["data"]
+    # 获取值为JD_COOKIE的环境变量
+    jd_ck_env_datas = filter_cks(env_data, name="JD_COOKIE")
+    # 从value中过滤出pt_pin, 注意只支持单行单pt_pin
+    return [
+        {**x, "pt_pin": extract_pt_pin(x["value"])}
+        for x in jd_ck_env_datas
+        if extract_pt_pin(x["value"])
+    ]
+
+
+async def disable_invalid_cks(qlapi, jd_ck_env_datas, invalid_values):
+    """
+    禁用面板中失效的JD_COOKIE, 返回更新了status的环境变量列表
+    """
+    invalid_cks_id_list = [
+        x["id"] if "id" in x else x["_id"]
+        for x in jd_ck_env_datas
+        if x["status"] == 0 and x["value"] in invalid_values
+    ]
+    if not invalid_cks_id_list:
+        return jd_ck_env_datas
+    # 禁用QL的失效环境变量
+    await qlapi.envs_disable(data=invalid_cks_id_list)
+    return [
+        (
+            {**x, "status": 1}
+            if x.get("id") in invalid_cks_id_list
+            or x.get("_id") in invalid_cks_id_list
+            else x
         )
-        if response["code"] != 200:
-            logger.error(f"账号密码登录失败.response: {response}")
-            raise Exception(f"账号密码登录失败.response: {response}")
-    return qlapi
+        for x in jd_ck_env_datas
+    ]
+
+
+async def update_ql_envs(qlapi, rows, value, user):
+    """
+    把新的cookie写入面板中该账号的所有环境变量, 再一次性启用, 返回是否成功
+    """
+    account = desensitize_account(user, enable_desensitize)
+    rows = [{**row, "value": value} for row in rows]
+    logger.info(f"更新{qlapi.url}中{len(rows)}条环境变量, 内容为{rows}")
+    responses = await asyncio.gather(*[qlapi.set_envs(data=row) for row in rows])
+    failed = [response for response in responses if response["code"] != 200]
+    if failed:
+        logger.error(f"{account}在{qlapi.url}更新失败, response: {failed}")
+        return False
+    logger.info(f"{account}在{qlapi.url}更新成功")
+
+    env_ids = [row["id"] if "id" in row else row["_id"] for row in rows]
+    response = await qlapi.envs_enable(data=env_ids)
+    if response["code"] != 200:
+        logger.error(f"{account}在{qlapi.url}启用失败, response: {response}")
+        return False
+    logger.info(f"{account}在{qlapi.url}启用成功")
+    return True
+
+
+async def check_breaker(send_api, breaker, user, user_config):
+    """
+    检查账号是否处于熔断期, 熔断中的账号返回False, 每次熔断只通知一次
+    """
+    if not breaker or breaker.allow(user_config.pt_pin):
+        return True
+    info = breaker.get_info(user_config.pt_pin)
+    get_progress_reporter().emit("skipped", user, detail="熔断中")
+    refreshes.inc(result="skipped")
+    logger.info(
+        f"{desensitize_account(user, enable_desensitize)}处于熔断期, 跳过更新, "
+        f"失败类型: {info['failure_type']}"
+    )
+    if breaker.should_report(user_config.pt_pin):
+        await send_msg(
+            send_api,
+            send_type=1,
+            msg=f"{desensitize_account(user, enable_desensitize)} 连续更新失败, 暂停更新. 原因: {info['last_error']}",
+        )
+    return False
+
+
+async def apply_refresh_result(
+    send_api, breaker, user, user_config, panels, pt_key, error, duration
+):
+    """
+    处理一个账号的刷新结果: 记录熔断状态, 把新的cookie写入持有该pt_pin的所有面板并通知
+    error为登录失败的报错信息, 由熔断器分类
+    """
+    progress = get_progress_reporter()
+    duration_ms = round(duration * 1000)
+    if pt_key is None:
+        logger.bind(
+            duration_ms=duration_ms,
+            failure_type=classify_failure(error).value,
+            error=error,
+        ).error("获取pt_key失败")
+        progress.emit("failed", user, detail=error, elapsed=round(duration, 3))
+        refreshes.inc(result="failed")
+        if breaker:
+            breaker.record_failure(user_config.pt_pin, error)
+        await send_msg(
+            send_api,
+            send_type=1,
+            msg=f"{desensitize_account(user, enable_desensitize)} 更新失败",
+            duration=duration,
+        )
+        return
+
+    if breaker:
+        breaker.record_success(user_config.pt_pin)
+    value = f"pt_key={pt_key};pt_pin={user_config.pt_pin};"
+    # 同时写入持有该pt_pin的所有面板
+    progress.emit("update", user)
+    results = await asyncio.gather(
+        *[update_ql_envs(qlapi, rows, value, user) for qlapi, rows in panels]
+    )
+    logger.bind(duration_ms=duration_ms).info(
+        f"{results.count(True)}/{len(results)}个面板写入成功"
+    )
+    refreshes.inc(result="success" if all(results) else "write_failed")
+    progress.emit(
+        "success" if all(results) else "failed",
+        user,
+        detail=f"{results.count(True)}/{len(results)}个面板写入成功",
+        elapsed=round(duration, 3),
+    )
+    if all(results):
+        await send_msg(
+            send_api,
+            send_type=0,
+            msg=f"{desensitize_account(user, enable_desensitize)} 更新成功",
+            duration=duration,
+        )
+    else:
+        await send_msg(
+            send_api,
+            send_type=1,
+            msg=f"{desensitize_account(user, enable_desensitize)} 更新失败, "
+            f"{results.count(False)}/{len(results)}个面板写入失败",
+            duration=duration,
+        )
+
+
+async def refresh_with_workers(send_api, breaker, accounts, users, user_dict, mode):
+    """
+    多进程模式: 账号分发给各自持有浏览器和OCR模型的工作进程刷新,
+    当前进程作为协调进程, 收到结果后写入面板并通知
+    """
+    from core.refresher import RefresherChain
+    from core.workers import WorkerPool
+
+    pool = WorkerPool(min(global_config.workers, len(users)), mode)
+    pool.start()
+    try:
+        for user in users:
+            pool.submit(user, accounts[user])
+        async for result in pool.results():
+            user = result["user"]
+            with logger.contextualize(pt_pin=hash_pt_pin(accounts[user].pt_pin)):
+                logger.info(
+                    f"工作进程{result['worker']}完成{desensitize_account(user, enable_desensitize)}"
+                )
+                await apply_refresh_result(
+                    send_api,
+                    breaker,
+                    user,
+                    accounts[user],
+                    user_dict[user],
+                    result["pt_key"],
+                    result.get("error"),
+                    result["duration"],
+                )
+    except asyncio.CancelledError:
+        # 取消时直接结束工作进程, 中断正在进行的浏览器登录
+        pool.terminate()
+        raise
+    finally:
+        await pool.close()
+        summary = RefresherChain([])
+        for stats in pool.stats:
+            summary.merge_stats(stats)
+        logger.info(f"刷新阶段统计: {summary.summary()}")
+
+
+async def refresh_with_job_queue(send_api, breaker, accounts, users, user_dict, run_id):
+    """
+    分布式模式: 账号作为任务放入任务队列, 由各机器上的queue_worker.py领取刷新,
+    当前进程收集结果后写入面板并通知, 超时未返回的账号按失败处理
+    """
+    from core.jobqueue import get_job_queue
+
+    job_queue = get_job_queue(job_queue_config)
+    jobs = {}
+    try:
+        for user in users:
+            job_id = f"{run_id}:{accounts[user].pt_pin}"
+            jobs[job_id] = user
+            await job_queue.enqueue(
+                run_id,
+                job_id,
+                {"user": user, "account": accounts[user].model_dump()},
+            )
+        logger.info(f"已放入任务队列{len(jobs)}个刷新任务, 等待工作进程领取")
+        start = time.perf_counter()
+        deadline = time.monotonic() + job_queue_config.result_timeout
+        while jobs and time.monotonic() < deadline:
+            results = await job_queue.fetch_results(run_id)
+            if not results:
+                await asyncio.sleep(job_queue_config.poll_interval)
+                continue
+            for result in results:
+                # 工作进程随结果带回本次执行的指标增量
+                get_metrics_registry().merge(result.get("metrics"))
+                user = jobs.pop(result["job_id"], None)
+                if user is None:
+                    continue
+                with logger.contextualize(pt_pin=hash_pt_pin(accounts[user].pt_pin)):
+                    if result.get("error"):
+                        logger.error(result["error"])
+                    logger.info(
+                        f"工作进程{result['worker']}完成{desensitize_account(user, enable_desensitize)}"
+                    )
+                    await apply_refresh_result(
+                        send_api,
+                        breaker,
+                        user,
+                        accounts[user],
+                        user_dict[user],
+                        result["pt_key"],
+                        result.get("error"),
+                        result.get("duration", time.perf_counter() - start),
+                    )
+        if jobs:
+            logger.error(f"{len(jobs)}个刷新任务在{job_queue_config.result_timeout}秒内未完成")
+            # 放弃等待的任务从队列中删除, 避免之后被领取却无人写入面板
+            await job_queue.purge(run_id, list(jobs))
+        for user in jobs.values():
+            await apply_refresh_result(
+                send_api,
+                breaker,
+                user,
+                accounts[user],
+                user_dict[user],
+                None,
+                None,
+                time.perf_counter() - start,
+            )
+    except asyncio.CancelledError:
+        # 取消时删除还未完成的任务, 已被领取的任务结果会被丢弃
+        await job_queue.purge(run_id, list(jobs))
+        raise
+    finally:
+        await job_queue.close()
 
 
-async def main(mode: str = None):
+async def main(mode: str = None, run_id: str = None):
     """
     :param mode 运行模式, 当mode = cron时，sms_func为 manual_input时，将自动传成no
+    :param run_id 运行ID, 本次运行的日志都带有该ID, 为空时自动生成
+    """
+    import uuid
+
+    run_id = run_id or uuid.uuid4().hex[:12]
+    with logger.contextualize(run_id=run_id):
+        await refresh_all(mode, run_id)
+
+
+async def refresh_all(mode: str, run_id: str):
     """
-    qlapi = None
+    检测所有面板的JD_COOKIE, 刷新失效的账号并写回面板
+    """
+    ql_apis = []
+    # 通知在后台队列中发送, 不阻塞账号的刷新
+    send_api = get_notification_dispatcher()
+    send_api.start()
     try:
-        qlapi = await get_ql_api(qinglong_data)
-        send_api = SendApi("ql")
-        # 拿到禁用的用户列表
-        response = await qlapi.get_envs()
-        if response["code"] == 200:
-            logger.info("获取环境变量成功")
-        else:
-            logger.error(f"获取环境变量失败， response: {response}")
-            raise Exception(f"获取环境变量失败， response: {response}")
-
-        env_data = response["data"]
-        # 获取值为JD_COOKIE的环境变量
-        jd_ck_env_datas = filter_cks(env_data, name="JD_COOKIE")
-        # 从value中过滤出pt_pin, 注意只支持单行单pt_pin
-        jd_ck_env_datas = [
-            {**x, "pt_pin": extract_pt_pin(x["value"])}
-            for x in jd_ck_env_datas
-            if extract_pt_pin(x["value"])
-        ]
+        ql_apis = await get_ql_apis(qinglong_datas)
+        if not ql_apis:
+            raise Exception("没有可用的青龙面板")
+
+        # 同时获取所有面板的环境变量
+        results = await asyncio.gather(
+            *[get_jd_ck_env_datas(qlapi) for qlapi in ql_apis], return_exceptions=True
+        )
+        panels = []
+        for qlapi, result in zip(ql_apis, results):
+            if isinstance(result, Exception):
+                logger.error(f"{qlapi.url}获取环境变量失败, 跳过该面板, 报错原因为{result}")
+                continue
+            panels.append((qlapi, result))
 
         try:
             logger.info("检测CK任务开始")
-            # 先获取启用中的env_data
-            up_jd_ck_list = filter_cks(jd_ck_env_datas, status=0, name="JD_COOKIE")
+            # 先获取启用中的env_data, 多个面板里相同的cookie只检测一次
+            up_jd_cks = {
+                x["value"]: x
+                for _, jd_ck_env_datas in panels
+                for x in filter_cks(jd_ck_env_datas, status=0, name="JD_COOKIE")
+            }
             # 这一步会去检测这些JD_COOKIE
-            invalid_cks_id_list = await get_invalid_ck_ids(up_jd_ck_list)
-            if invalid_cks_id_list:
-                # 禁用QL的失效环境变量
-                ck_ids_datas = bytes(json.dumps(invalid_cks_id_list), "utf-8")
-                await qlapi.envs_disable(data=ck_ids_datas)
-                # 更新jd_ck_env_datas
-                jd_ck_env_datas = [
-                    (
-                        {**x, "status": 1}
-                        if x.get("id") in invalid_cks_id_list
-                        or x.get("_id") in invalid_cks_id_list
-                        else x
-                    )
-                    for x in jd_ck_env_datas
-                ]
+            invalid_values = {
+                x["value"] for x in await get_invalid_cks(list(up_jd_cks.values()))
+            }
+            if invalid_values:
+                results = await asyncio.gather(
+                    *[
+                        disable_invalid_cks(qlapi, jd_ck_env_datas, invalid_values)
+                        for qlapi, jd_ck_env_datas in panels
+                    ]
+                )
+                panels = [(qlapi, x) for (qlapi, _), x in zip(panels, results)]
             logger.info("检测CK任务完成")
         except Exception as e:
             traceback.print_exc()
             logger.error(f"检测CK任务失败, 跳过检测, 报错原因为{e}")
 
+        # 账号从账号库中按需读取, 不一次加载全部账号
+        account_repository = get_account_repository()
         # 获取需强制更新pt_pin
-        force_update_pt_pins = [
-            user_datas[key]["pt_pin"]
-            for key in user_datas
-            if user_datas[key].get("force_update") is True
-        ]
-        # 获取禁用和需要强制更新的users
-        forbidden_users = [
-            x
-            for x in jd_ck_env_datas
-            if (x["status"] == 1 or x["pt_pin"] in force_update_pt_pins)
-        ]
-
-        if not forbidden_users:
-            logger.info("所有COOKIE环境变量正常，无需更新")
-            return
+        force_update_pt_pins = set(account_repository.force_update_pt_pins())
 
         # 获取需要的字段
         from utils.tools import filter_forbidden_users, get_forbidden_users_dict
 
-        filter_users_list = filter_forbidden_users(
-            forbidden_users, ["_id", "id", "value", "remarks", "name"]
+        panel_users = []
+        for qlapi, jd_ck_env_datas in panels:
+            # 获取禁用和需要强制更新的pt_pin
+            forbidden_pt_pins = {
+                x["pt_pin"]
+                for x in jd_ck_env_datas
+                if (x["status"] == 1 or x["pt_pin"] in force_update_pt_pins)
+            }
+            # 同一个pt_pin的重复环境变量一起更新, 避免漏掉备注不同的副本
+            forbidden_users = [
+                x for x in jd_ck_env_datas if x["pt_pin"] in forbidden_pt_pins
+            ]
+            filter_users_list = filter_forbidden_users(
+                forbidden_users, ["_id", "id", "value", "remarks", "name"]
+            )
+            panel_users.append((qlapi, filter_users_list))
+
+        # 只读取持有这些pt_pin的账号
+        accounts = account_repository.get_by_pt_pins(
+            extract_pt_pin(x["value"]) for _, rows in panel_users for x in rows
         )
+        # 生成字典, 同一个账号在多个面板中的环境变量合并到一起, 只登录一次
+        user_dict = {}
+        for qlapi, filter_users_list in panel_users:
+            for user, rows in get_forbidden_users_dict(
+                filter_users_list, accounts
+            ).items():
+                user_dict.setdefault(user, []).append((qlapi, rows))
 
-        # 生成字典
-        user_dict = get_forbidden_users_dict(filter_users_list, user_datas)
         if not user_dict:
-            logger.info("失效的CK信息未配置在user_datas内，无需更新")
+            logger.info("所有COOKIE环境变量正常或未配置在账号库内，无需更新")
             return
 
-        # 登录JD获取pt_key
-        async with async_playwright() as playwright:
-            for user in user_dict:
-                logger.info(f"开始更新{desensitize_account(user, enable_desensitize)}")
-                user_config = user_datas[user]
-                pt_key = await get_jd_pt_key(
-                    playwright,
-                    user,
-                    user_config["password"],
-                    user_config.get("user_type", "jd"),
-                    user_config["pt_pin"],
-                    user_config.get("auto_switch", True),
-                    mode,
-                    user_config.get("sms_func", "no"),
-                    user_config.get("sms_webhook"),
-                    user_config.get("voice_func", "no"),
-                )
-                if pt_key is None:
-                    logger.error(f"获取pt_key失败")
-                    await send_msg(
-                        send_api,
-                        send_type=1,
-                        msg=f"{desensitize_account(user, enable_desensitize)} 更新失败",
-                    )
-                    continue
+        breaker = get_account_breaker() if backoff_config.enable else None
+        # 熔断中的账号直接跳过, 每次熔断只通知一次
+        users = [
+            user
+            for user in user_dict
+            if await check_breaker(send_api, breaker, user, accounts[user])
+        ]
+        if not users:
+            return
 
-                req_data = user_dict[user]
-                req_data["value"] = (
-                    f"pt_key={pt_key};pt_pin={user_datas[user]['pt_pin']};"
-                )
-                logger.info(f"更新内容为{req_data}")
-                data = json.dumps(req_data)
-                response = await qlapi.set_envs(data=data)
-                if response["code"] == 200:
-                    logger.info(
-                        f"{desensitize_account(user, enable_desensitize)}更新成功"
-                    )
-                else:
-                    logger.error(
-                        f"{desensitize_account(user, enable_desensitize)}更新失败, response: {response}"
-                    )
-                    await send_msg(
-                        send_api,
-                        send_type=1,
-                        msg=f"{desensitize_account(user, enable_desensitize)} 更新失败",
-                    )
-                    continue
+        if job_queue_config.enable:
+            await refresh_with_job_queue(
+                send_api, breaker, accounts, users, user_dict, run_id
+            )
+            return
 
-                req_id = (
-                    f"[{req_data['id']}]"
-                    if "id" in req_data.keys()
-                    else f'["{req_data["_id"]}"]'
-                )
-                data = bytes(req_id, "utf-8")
-                response = await qlapi.envs_enable(data=data)
-                if response["code"] == 200:
-                    logger.info(
-                        f"{desensitize_account(user, enable_desensitize)}启用成功"
-                    )
-                    await send_msg(
-                        send_api,
-                        send_type=0,
-                        msg=f"{desensitize_account(user, enable_desensitize)} 更新成功",
-                    )
-                else:
-                    logger.error(
-                        f"{desensitize_account(user, enable_desensitize)}启用失败, response: {response}"
-                    )
+        if global_config.workers > 1 and len(users) > 1:
+            await refresh_with_workers(
+                send_api, breaker, accounts, users, user_dict, mode
+            )
+            return
+
+        # 获取pt_key, 先尝试HTTP兑换等低成本方式, 失败后再用浏览器登录
+        progress = get_progress_reporter()
+        async with async_playwright() as playwright:
+            refresher = get_refresher_chain(playwright, mode)
+            try:
+                for user in users:
+                    with logger.contextualize(
+                        pt_pin=hash_pt_pin(accounts[user].pt_pin)
+                    ), progress.track(user):
+                        logger.info(
+                            f"开始更新{desensitize_account(user, enable_desensitize)}"
+                        )
+                        start = time.perf_counter()
+                        pt_key = await refresher.refresh(user, accounts[user])
+                        await apply_refresh_result(
+                            send_api,
+                            breaker,
+                            user,
+                            accounts[user],
+                            user_dict[user],
+                            pt_key,
+                            None if pt_key else pop_login_error(user),
+                            time.perf_counter() - start,
+                        )
+            finally:
+                logger.info(f"刷新阶段统计: {refresher.summary()}")
+                await refresher.close()
 
     except Exception as e:
-        traceback.print_exc()
+        # 记录后继续抛出, Web任务和调度器据此判断本次运行失败
+        logger.error(f"刷新任务失败, 报错原因为{e}")
+        raise
     finally:
-        if qlapi:
-            await qlapi.close()
+        await asyncio.gather(*[qlapi.close() for qlapi in ql_apis])
+        await send_api.close()
 
 
 def parse_args():
@@ -249,10 +555,20 @@ def parse_args():
     parser.add_argument(
         "-m", "--mode", choices=["cron"], help="运行的main的模式(例如: 'cron')"
     )
+    parser.add_argument(
+        "--metrics-file", default=None, help="运行结束后把指标写入该文件, 供调度器合并"
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     # 使用解析参数的函数
     args = parse_args()
-    asyncio.run(main(mode=args.mode))
+    try:
+        asyncio.run(main(mode=args.mode))
+    finally:
+        if args.metrics_file:
+            from utils import json_codec
+
+            with open(args.metrics_file, "wb") as f:
+                f.write(json_codec.dumpb(get_metrics_registry().snapshot()))
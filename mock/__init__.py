@@ -0,0 +1,5 @@
+"""
+京东Cookie自动获取项目 - 本地模拟服务模块
+
+本模块提供京东登录页、青龙面板等外部服务的本地替身，用于端到端和性能测试。
+"""
@@ -0,0 +1,597 @@
+"""
+京东Cookie自动获取项目 - 模拟京东登录站点模块
+
+本模块提供一个本地的京东登录页替身，页面结构和选择器与 plogin.m.jd.com 保持一致
+(#username、#pwd、.btn.J_ping.active、#slot_img/#main_img、div.captcha_footer img、
+#cpc_img、.jcap_refresh、.dialog、.notice)，可以在不访问京东的情况下完整跑通
+core.login.get_jd_pt_key，并按配置注入延迟和各类失败。
+
+验证码图片可以来自 CaptchaRecorder 记录的数据集，也可以现场合成。
+
+用法:
+    python -m mock.jd_login --port 8900 --latency 0.2 --risk-rate 0.05
+然后在 config.json 的 global_config 中设置:
+    "jd_login_url": "http://127.0.0.1:8900/login"
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import random
+import uuid
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+from aiohttp import web
+from loguru import logger
+from pydantic import BaseModel, Field
+
+# 合成形状验证码时可用的中文字体
+font_candidates = [
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+]
+
+# 合成颜色验证码使用的BGR颜色, 均落在 utils.consts.supported_colors 的范围内
+synthetic_colors = {
+    "红色": (40, 40, 220),
+    "橙色": (30, 140, 250),
+    "黄色": (40, 220, 240),
+    "绿色": (60, 200, 60),
+    "蓝色": (220, 120, 30),
+    "紫色": (200, 50, 130),
+}
+
+
+class MockJdLoginConfig(BaseModel):
+    """
+    模拟京东登录站点配置模型
+    """
+
+    accounts: Dict[str, str] = Field(
+        default_factory=dict, description="账号密码, 为空时任意账号密码都能登录"
+    )
+    latency: float = Field(default=0, ge=0, description="每个请求注入的平均延迟秒数")
+    latency_jitter: float = Field(default=0, ge=0, description="注入延迟的抖动秒数")
+    error_rate: float = Field(default=0, ge=0, le=1, description="接口返回500的概率")
+    wrong_password_rate: float = Field(default=0, ge=0, le=1, description="提示账密错误的概率")
+    risk_rate: float = Field(default=0, ge=0, le=1, description="提示账号存在风险的概率")
+    dialog_rate: float = Field(default=0, ge=0, le=1, description="弹出实名认证弹窗的概率")
+    slide_rate: float = Field(default=1, ge=0, le=1, description="出现滑块验证码的概率")
+    shape_rate: float = Field(default=0, ge=0, le=1, description="出现形状验证码的概率")
+    slide_fail_rate: float = Field(default=0, ge=0, le=1, description="滑块正确时仍判失败的概率")
+    shape_fail_rate: float = Field(default=0, ge=0, le=1, description="点选正确时仍判失败的概率")
+    slide_tolerance: int = Field(default=6, description="滑块距离允许的误差像素")
+    dataset_dir: Optional[str] = Field(default=None, description="验证码数据集目录")
+    font_path: Optional[str] = Field(default=None, description="合成验证码使用的中文字体")
+
+
+def _encode_png(img: np.ndarray) -> bytes:
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def _data_url(img_bytes: bytes) -> str:
+    return "data:image/png;base64," + base64.b64encode(img_bytes).decode()
+
+
+def _random_background(width: int, height: int) -> np.ndarray:
+    background = np.zeros((height, width, 3), np.uint8)
+    for channel in range(3):
+        background[:, :, channel] = np.linspace(
+            random.randint(0, 255), random.randint(0, 255), width, dtype=np.uint8
+        )[None, :]
+    for _ in range(12):
+        color = tuple(random.randint(0, 255) for _ in range(3))
+        center = (random.randint(0, width), random.randint(0, height))
+        cv2.circle(background, center, random.randint(8, 40), color, -1)
+    return background
+
+
+def make_slide_captcha(width: int = 275, height: int = 170, size: int = 50) -> dict:
+    """
+    合成滑块验证码
+
+    Returns:
+        dict: slot为滑块小图, main为带缺口的背景图, answer为缺口左侧的x坐标
+    """
+    background = _random_background(width, height)
+    gap_x = random.randint(size + 20, width - size - 5)
+    gap_y = random.randint(5, height - size - 5)
+    piece = background[gap_y : gap_y + size, gap_x : gap_x + size].copy()
+    cv2.rectangle(piece, (0, 0), (size - 1, size - 1), (255, 255, 255), 2)
+    gap = background[gap_y : gap_y + size, gap_x : gap_x + size]
+    background[gap_y : gap_y + size, gap_x : gap_x + size] = (gap * 0.4).astype(np.uint8)
+    cv2.rectangle(
+        background, (gap_x, gap_y), (gap_x + size - 1, gap_y + size - 1), (255, 255, 255), 2
+    )
+    return {"slot": _encode_png(piece), "main": _encode_png(background), "answer": gap_x}
+
+
+def _shape_points(shape_type: str, cx: int, cy: int, r: int) -> Optional[np.ndarray]:
+    if shape_type == "三角形":
+        points = [(cx, cy - r), (cx - r, cy + r), (cx + r, cy + r)]
+    elif shape_type == "六边形":
+        points = [
+            (cx + int(r * np.cos(a)), cy + int(r * np.sin(a)))
+            for a in np.linspace(0, 2 * np.pi, 6, endpoint=False)
+        ]
+    elif shape_type == "五角星":
+        points = []
+        for k in range(10):
+            radius = r if k % 2 == 0 else r * 0.45
+            angle = -np.pi / 2 + k * np.pi / 5
+            points.append(
+                (cx + int(radius * np.cos(angle)), cy + int(radius * np.sin(angle)))
+            )
+    elif shape_type == "梯形":
+        half = r // 2
+        points = [(cx - half, cy - half), (cx + half, cy - half), (cx + r, cy + half), (cx - r, cy + half)]
+    elif shape_type == "长方形":
+        half = r // 2
+        points = [(cx - r, cy - half), (cx + r, cy - half), (cx + r, cy + half), (cx - r, cy + half)]
+    elif shape_type == "正方形":
+        points = [(cx - r, cy - r), (cx + r, cy - r), (cx + r, cy + r), (cx - r, cy + r)]
+    else:
+        return None
+    return np.array(points, np.int32)
+
+
+def make_shape_captcha(font_path: str, width: int = 280, height: int = 170) -> dict:
+    """
+    合成形状/颜色点选验证码
+
+    Args:
+        font_path: 绘制提示文字的中文字体
+
+    Returns:
+        dict: background为背景图, prompt为RGBA提示图, answer为目标中心点, radius为允许的点击半径
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    shape_types = ["三角形", "正方形", "长方形", "五角星", "六边形", "圆形", "梯形"]
+    chosen = random.sample(shape_types, 4)
+    colors = random.sample(list(synthetic_colors), 4)
+    background = np.full((height, width, 3), 245, np.uint8)
+    radius = 22
+    centers = []
+    for index, (shape_type, color_name) in enumerate(zip(chosen, colors)):
+        cx = 35 + index * (width - 70) // 3
+        cy = random.randint(radius + 10, height - radius - 10)
+        color = synthetic_colors[color_name]
+        if shape_type == "圆形":
+            cv2.circle(background, (cx, cy), radius, color, -1)
+        else:
+            cv2.fillPoly(background, [_shape_points(shape_type, cx, cy, radius)], color)
+        centers.append((cx, cy))
+
+    target = random.randrange(4)
+    if random.random() < 0.5:
+        prompt = f"请选出图中的{chosen[target]}"
+    else:
+        prompt = f"请选出图中{colors[target]}的图形"
+
+    font = ImageFont.truetype(font_path, 16)
+    prompt_img = Image.new("RGBA", (180, 24), (0, 0, 0, 0))
+    ImageDraw.Draw(prompt_img).text((2, 2), prompt, font=font, fill=(0, 0, 0, 255))
+    buffer = io.BytesIO()
+    prompt_img.save(buffer, format="PNG")
+    return {
+        "background": _encode_png(background),
+        "prompt": buffer.getvalue(),
+        "text": prompt,
+        "answer": centers[target],
+        "radius": radius + 4,
+    }
+
+
+class CaptchaSource:
+    """
+    验证码来源类
+    优先使用数据集中验证通过的样本, 没有时现场合成
+    """
+
+    def __init__(self, config: MockJdLoginConfig):
+        self.slides: List[dict] = []
+        self.shapes: List[dict] = []
+        self.font_path = config.font_path or next(
+            (path for path in font_candidates if os.path.exists(path)), None
+        )
+        if config.dataset_dir:
+            self._load_dataset(config.dataset_dir)
+
+    def _load_dataset(self, dataset_dir: str):
+        from bench.captcha import get_truth
+        from utils.captcha_recorder import load_dataset
+
+        for record in load_dataset(dataset_dir):
+            truth = get_truth(record)
+            if not truth:
+                continue
+            images = record["images"]
+            if record["kind"] == "slide" and truth.get("distance") is not None:
+                self.slides.append(
+                    {
+                        "slot": images["target"],
+                        "main": images["background"],
+                        "answer": truth["distance"],
+                    }
+                )
+            elif record["kind"] in ("shape", "color") and truth.get("points"):
+                self.shapes.append(
+                    {
+                        "background": images["background"],
+                        "prompt": images["prompt"],
+                        "text": record.get("prompt"),
+                        "answer": truth["points"][0],
+                        "radius": 12,
+                    }
+                )
+        logger.info(f"从数据集加载滑块样本{len(self.slides)}个, 点选样本{len(self.shapes)}个")
+
+    @property
+    def has_shape(self) -> bool:
+        return bool(self.shapes or self.font_path)
+
+    def new_slide(self) -> dict:
+        if self.slides:
+            return random.choice(self.slides)
+        return make_slide_captcha()
+
+    def new_shape(self) -> dict:
+        if self.shapes:
+            return random.choice(self.shapes)
+        return make_shape_captcha(self.font_path)
+
+
+login_page = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>京东登录</title>
+<style>
+  body { margin: 0; font-family: sans-serif; }
+  .captcha_drop, .captcha_shape, .dialog { display: none; }
+  .captcha_box { position: relative; }
+  #slot_img { position: absolute; left: 0; }
+  img.move-img { width: 40px; height: 40px; background: #3b7; display: inline-block; }
+  .notice { color: #e33; min-height: 1em; }
+</style>
+</head>
+<body>
+<div id="header"><div class="text-header">京东登录</div></div>
+<div class="notice"></div>
+<a class="account-login-btn">账号密码登录</a>
+<div><input id="username" type="text"></div>
+<div><input id="pwd" type="password"></div>
+<div><span class="policy_tip-checkbox">同意协议</span></div>
+<a class="btn J_ping active">登 录</a>
+<div class="notice"></div>
+
+<div class="captcha_drop">
+  <div class="captcha_box"><img id="main_img"><img id="slot_img"></div>
+  <img class="move-img" src="data:image/gif;base64,R0lGODlhAQABAAAAACw=">
+</div>
+
+<div class="captcha_shape">
+  <div class="sp_msg tip_text">请完成安全验证</div>
+  <img id="cpc_img">
+  <a class="jcap_refresh">刷新</a>
+  <div class="captcha_footer"><img><button id="submit-btn">确定</button></div>
+</div>
+
+<div class="dialog"><div class="dialog-des"></div></div>
+
+<script>
+const $ = (s) => document.querySelector(s);
+let clicks = [];
+
+async function post(url, data) {
+  const resp = await fetch(url, {method: "POST", headers: {"Content-Type": "application/json"}, body: JSON.stringify(data || {})});
+  if (!resp.ok) { return {notice: "网络异常, 请稍后再试"}; }
+  return resp.json();
+}
+
+function showNotice(text) { document.querySelectorAll(".notice")[1].textContent = text; }
+
+async function handle(result) {
+  $(".captcha_drop").style.display = "none";
+  $(".captcha_shape").style.display = "none";
+  if (result.notice) { showNotice(result.notice); return; }
+  if (result.dialog) { $(".dialog-des").textContent = result.dialog; $(".dialog").style.display = "block"; return; }
+  if (result.done) { location.href = "/home"; return; }
+  if (result.step === "slide") {
+    $("#main_img").src = result.main; $("#slot_img").src = result.slot;
+    $(".captcha_drop").style.display = "block";
+  }
+  if (result.step === "shape") {
+    clicks = [];
+    $("#cpc_img").src = result.background; $(".captcha_footer img").src = result.prompt;
+    $(".captcha_shape").style.display = "block";
+  }
+}
+
+$(".btn.J_ping.active").addEventListener("click", async () => {
+  handle(await post("/api/login", {username: $("#username").value, password: $("#pwd").value}));
+});
+
+let dragStart = null;
+$("img.move-img").addEventListener("mousedown", (e) => { e.preventDefault(); dragStart = e.clientX; });
+document.addEventListener("mouseup", async (e) => {
+  if (dragStart === null) return;
+  const distance = e.clientX - dragStart;
+  dragStart = null;
+  handle(await post("/api/captcha/slide", {distance: distance}));
+});
+
+$("#cpc_img").addEventListener("click", (e) => { clicks.push([e.offsetX, e.offsetY]); });
+$("#submit-btn").addEventListener("click", async () => { handle(await post("/api/captcha/shape", {points: clicks})); });
+$(".jcap_refresh").addEventListener("click", async () => { handle(await post("/api/captcha/refresh")); });
+</script>
+</body>
+</html>
+"""
+
+home_page = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>我的京东</title></head>
+<body><div id="msShortcutMenu">我的京东</div></body></html>
+"""
+
+
+class MockJdLoginServer:
+    """
+    模拟京东登录站点类
+    """
+
+    def __init__(self, config: Optional[MockJdLoginConfig] = None):
+        """
+        初始化模拟京东登录站点
+
+        Args:
+            config: 模拟站点配置
+        """
+        self.config = config or MockJdLoginConfig()
+        self.captcha_source = CaptchaSource(self.config)
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def _count(self, key: str):
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _session(self, request: web.Request) -> Dict[str, Any]:
+        sid = request.cookies.get("mock_sid", "")
+        return self.sessions.setdefault(sid, {})
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        """
+        注入延迟和接口错误
+        """
+        if self.config.latency or self.config.latency_jitter:
+            delay = self.config.latency + random.uniform(
+                -self.config.latency_jitter, self.config.latency_jitter
+            )
+            await asyncio.sleep(max(delay, 0))
+        if request.path.startswith("/api/") and random.random() < self.config.error_rate:
+            self._count("injected_error")
+            raise web.HTTPInternalServerError()
+        return await handler(request)
+
+    def create_app(self) -> web.Application:
+        """
+        创建aiohttp应用
+
+        Returns:
+            web.Application: aiohttp应用
+        """
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_get("/login", self.login_page)
+        app.router.add_get("/home", self.home_page)
+        app.router.add_post("/api/login", self.login)
+        app.router.add_post("/api/captcha/slide", self.verify_slide)
+        app.router.add_post("/api/captcha/shape", self.verify_shape)
+        app.router.add_post("/api/captcha/refresh", self.refresh_captcha)
+        app.router.add_get("/api/stats", self.get_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8900) -> str:
+        """
+        在当前事件循环中启动模拟站点
+
+        Returns:
+            str: 登录页URL
+        """
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/login"
+
+    async def stop(self):
+        """
+        停止模拟站点
+        """
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def login_page(self, request: web.Request) -> web.Response:
+        response = web.Response(text=login_page, content_type="text/html")
+        sid = uuid.uuid4().hex
+        self.sessions[sid] = {}
+        response.set_cookie("mock_sid", sid)
+        return response
+
+    async def home_page(self, request: web.Request) -> web.Response:
+        return web.Response(text=home_page, content_type="text/html")
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def _next_step(self, session: Dict[str, Any]) -> dict:
+        """
+        取出下一个步骤, 所有验证都通过后种下pt_key
+        """
+        steps = session.get("steps", [])
+        if not steps:
+            return self._finish(session)
+        step = steps[0]
+        if step == "slide":
+            captcha = self.captcha_source.new_slide()
+            session["answer"] = captcha["answer"]
+            return {
+                "step": "slide",
+                "slot": _data_url(captcha["slot"]),
+                "main": _data_url(captcha["main"]),
+            }
+        if step == "shape":
+            captcha = self.captcha_source.new_shape()
+            session["answer"] = captcha["answer"]
+            session["radius"] = captcha["radius"]
+            return {
+                "step": "shape",
+                "background": _data_url(captcha["background"]),
+                "prompt": _data_url(captcha["prompt"]),
+            }
+        return self._finish(session)
+
+    def _finish(self, session: Dict[str, Any]) -> dict:
+        config = self.config
+        if random.random() < config.dialog_rate:
+            self._count("dialog")
+            return {"dialog": "您的账号存在风险，为了账号安全需实名认证，是否继续？"}
+        session["pt_key"] = f"AAJmock{uuid.uuid4().hex}"
+        self._count("success")
+        return {"done": True}
+
+    def _done_response(self, session: Dict[str, Any], result: dict) -> web.Response:
+        response = web.json_response(result)
+        if result.get("done"):
+            response.set_cookie("pt_key", session["pt_key"])
+            response.set_cookie("pt_pin", session.get("username", ""))
+        return response
+
+    async def login(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        data = await request.json()
+        username, password = data.get("username", ""), data.get("password", "")
+        self._count("login")
+        config = self.config
+
+        if config.accounts and config.accounts.get(username) != password:
+            self._count("wrong_password")
+            return web.json_response({"notice": "账号或密码不正确"})
+        if random.random() < config.wrong_password_rate:
+            self._count("wrong_password")
+            return web.json_response({"notice": "账号或密码不正确"})
+        if random.random() < config.risk_rate:
+            self._count("risk")
+            return web.json_response({"notice": "您的账号存在风险, 请使用短信验证码登录"})
+
+        steps = []
+        if random.random() < config.slide_rate:
+            steps.append("slide")
+        if self.captcha_source.has_shape and random.random() < config.shape_rate:
+            steps.append("shape")
+        session.update({"username": username, "steps": steps})
+        return self._done_response(session, self._next_step(session))
+
+    def _pass_step(self, session: Dict[str, Any]) -> web.Response:
+        session["steps"] = session.get("steps", [])[1:]
+        return self._done_response(session, self._next_step(session))
+
+    async def verify_slide(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        data = await request.json()
+        self._count("slide_attempt")
+        distance = data.get("distance", 0)
+        answer = session.get("answer")
+        if (
+            answer is not None
+            and abs(distance - answer) <= self.config.slide_tolerance
+            and random.random() >= self.config.slide_fail_rate
+        ):
+            self._count("slide_pass")
+            return self._pass_step(session)
+        return web.json_response(self._next_step(session))
+
+    async def verify_shape(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        data = await request.json()
+        self._count("shape_attempt")
+        answer, radius = session.get("answer"), session.get("radius", 12)
+        points = data.get("points") or []
+        hit = answer is not None and any(
+            abs(x - answer[0]) <= radius and abs(y - answer[1]) <= radius
+            for x, y in points
+        )
+        if hit and random.random() >= self.config.shape_fail_rate:
+            self._count("shape_pass")
+            return self._pass_step(session)
+        return web.json_response(self._next_step(session))
+
+    async def refresh_captcha(self, request: web.Request) -> web.Response:
+        session = self._session(request)
+        self._count("refresh")
+        return web.json_response(self._next_step(session))
+
+
+def parse_args():
+    """
+    解析参数
+    """
+    parser = argparse.ArgumentParser(prog="python -m mock.jd_login")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0, help="每个请求注入的平均延迟秒数")
+    parser.add_argument("--latency-jitter", type=float, default=0, help="注入延迟的抖动秒数")
+    parser.add_argument("--error-rate", type=float, default=0, help="接口返回500的概率")
+    parser.add_argument("--wrong-password-rate", type=float, default=0)
+    parser.add_argument("--risk-rate", type=float, default=0)
+    parser.add_argument("--dialog-rate", type=float, default=0)
+    parser.add_argument("--slide-rate", type=float, default=1)
+    parser.add_argument("--shape-rate", type=float, default=0)
+    parser.add_argument("--slide-fail-rate", type=float, default=0)
+    parser.add_argument("--shape-fail-rate", type=float, default=0)
+    parser.add_argument("--slide-tolerance", type=int, default=6)
+    parser.add_argument("--dataset", default=None, help="验证码数据集目录")
+    parser.add_argument("--font", default=None, help="合成验证码使用的中文字体")
+    return parser.parse_args()
+
+
+async def serve(config: MockJdLoginConfig, host: str, port: int):
+    server = MockJdLoginServer(config)
+    url = await server.start(host, port)
+    logger.info(f"模拟京东登录站点已启动: {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    mock_config = MockJdLoginConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        wrong_password_rate=args.wrong_password_rate,
+        risk_rate=args.risk_rate,
+        dialog_rate=args.dialog_rate,
+        slide_rate=args.slide_rate,
+        shape_rate=args.shape_rate,
+        slide_fail_rate=args.slide_fail_rate,
+        shape_fail_rate=args.shape_fail_rate,
+        slide_tolerance=args.slide_tolerance,
+        dataset_dir=args.dataset,
+        font_path=args.font,
+    )
+    asyncio.run(serve(mock_config, args.host, args.port))
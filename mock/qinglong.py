@@ -0,0 +1,310 @@
+"""
+京东Cookie自动获取项目 - 模拟青龙面板模块
+
+本模块提供一个本地的青龙面板替身，实现 api.qinglong.QlApi/QlOpenApi 用到的接口：
+api/user/login、open/auth/token、api/envs、open/envs 以及环境变量的启用和禁用，
+可以生成数万条环境变量，用于测试客户端的解析和更新吞吐。
+
+用法:
+    python -m mock.qinglong --port 5700 --envs 20000 --latency 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import string
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from loguru import logger
+from pydantic import BaseModel, Field
+
+
+class MockQinglongConfig(BaseModel):
+    """
+    模拟青龙面板配置模型
+    """
+
+    username: str = Field(default="admin", description="面板用户名")
+    password: str = Field(default="admin", description="面板密码")
+    client_id: str = Field(default="mock_client_id", description="应用client_id")
+    client_secret: str = Field(default="mock_client_secret", description="应用client_secret")
+    env_count: int = Field(default=20000, ge=0, description="生成的环境变量总数")
+    jd_cookie_ratio: float = Field(default=0.5, ge=0, le=1, description="JD_COOKIE所占比例")
+    disabled_ratio: float = Field(default=0.1, ge=0, le=1, description="禁用状态的JD_COOKIE比例")
+    duplicate_ratio: float = Field(default=0, ge=0, le=1, description="重复pt_pin的JD_COOKIE比例")
+    latency: float = Field(default=0, ge=0, description="每个请求注入的延迟秒数")
+    error_rate: float = Field(default=0, ge=0, le=1, description="接口返回500的概率")
+    token_ttl: int = Field(default=0, ge=0, description="token有效秒数, 0表示不过期")
+    legacy_id: bool = Field(default=False, description="是否使用旧版面板的_id字段")
+
+
+def _random_text(length: int) -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def generate_envs(config: MockQinglongConfig) -> List[Dict[str, Any]]:
+    """
+    生成环境变量列表
+
+    Args:
+        config: 模拟面板配置
+
+    Returns:
+        List[Dict[str, Any]]: 与青龙面板返回格式一致的环境变量列表
+    """
+    envs = []
+    jd_count = int(config.env_count * config.jd_cookie_ratio)
+    pt_pins = []
+    now = int(time.time() * 1000)
+    for index in range(config.env_count):
+        if index < jd_count:
+            if pt_pins and random.random() < config.duplicate_ratio:
+                pt_pin = random.choice(pt_pins)
+            else:
+                pt_pin = f"jd_{_random_text(10)}"
+                pt_pins.append(pt_pin)
+            name = "JD_COOKIE"
+            value = f"pt_key=AAJ{_random_text(80)};pt_pin={pt_pin};"
+            status = 1 if random.random() < config.disabled_ratio else 0
+        else:
+            name = random.choice(["JD_WSCK", "TG_BOT_TOKEN", "PUSH_KEY", "JD_UNION_ID"])
+            value = _random_text(40)
+            status = 0
+        env = {
+            "value": value,
+            "name": name,
+            "remarks": f"备注{index}",
+            "status": status,
+            "timestamp": time.strftime("%a %b %d %Y %H:%M:%S GMT+0800"),
+            "position": 4999999999.5 - index,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        if config.legacy_id:
+            env["_id"] = uuid.uuid4().hex[:16]
+        else:
+            env["id"] = index + 1
+        envs.append(env)
+    return envs
+
+
+class MockQinglongServer:
+    """
+    模拟青龙面板类
+    """
+
+    def __init__(self, config: Optional[MockQinglongConfig] = None):
+        """
+        初始化模拟青龙面板
+
+        Args:
+            config: 模拟面板配置
+        """
+        self.config = config or MockQinglongConfig()
+        self.envs = generate_envs(self.config)
+        self._index = {self._env_id(env): env for env in self.envs}
+        self.tokens: Dict[str, float] = {}
+        self.stats: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @staticmethod
+    def _env_id(env: Dict[str, Any]):
+        return env["id"] if "id" in env else env["_id"]
+
+    def _count(self, key: str):
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _issue_token(self) -> str:
+        token = uuid.uuid4().hex
+        ttl = self.config.token_ttl
+        self.tokens[token] = time.time() + ttl if ttl else float("inf")
+        return token
+
+    def expire_tokens(self):
+        """
+        让所有已签发的token立即过期, 用于测试客户端的重新登录
+        """
+        self.tokens.clear()
+
+    def _check_auth(self, request: web.Request) -> bool:
+        authorization = request.headers.get("Authorization", "")
+        token = authorization.split(" ", 1)[-1]
+        return self.tokens.get(token, 0) > time.time()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """
+        注入延迟和接口错误, 并校验token
+        """
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        if request.path.startswith("/mock/"):
+            return await handler(request)
+        if random.random() < self.config.error_rate:
+            self._count("injected_error")
+            return web.json_response({"code": 500, "message": "mock error"}, status=500)
+        login_paths = ("/api/user/login", "/open/auth/token")
+        if request.path not in login_paths and not self._check_auth(request):
+            self._count("unauthorized")
+            return web.json_response({"code": 401, "message": "UnauthorizedError"}, status=401)
+        return await handler(request)
+
+    def create_app(self) -> web.Application:
+        """
+        创建aiohttp应用
+
+        Returns:
+            web.Application: aiohttp应用
+        """
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/api/user/login", self.user_login)
+        app.router.add_get("/open/auth/token", self.auth_token)
+        for prefix in ("/api", "/open"):
+            app.router.add_get(f"{prefix}/envs", self.get_envs)
+            app.router.add_put(f"{prefix}/envs", self.update_env)
+            app.router.add_put(f"{prefix}/envs/enable", self.enable_envs)
+            app.router.add_put(f"{prefix}/envs/disable", self.disable_envs)
+        app.router.add_get("/mock/stats", self.get_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 5700) -> str:
+        """
+        在当前事件循环中启动模拟面板
+
+        Returns:
+            str: 面板URL
+        """
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/"
+
+    async def stop(self):
+        """
+        停止模拟面板
+        """
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def user_login(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self._count("user_login")
+        if (
+            data.get("username") != self.config.username
+            or data.get("password") != self.config.password
+        ):
+            return web.json_response({"code": 400, "message": "错误的用户名密码，请重试"})
+        return web.json_response({"code": 200, "data": {"token": self._issue_token()}})
+
+    async def auth_token(self, request: web.Request) -> web.Response:
+        self._count("auth_token")
+        query = request.query
+        if (
+            query.get("client_id") != self.config.client_id
+            or query.get("client_secret") != self.config.client_secret
+        ):
+            return web.json_response({"code": 400, "message": "client_id或client_seret有误"})
+        return web.json_response(
+            {
+                "code": 200,
+                "data": {
+                    "token": self._issue_token(),
+                    "token_type": "Bearer",
+                    "expiration": int(time.time()) + (self.config.token_ttl or 30 * 24 * 3600),
+                },
+            }
+        )
+
+    async def get_envs(self, request: web.Request) -> web.Response:
+        self._count("get_envs")
+        search_value = request.query.get("searchValue")
+        envs = self.envs
+        if search_value:
+            envs = [
+                env
+                for env in envs
+                if search_value in env["name"] or search_value in env["value"]
+            ]
+        return web.Response(
+            text=json.dumps({"code": 200, "data": envs}, ensure_ascii=False),
+            content_type="application/json",
+        )
+
+    async def update_env(self, request: web.Request) -> web.Response:
+        data = json.loads(await request.read())
+        self._count("update_env")
+        env = self._index.get(data.get("id", data.get("_id")))
+        if env is None:
+            return web.json_response({"code": 400, "message": "环境变量不存在"})
+        for key in ("name", "value", "remarks"):
+            if key in data:
+                env[key] = data[key]
+        env["updatedAt"] = int(time.time() * 1000)
+        return web.json_response({"code": 200, "data": env})
+
+    async def _set_status(self, request: web.Request, status: int) -> web.Response:
+        ids = json.loads(await request.read())
+        for env_id in ids:
+            env = self._index.get(env_id)
+            if env is not None:
+                env["status"] = status
+        return web.json_response({"code": 200, "data": {"count": len(ids)}})
+
+    async def enable_envs(self, request: web.Request) -> web.Response:
+        self._count("enable_envs")
+        return await self._set_status(request, 0)
+
+    async def disable_envs(self, request: web.Request) -> web.Response:
+        self._count("disable_envs")
+        return await self._set_status(request, 1)
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+
+def parse_args():
+    """
+    解析参数
+    """
+    parser = argparse.ArgumentParser(prog="python -m mock.qinglong")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5700)
+    parser.add_argument("--envs", type=int, default=20000, help="生成的环境变量总数")
+    parser.add_argument("--disabled-ratio", type=float, default=0.1)
+    parser.add_argument("--duplicate-ratio", type=float, default=0)
+    parser.add_argument("--latency", type=float, default=0, help="每个请求注入的延迟秒数")
+    parser.add_argument("--error-rate", type=float, default=0, help="接口返回500的概率")
+    parser.add_argument("--token-ttl", type=int, default=0, help="token有效秒数, 0表示不过期")
+    parser.add_argument("--legacy-id", action="store_true", help="使用旧版面板的_id字段")
+    return parser.parse_args()
+
+
+async def serve(config: MockQinglongConfig, host: str, port: int):
+    server = MockQinglongServer(config)
+    url = await server.start(host, port)
+    logger.info(f"模拟青龙面板已启动: {url}, 环境变量{len(server.envs)}个")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    mock_config = MockQinglongConfig(
+        env_count=args.envs,
+        disabled_ratio=args.disabled_ratio,
+        duplicate_ratio=args.duplicate_ratio,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+        legacy_id=args.legacy_id,
+    )
+    asyncio.run(serve(mock_config, args.host, args.port))
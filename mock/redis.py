@@ -0,0 +1,325 @@
+"""
+京东Cookie自动获取项目 - 模拟Redis模块
+
+本模块提供一个本地的Redis协议(RESP)替身，实现 core.jobqueue.RedisJobQueue 用到的
+列表、哈希和有序集合命令以及 WATCH/MULTI/EXEC 事务，数据只保存在内存中，
+用于测试和评测分布式任务队列。
+
+用法:
+    python -m mock.redis --port 6379
+"""
+
+import argparse
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+class MockRedisServer:
+    """
+    模拟Redis服务类
+    所有命令在同一个事件循环中依次执行, 单条命令和EXEC中的整个事务都是原子的
+    """
+
+    # 会修改键的命令, 执行后使WATCH该键的事务失效
+    WRITE_COMMANDS = {
+        "DEL", "LPUSH", "RPUSH", "LPOP", "LREM", "HSET", "HINCRBY", "ZADD", "ZREM",
+    }
+
+    def __init__(self, password: Optional[str] = None):
+        """
+        初始化模拟Redis
+
+        Args:
+            password: 访问密码, 为空时不需要AUTH
+        """
+        self.password = password
+        self.dbs: Dict[int, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {}
+        # (db, 键) 的修改次数, 用于WATCH
+        self._versions: Dict[tuple, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 6379) -> str:
+        """
+        在当前事件循环中启动模拟Redis
+
+        Returns:
+            str: redis://地址
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"redis://{host}:{port}/0"
+
+    async def stop(self):
+        """
+        停止模拟Redis
+        """
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, bool):
+            return b":%d\r\n" % int(value)
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(
+                MockRedisServer._encode(v) for v in value
+            )
+        if isinstance(value, Exception):
+            return f"-ERR {value}\r\n".encode()
+        data = str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    def _version(self, db: int, key: str) -> int:
+        return self._versions.get((db, key), 0)
+
+    def _dispatch(self, state: Dict[str, Any], name: str, args: List[str]):
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            return ValueError(f"unknown command '{name}'")
+        try:
+            reply = handler(self.dbs.setdefault(state["db"], {}), *args)
+        except (ValueError, TypeError, IndexError) as e:
+            return e
+        if name == "FLUSHDB":
+            for key in [key for key in self._versions if key[0] == state["db"]]:
+                self._versions[key] += 1
+        elif name in self.WRITE_COMMANDS:
+            for key in args if name == "DEL" else args[:1]:
+                self._versions[(state["db"], key)] = self._version(state["db"], key) + 1
+        return reply
+
+    def _exec(self, state: Dict[str, Any]):
+        commands, watched = state["multi"], state["watched"]
+        state["multi"], state["watched"] = None, {}
+        if any(self._version(*key) != version for key, version in watched.items()):
+            return None
+        return [self._dispatch(state, args[0].upper(), args[1:]) for args in commands]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        state = {"db": 0, "authed": self.password is None, "multi": None, "watched": {}}
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if not args:
+                    break
+                name = args[0].upper()
+                self.stats[name] = self.stats.get(name, 0) + 1
+                try:
+                    if name == "AUTH":
+                        state["authed"] = args[-1] == self.password
+                        reply = "OK" if state["authed"] else ValueError("invalid password")
+                    elif not state["authed"]:
+                        reply = ValueError("NOAUTH Authentication required")
+                    elif name == "SELECT":
+                        state["db"] = int(args[1])
+                        reply = "OK"
+                    elif name == "WATCH":
+                        if state["multi"] is not None:
+                            raise ValueError("WATCH inside MULTI is not allowed")
+                        for key in args[1:]:
+                            state["watched"][(state["db"], key)] = self._version(state["db"], key)
+                        reply = "OK"
+                    elif name == "UNWATCH":
+                        state["watched"] = {}
+                        reply = "OK"
+                    elif name == "MULTI":
+                        if state["multi"] is not None:
+                            raise ValueError("MULTI calls can not be nested")
+                        state["multi"] = []
+                        reply = "OK"
+                    elif name == "DISCARD":
+                        if state["multi"] is None:
+                            raise ValueError("DISCARD without MULTI")
+                        state["multi"], state["watched"] = None, {}
+                        reply = "OK"
+                    elif name == "EXEC":
+                        if state["multi"] is None:
+                            raise ValueError("EXEC without MULTI")
+                        reply = self._exec(state)
+                    elif state["multi"] is not None:
+                        state["multi"].append(args)
+                        reply = "QUEUED"
+                    else:
+                        reply = self._dispatch(state, name, args[1:])
+                except (ValueError, TypeError, IndexError) as e:
+                    reply = e
+                if reply in ("OK", "PONG", "QUEUED"):
+                    writer.write(f"+{reply}\r\n".encode())
+                else:
+                    writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _get(db: Dict[str, Any], key: str, kind: type):
+        value = db.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_ping(self, db, *args):
+        return "PONG"
+
+    def cmd_flushdb(self, db, *args):
+        db.clear()
+        return "OK"
+
+    def cmd_del(self, db, *keys):
+        return sum(db.pop(key, None) is not None for key in keys)
+
+    def cmd_lpush(self, db, key, *values):
+        items = self._get(db, key, list)
+        if items is None:
+            items = db[key] = []
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    def cmd_rpush(self, db, key, *values):
+        items = self._get(db, key, list)
+        if items is None:
+            items = db[key] = []
+        items.extend(values)
+        return len(items)
+
+    def cmd_lpop(self, db, key):
+        items = self._get(db, key, list)
+        if not items:
+            return None
+        value = items.pop(0)
+        if not items:
+            del db[key]
+        return value
+
+    def cmd_lrem(self, db, key, count, value):
+        items = self._get(db, key, list) or []
+        count = int(count)
+        limit = abs(count) or len(items)
+        indexes = [i for i, item in enumerate(items) if item == value]
+        indexes = indexes[-limit:][::-1] if count < 0 else indexes[:limit][::-1]
+        for index in indexes:
+            items.pop(index)
+        if key in db and not items:
+            del db[key]
+        return len(indexes)
+
+    def cmd_lindex(self, db, key, index):
+        items = self._get(db, key, list) or []
+        index = int(index)
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def cmd_llen(self, db, key):
+        return len(self._get(db, key, list) or [])
+
+    def cmd_hset(self, db, key, *pairs):
+        fields = self._get(db, key, dict)
+        if fields is None:
+            fields = db[key] = {}
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in fields
+            fields[field] = value
+        return added
+
+    def cmd_hget(self, db, key, field):
+        return (self._get(db, key, dict) or {}).get(field)
+
+    def cmd_hgetall(self, db, key):
+        fields = self._get(db, key, dict) or {}
+        return [item for pair in fields.items() for item in pair]
+
+    def cmd_hincrby(self, db, key, field, amount):
+        fields = self._get(db, key, dict)
+        if fields is None:
+            fields = db[key] = {}
+        value = int(fields.get(field, 0)) + int(amount)
+        fields[field] = str(value)
+        return value
+
+    def _zset(self, db, key) -> Dict[str, float]:
+        # 有序集合用 {"__zset__": {member: score}} 与哈希区分
+        value = self._get(db, key, dict)
+        if value is None:
+            return {}
+        if "__zset__" not in value:
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value["__zset__"]
+
+    def cmd_zadd(self, db, key, *pairs):
+        members = self._zset(db, key)
+        db[key] = {"__zset__": members}
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in members
+            members[member] = float(score)
+        return added
+
+    def cmd_zrem(self, db, key, *members):
+        zset = self._zset(db, key)
+        removed = sum(zset.pop(member, None) is not None for member in members)
+        if key in db and not zset:
+            del db[key]
+        return removed
+
+    def cmd_zscore(self, db, key, member):
+        score = self._zset(db, key).get(member)
+        return None if score is None else repr(score)
+
+    def cmd_zrangebyscore(self, db, key, low, high):
+        low, high = float(low), float(high)
+        return [
+            member
+            for member, score in sorted(self._zset(db, key).items(), key=lambda x: x[1])
+            if low <= score <= high
+        ]
+
+
+def parse_args():
+    """
+    解析参数
+    """
+    parser = argparse.ArgumentParser(prog="python -m mock.redis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--password", default=None, help="访问密码")
+    return parser.parse_args()
+
+
+async def serve(host: str, port: int, password: Optional[str] = None):
+    server = MockRedisServer(password)
+    url = await server.start(host, port)
+    logger.info(f"模拟Redis已启动: {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(serve(args.host, args.port, args.password))
@@ -0,0 +1,158 @@
+"""
+京东Cookie自动获取项目 - 任务队列工作进程
+
+本程序从分布式任务队列(job_queue_config)中领取刷新任务, 使用本机的浏览器、OCR模型和代理
+执行刷新链, 执行期间定时续约, 完成后把结果写回队列, 由主程序写入青龙面板。
+可以在多台机器上各运行一个或多个。
+
+用法:
+    python queue_worker.py --mode cron
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+from loguru import logger
+from playwright.async_api import async_playwright
+
+from config import job_queue_config
+from core.jobqueue import JobQueue, get_job_queue
+from core.login import pop_login_error
+from core.metrics import get_metrics_registry
+from core.refresher import get_refresher_chain
+from models import AccountConfig
+from utils.tools import hash_pt_pin
+
+# 队列后端(Redis连接断开、SQLite被锁等)出错时的最长等待秒数
+MAX_RETRY_DELAY = 60
+# 确认任务失败时的重试次数
+ACK_RETRIES = 3
+
+
+async def keep_lease(job_queue: JobQueue, job_id: str, worker_id: str):
+    """
+    执行期间定时续约, 租约被重新分配后停止
+    """
+    while True:
+        await asyncio.sleep(job_queue_config.heartbeat_interval)
+        try:
+            alive = await job_queue.heartbeat(job_id, worker_id, job_queue_config.lease_seconds)
+        except Exception as e:
+            # 后端暂时不可用时继续执行, 下一次续约前恢复即可保住租约
+            logger.warning(f"任务{job_id}续约失败: {e}")
+            continue
+        if not alive:
+            logger.warning(f"任务{job_id}的租约已失效")
+            return
+
+
+async def ack_result(job_queue: JobQueue, job_id: str, worker_id: str, result: dict):
+    """
+    写回任务结果, 后端出错时重试, 仍然失败时租约到期后任务会被重新分配
+    """
+    for attempt in range(1, ACK_RETRIES + 1):
+        try:
+            if not await job_queue.ack(job_id, worker_id, result):
+                logger.warning(f"任务{job_id}的租约已被重新分配, 丢弃本次结果")
+            return
+        except Exception as e:
+            logger.error(f"任务{job_id}的结果写回失败(第{attempt}次): {e}")
+            if attempt < ACK_RETRIES:
+                await asyncio.sleep(job_queue_config.poll_interval * attempt)
+    logger.error(f"任务{job_id}的结果未能写回, 租约到期后将重新分配")
+
+
+async def run_worker(
+    worker_id: Optional[str] = None,
+    mode: Optional[str] = None,
+    idle_exit: float = 0,
+):
+    """
+    循环领取并执行任务
+
+    Args:
+        worker_id: 工作进程ID, 默认为 主机名-进程号-随机串
+        mode: 运行模式
+        idle_exit: 连续空闲多少秒后退出, 0表示一直运行
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    job_queue = get_job_queue(job_queue_config)
+    logger.info(f"任务队列工作进程{worker_id}已启动")
+    idle_since = time.monotonic()
+    retry_delay = 0
+    async with async_playwright() as playwright:
+        refresher = get_refresher_chain(playwright, mode)
+        try:
+            while True:
+                try:
+                    job = await job_queue.lease(worker_id, job_queue_config.lease_seconds)
+                except Exception as e:
+                    # 后端出错时按指数退避继续轮询, 不退出工作进程
+                    retry_delay = min(
+                        max(retry_delay * 2, job_queue_config.poll_interval), MAX_RETRY_DELAY
+                    )
+                    logger.error(f"领取任务失败, {retry_delay:.1f}秒后重试: {e}")
+                    await asyncio.sleep(retry_delay)
+                    continue
+                retry_delay = 0
+                if job is None:
+                    if idle_exit and time.monotonic() - idle_since >= idle_exit:
+                        break
+                    await asyncio.sleep(job_queue_config.poll_interval)
+                    continue
+
+                user = job["payload"]["user"]
+                logger.info(f"领取任务{job['id']}, 第{job['attempts']}次执行")
+                heartbeat = asyncio.create_task(keep_lease(job_queue, job["id"], worker_id))
+                start = time.perf_counter()
+                pt_key = None
+                try:
+                    account = AccountConfig(**job["payload"]["account"])
+                    with logger.contextualize(
+                        run_id=job["run_id"], pt_pin=hash_pt_pin(account.pt_pin)
+                    ):
+                        pt_key = await refresher.refresh(user, account)
+                except Exception as e:
+                    logger.error(f"任务{job['id']}执行异常: {e}")
+                finally:
+                    heartbeat.cancel()
+                result = {
+                    "worker": worker_id,
+                    "user": user,
+                    "pt_key": pt_key,
+                    "error": None if pt_key else pop_login_error(user),
+                    "duration": time.perf_counter() - start,
+                    # 本次执行的指标增量, 由main合并后通过/metrics暴露
+                    "metrics": get_metrics_registry().snapshot(reset=True),
+                }
+                await ack_result(job_queue, job["id"], worker_id, result)
+                idle_since = time.monotonic()
+        finally:
+            logger.info(f"刷新阶段统计: {refresher.summary()}")
+            await refresher.close()
+            await job_queue.close()
+
+
+def parse_args():
+    """
+    解析参数
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-m", "--mode", choices=["cron"], help="运行的main的模式(例如: 'cron')"
+    )
+    parser.add_argument("--worker-id", default=None, help="工作进程ID")
+    parser.add_argument(
+        "--idle-exit", type=float, default=0, help="连续空闲多少秒后退出, 0表示一直运行"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(run_worker(args.worker_id, args.mode, args.idle_exit))
@@ -1,9 +1,13 @@
 import asyncio
+import os
+import sys
+import tempfile
 from datetime import datetime, timedelta
 from croniter import croniter
 from utils.consts import program
-from config import cron_expression
-from main import main
+from utils.memory import get_rss_mb, release_idle_resources
+from config import cron_expression, global_config
+from config.settings import get_config_manager
 from loguru import logger
 
 
@@ -13,18 +17,100 @@ def get_next_runtime(cron_expression, base_time=None):
     return cron.get_next(datetime)
 
 
+async def run_in_subprocess():
+    """
+    在子进程中运行一次更新任务, 浏览器和OCR模型随子进程退出一起释放
+    """
+    from core.metrics import get_metrics_registry
+    from utils import json_codec
+
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    # 子进程的运行指标写入临时文件, 结束后合并到调度器的指标中
+    fd, metrics_path = tempfile.mkstemp(prefix="jd_metrics_", suffix=".json")
+    os.close(fd)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            main_path,
+            "--mode",
+            "cron",
+            "--metrics-file",
+            metrics_path,
+            cwd=os.path.dirname(main_path),
+        )
+        returncode = await process.wait()
+        if returncode != 0:
+            logger.error(f"更新任务子进程异常退出, 退出码{returncode}")
+        with open(metrics_path, "rb") as f:
+            data = f.read()
+        if data:
+            get_metrics_registry().merge(json_codec.loads(data))
+    except ValueError as e:
+        logger.warning(f"读取更新任务子进程的指标失败: {e}")
+    finally:
+        os.remove(metrics_path)
+
+
+async def run_once():
+    """
+    按schedule_mode运行一次更新任务, 并输出运行前后的内存
+    """
+    before = get_rss_mb()
+    if global_config.schedule_mode == "subprocess":
+        await run_in_subprocess()
+    else:
+        # 只在进程内运行时才导入main, 子进程模式下调度器不加载playwright等依赖
+        from main import main
+
+        try:
+            await main(mode="cron")
+        except Exception:
+            # 本次运行失败不影响下一次定时任务
+            logger.exception("更新任务异常")
+    logger.info(f"更新任务结束, 调度器内存{before:.1f}MB -> {get_rss_mb():.1f}MB")
+
+
 async def run_scheduled_tasks(cron_expression):
-    logger.info(f"{program}运行中")
+    """
+    按cron表达式定时运行更新任务
+    配置文件变化后重新加载, 运行方式、空闲释放时间和新的cron表达式在下一次检查时生效
+    """
+    logger.info(
+        f"{program}运行中, 运行方式: {global_config.schedule_mode}, 内存{get_rss_mb():.1f}MB"
+    )
     next_run = get_next_runtime(cron_expression)
     logger.info(f"下次更新任务时间为{next_run}")
+    release_at = None
+    rejected_cron = None
     while True:
+        if global_config.cron_expression not in (cron_expression, rejected_cron):
+            try:
+                next_run = get_next_runtime(global_config.cron_expression)
+            except ValueError as e:
+                rejected_cron = global_config.cron_expression
+                logger.error(f"新的Cron表达式{rejected_cron}无效, 继续使用{cron_expression}: {e}")
+            else:
+                cron_expression = global_config.cron_expression
+                logger.info(f"Cron表达式已变更为{cron_expression}, 下次更新任务时间为{next_run}")
         now = datetime.now()
         if now >= next_run:
-            await main(mode="cron")
+            await run_once()
             next_run = get_next_runtime(cron_expression, now + timedelta(seconds=1))
             logger.info(f"下次更新任务时间为{next_run}")
+            idle_release_seconds = global_config.idle_release_seconds
+            if global_config.schedule_mode == "inprocess" and idle_release_seconds > 0:
+                release_at = datetime.now() + timedelta(seconds=idle_release_seconds)
+        if release_at and datetime.now() >= release_at:
+            release_at = None
+            release_idle_resources()
         await asyncio.sleep(1)
 
 
 if __name__ == "__main__":
+    # 配置文件变化时自动重新加载, 新增的账号在下一次运行时生效
+    get_config_manager().start_watching()
+    if global_config.metrics_port:
+        from core.metrics import start_metrics_server
+
+        start_metrics_server(global_config.metrics_port)
     asyncio.run(run_scheduled_tasks(cron_expression))
@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from loguru import logger
+
+from core.backoff import AccountBreaker, BreakerState, FailureType, classify_failure
+from utils.tools import hash_pt_pin
+
+
+class ClassifyFailureTest(unittest.TestCase):
+    def test_keywords(self):
+        cases = {
+            "检测到实名认证弹窗，请前往移动端做实名认证": FailureType.RISK,
+            "账号或密码不正确": FailureType.WRONG_PASSWORD,
+            "滑块验证失败": FailureType.CAPTCHA,
+            "sms_func为no关闭, 跳过短信验证码识别环节": FailureType.CONFIG,
+            "voice_func为no关闭, 跳过手机语音识别": FailureType.CONFIG,
+            "sms_webhook未配置": FailureType.CONFIG,
+            "验证码异常": FailureType.CAPTCHA,
+            "网络超时": FailureType.UNKNOWN,
+            None: FailureType.UNKNOWN,
+        }
+        for error, failure_type in cases.items():
+            with self.subTest(error=error):
+                self.assertEqual(classify_failure(error), failure_type)
+
+    def test_exception(self):
+        self.assertEqual(classify_failure(Exception("密码错误")), FailureType.WRONG_PASSWORD)
+
+
+class AccountBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = str(Path(self.tmp.name) / "account_backoff.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def breaker(self) -> AccountBreaker:
+        return AccountBreaker(
+            state_path=self.state_path,
+            base_delays={"captcha": 100, "config": 3600},
+            thresholds={"captcha": 3, "config": 1},
+            max_delay=1000,
+            jitter=0,
+        )
+
+    def test_opens_at_threshold_and_backs_off_exponentially(self):
+        breaker = self.breaker()
+        self.assertEqual(breaker.record_failure("pin", "滑块验证失败"), BreakerState.CLOSED)
+        self.assertEqual(breaker.record_failure("pin", "滑块验证失败"), BreakerState.CLOSED)
+        self.assertTrue(breaker.allow("pin"))
+
+        self.assertEqual(breaker.record_failure("pin", "滑块验证失败"), BreakerState.OPEN)
+        info = breaker.get_info("pin")
+        self.assertAlmostEqual(info["open_until"] - info["last_failure_at"], 100)
+        self.assertFalse(breaker.allow("pin"))
+        self.assertEqual(breaker.get_state("pin", now=info["open_until"] + 1), BreakerState.HALF_OPEN)
+
+        breaker.record_failure("pin", "滑块验证失败")
+        info = breaker.get_info("pin")
+        self.assertAlmostEqual(info["open_until"] - info["last_failure_at"], 200)
+        # 超过max_delay时按max_delay退避
+        for _ in range(5):
+            breaker.record_failure("pin", "滑块验证失败")
+        info = breaker.get_info("pin")
+        self.assertAlmostEqual(info["open_until"] - info["last_failure_at"], 1000)
+
+    def test_success_closes_and_state_persists(self):
+        breaker = self.breaker()
+        breaker.record_failure("pin_a", "sms_func为no关闭, 跳过短信验证码识别环节")
+        breaker.record_failure("pin_b", "sms_func为no关闭, 跳过短信验证码识别环节")
+        breaker.record_success("pin_b")
+
+        reloaded = self.breaker()
+        self.assertEqual(reloaded.get_state("pin_a"), BreakerState.OPEN)
+        self.assertEqual(reloaded.get_info("pin_a")["failure_type"], "config")
+        self.assertEqual(reloaded.get_state("pin_b"), BreakerState.CLOSED)
+
+    def test_should_report_once(self):
+        breaker = self.breaker()
+        breaker.record_failure("pin", "sms_webhook未配置")
+        self.assertTrue(breaker.should_report("pin"))
+        self.assertFalse(breaker.should_report("pin"))
+
+    def test_log_does_not_contain_pt_pin(self):
+        messages = []
+        sink_id = logger.add(messages.append, format="{message}")
+        try:
+            self.breaker().record_failure("jd_secret_pin", "sms_webhook未配置")
+        finally:
+            logger.remove(sink_id)
+        text = "".join(messages)
+        self.assertNotIn("jd_secret_pin", text)
+        self.assertIn(hash_pt_pin("jd_secret_pin"), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
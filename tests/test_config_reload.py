@@ -0,0 +1,101 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import config
+from config.settings import ConfigManager
+from models import AppConfig, QinglongConfig
+
+
+def _config_data(**global_config) -> dict:
+    data = AppConfig(qinglong_data=QinglongConfig(url="http://127.0.0.1:5700")).model_dump(
+        mode="json"
+    )
+    data["global_config"].update(global_config)
+    return data
+
+
+class ConfigManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "config.json"
+        self.write(_config_data(cron_expression="0 3 * * *"))
+        self.manager = ConfigManager(str(self.path))
+        self.manager.load_config()
+        self.changes = []
+        self.changed = threading.Event()
+
+        def listener(new_config, changed):
+            self.changes.append((new_config, changed))
+            self.changed.set()
+
+        self.manager.subscribe(listener)
+
+    def tearDown(self):
+        self.manager.stop_watching()
+        self.tmp.cleanup()
+
+    def write(self, data):
+        self.path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    def test_reload_notifies_changed_sections(self):
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.changes, [])
+
+        self.write(_config_data(cron_expression="0 4 * * *"))
+        self.assertTrue(self.manager.reload())
+        new_config, changed = self.changes[-1]
+        self.assertEqual(changed, {"global_config"})
+        self.assertEqual(new_config.global_config.cron_expression, "0 4 * * *")
+        self.assertIs(self.manager.get_config(), new_config)
+
+    def test_invalid_file_keeps_current_config(self):
+        self.path.write_text("{not json", encoding="utf-8")
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.manager.get_config().global_config.cron_expression, "0 3 * * *")
+        self.assertEqual(self.changes, [])
+
+    def test_save_is_atomic_and_skips_unchanged_content(self):
+        self.manager.save_config()
+        before = self.path.stat().st_mtime_ns
+        time.sleep(0.01)
+        self.manager.save_config()
+        self.assertEqual(self.path.stat().st_mtime_ns, before)
+
+        config_obj = self.manager.get_config()
+        config_obj.global_config.cron_expression = "0 5 * * *"
+        self.manager.save_config()
+        self.assertEqual(
+            json.loads(self.path.read_text(encoding="utf-8"))["global_config"]["cron_expression"],
+            "0 5 * * *",
+        )
+        # 没有留下临时文件
+        self.assertEqual([p.name for p in self.path.parent.iterdir()], ["config.json"])
+
+    def test_watcher_reloads_after_debounce(self):
+        self.manager.start_watching(interval=0.05, debounce=0.1)
+        self.write(_config_data(cron_expression="0 6 * * *"))
+        self.assertTrue(self.changed.wait(5))
+        self.assertEqual(self.manager.get_config().global_config.cron_expression, "0 6 * * *")
+
+
+class ConfigModuleSyncTest(unittest.TestCase):
+    def test_exported_objects_are_updated_in_place(self):
+        original = config._config
+        global_config = config.global_config
+        new_config = original.model_copy(deep=True)
+        new_config.global_config.cron_expression = "1 2 * * *"
+        try:
+            config._on_config_change(new_config, {"global_config"})
+            self.assertIs(config.global_config, global_config)
+            self.assertEqual(global_config.cron_expression, "1 2 * * *")
+            self.assertEqual(config.cron_expression, "1 2 * * *")
+        finally:
+            config._on_config_change(original, {"global_config"})
+
+
+if __name__ == "__main__":
+    unittest.main()
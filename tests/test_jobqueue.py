@@ -0,0 +1,162 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from core.jobqueue import RedisJobQueue, SqliteJobQueue
+from mock.redis import MockRedisServer
+
+
+class JobQueueTests:
+    """
+    两种任务队列共用的行为测试, 子类实现 backend 返回创建队列的异步上下文
+    """
+
+    def run_async(self, coro_func, max_attempts: int = 3):
+        async def run():
+            async with self.backend() as make_queue:
+                await coro_func(make_queue, max_attempts)
+
+        asyncio.run(asyncio.wait_for(run(), 30))
+
+    def test_lease_ack_and_fetch(self):
+        async def check(make_queue, max_attempts):
+            queue = await make_queue(max_attempts)
+            await queue.enqueue("run1", "job1", {"user": "a"})
+            job = await queue.lease("w1", 30)
+            self.assertEqual(
+                job, {"id": "job1", "run_id": "run1", "payload": {"user": "a"}, "attempts": 1}
+            )
+            self.assertIsNone(await queue.lease("w2", 30))
+            self.assertTrue(await queue.heartbeat("job1", "w1", 30))
+            self.assertFalse(await queue.heartbeat("job1", "w2", 30))
+            self.assertFalse(await queue.ack("job1", "w2", {"pt_key": "x"}))
+            self.assertTrue(await queue.ack("job1", "w1", {"pt_key": "key"}))
+
+            results = await queue.fetch_results("run1")
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0]["job_id"], "job1")
+            self.assertEqual(results[0]["pt_key"], "key")
+            self.assertEqual(await queue.fetch_results("run1"), [])
+            await queue.close()
+
+        self.run_async(check)
+
+    def test_expired_lease_is_reassigned(self):
+        async def check(make_queue, max_attempts):
+            queue = await make_queue(max_attempts)
+            await queue.enqueue("run1", "job1", {"user": "a"})
+            self.assertEqual((await queue.lease("w1", 0.05))["attempts"], 1)
+            await asyncio.sleep(0.1)
+
+            job = await queue.lease("w2", 30)
+            self.assertEqual(job["id"], "job1")
+            self.assertEqual(job["attempts"], 2)
+            # 租约已重新分配, 原工作进程不能再续约或写回结果
+            self.assertFalse(await queue.heartbeat("job1", "w1", 30))
+            self.assertFalse(await queue.ack("job1", "w1", {"pt_key": "old"}))
+            self.assertTrue(await queue.ack("job1", "w2", {"pt_key": "new"}))
+            self.assertEqual(
+                [result["pt_key"] for result in await queue.fetch_results("run1")], ["new"]
+            )
+            await queue.close()
+
+        self.run_async(check)
+
+    def test_expired_too_often_fails(self):
+        async def check(make_queue, max_attempts):
+            queue = await make_queue(max_attempts)
+            await queue.enqueue("run1", "job1", {"user": "a"})
+            await queue.lease("w1", 0.05)
+            await asyncio.sleep(0.1)
+
+            self.assertIsNone(await queue.lease("w2", 30))
+            results = await queue.fetch_results("run1")
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0]["job_id"], "job1")
+            self.assertIsNone(results[0]["pt_key"])
+            self.assertIn("租约过期1次", results[0]["error"])
+            await queue.close()
+
+        self.run_async(check, max_attempts=1)
+
+    def test_purge(self):
+        async def check(make_queue, max_attempts):
+            queue = await make_queue(max_attempts)
+            await queue.enqueue("run1", "job1", {"user": "a"})
+            await queue.enqueue("run1", "job2", {"user": "b"})
+            await queue.lease("w1", 30)
+            await queue.purge("run1", ["job1", "job2"])
+            self.assertIsNone(await queue.lease("w1", 30))
+            self.assertEqual(await queue.fetch_results("run1"), [])
+            await queue.close()
+
+        self.run_async(check)
+
+    def test_concurrent_workers_lease_each_job_once(self):
+        async def check(make_queue, max_attempts):
+            producer = await make_queue(max_attempts)
+            for i in range(40):
+                await producer.enqueue("run1", f"job{i}", {"i": i})
+            leased = []
+
+            async def work(worker_id):
+                queue = await make_queue(max_attempts)
+                while True:
+                    job = await queue.lease(worker_id, 30)
+                    if job is None:
+                        break
+                    leased.append(job["id"])
+                    self.assertTrue(await queue.ack(job["id"], worker_id, {"pt_key": "k"}))
+                await queue.close()
+
+            await asyncio.gather(*[work(f"w{n}") for n in range(5)])
+            self.assertEqual(sorted(leased), sorted(f"job{i}" for i in range(40)))
+            self.assertEqual(len(await producer.fetch_results("run1")), 40)
+            await producer.close()
+
+        self.run_async(check)
+
+
+class _SqliteBackend:
+    def __init__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    async def __aenter__(self):
+        path = os.path.join(self.tmp.name, "jobs.db")
+
+        async def make_queue(max_attempts):
+            return SqliteJobQueue(path, max_attempts)
+
+        return make_queue
+
+    async def __aexit__(self, *exc):
+        self.tmp.cleanup()
+
+
+class _RedisBackend:
+    def __init__(self):
+        self.server = MockRedisServer()
+
+    async def __aenter__(self):
+        url = await self.server.start(port=0)
+
+        async def make_queue(max_attempts):
+            return RedisJobQueue(url, max_attempts=max_attempts)
+
+        return make_queue
+
+    async def __aexit__(self, *exc):
+        await self.server.stop()
+
+
+class SqliteJobQueueTest(JobQueueTests, unittest.TestCase):
+    backend = _SqliteBackend
+
+
+class RedisJobQueueTest(JobQueueTests, unittest.TestCase):
+    backend = _RedisBackend
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from core.logindex import LogIndex
+
+
+def _line(second: int, message: str, level: str = "INFO", pt_pin: str = "-") -> str:
+    return (
+        f"2026-01-01 00:00:{second:02d}.000 | {level: <8} | run1 | {pt_pin} | "
+        f"main:main:1 - {message}\n"
+    )
+
+
+class LogIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_dir = Path(self.tmp.name) / "logs"
+        self.log_dir.mkdir()
+        self.index = LogIndex(
+            log_dir=str(self.log_dir), db_path=str(Path(self.tmp.name) / "index.db")
+        )
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def write(self, name: str, lines, mode: str = "w"):
+        with open(self.log_dir / name, mode, encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def rotate(self, name: str):
+        """
+        与loguru相同, 把app.log改名后压缩
+        """
+        rotated = self.log_dir / name
+        (self.log_dir / "app.log").rename(rotated)
+        with zipfile.ZipFile(f"{rotated}.zip", "w") as archive:
+            archive.write(rotated, rotated.name)
+        rotated.unlink()
+
+    def all_pages(self, limit: int, **filters):
+        messages, cursor = [], None
+        while True:
+            page = self.index.search(cursor=cursor, limit=limit, **filters)
+            messages.extend(item["message"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return messages
+
+    def test_pagination_across_rotation(self):
+        self.write("app.log", [_line(i, f"m{i}") for i in range(10)])
+        self.assertEqual(self.index.update(), 10)
+
+        self.rotate("app.2026-01-01_00-00-10_000000.log")
+        self.write("app.log", [_line(i, f"m{i}") for i in range(10, 25)])
+        # 改名压缩后的文件不重复解析
+        self.assertEqual(self.index.update(), 15)
+
+        expected = [f"m{i}" for i in reversed(range(25))]
+        self.assertEqual(self.all_pages(limit=7), expected)
+        self.assertEqual(self.all_pages(limit=100), expected)
+
+    def test_same_timestamp_pages_by_id(self):
+        self.write("app.log", [_line(0, f"m{i}") for i in range(9)])
+        self.assertEqual(
+            self.all_pages(limit=4), [f"m{i}" for i in reversed(range(9))]
+        )
+
+    def test_incremental_append_and_continuation(self):
+        self.write("app.log", [_line(0, "first"), _line(1, "second")])
+        self.index.update()
+        self.write("app.log", ["Traceback line\n", _line(2, "third"), "partial"], mode="a")
+        self.assertEqual(self.index.update(), 1)
+
+        self.assertEqual(self.all_pages(limit=10), ["third", "second\nTraceback line", "first"])
+
+    def test_filters(self):
+        self.write(
+            "app.log",
+            [
+                _line(0, "a", pt_pin="abc123"),
+                _line(1, "b", level="ERROR", pt_pin="abc123"),
+                _line(2, "c keyword", level="WARNING"),
+            ],
+        )
+        self.assertEqual(self.all_pages(limit=10, pt_pin="abc123"), ["b", "a"])
+        self.assertEqual(self.all_pages(limit=10, level="WARNING"), ["c keyword", "b"])
+        self.assertEqual(self.all_pages(limit=10, keyword="keyword"), ["c keyword"])
+        with self.assertRaises(ValueError):
+            self.index.search(cursor="bad")
+
+    def test_deleted_rotated_file_is_removed(self):
+        self.write("app.log", [_line(0, "old")])
+        self.index.update()
+        self.rotate("app.2026-01-01_00-00-01_000000.log")
+        self.write("app.log", [_line(1, "new")])
+        self.index.update()
+
+        (self.log_dir / "app.2026-01-01_00-00-01_000000.log.zip").unlink()
+        self.assertEqual(self.all_pages(limit=10), ["new"])
+
+    def test_broken_file_is_reported_on_stderr(self):
+        self.write("app.log", [_line(0, "ok")])
+        (self.log_dir / "app.2026-01-01_00-00-00_000000.log.zip").write_bytes(b"not a zip")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(self.index.update(), 1)
+        self.assertIn("解析日志文件", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import config
+from core.proxy_pool import ProxyPool, get_proxy_pool
+from models import ProxyConfig, ProxyPoolConfig
+
+SERVERS = ["http://127.0.0.1:8001", "http://127.0.0.1:8002"]
+
+
+def _pool(state_path) -> ProxyPool:
+    return ProxyPool(
+        [ProxyConfig(server=server) for server in SERVERS],
+        window=100,
+        state_path=str(state_path),
+    )
+
+
+def _login_many(state_path, prefix, count):
+    """
+    在子进程中给count个账号分配代理并记录登录成功, 每次都保存
+    """
+    pool = _pool(state_path)
+    for i in range(count):
+        server = pool.acquire(f"{prefix}{i}")["server"]
+        pool.release(server, True)
+        asyncio.run(pool.save())
+
+
+class ProxyPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = Path(self.tmp.name) / "proxy_pool.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_state(self) -> dict:
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_acquire_and_release_do_not_write(self):
+        pool = _pool(self.state_path)
+        server = pool.acquire("pin_a")["server"]
+        pool.release(server, False, "网络超时")
+        self.assertFalse(self.state_path.exists())
+
+        asyncio.run(pool.save())
+        state = self.read_state()
+        self.assertEqual(state["affinity"], {"pin_a": server})
+        self.assertEqual(state["stats"][server]["results"], [0])
+
+    def test_save_merges_other_pools(self):
+        first, second = _pool(self.state_path), _pool(self.state_path)
+        server_a = first.acquire("pin_a")["server"]
+        first.release(server_a, True)
+        server_b = second.acquire("pin_b")["server"]
+        second.release(server_b, False, "网络超时")
+
+        asyncio.run(first.save())
+        asyncio.run(second.save())
+
+        state = self.read_state()
+        self.assertEqual(state["affinity"], {"pin_a": server_a, "pin_b": server_b})
+        results = sum((state["stats"][server]["results"] for server in SERVERS), [])
+        self.assertEqual(sorted(results), [0, 1])
+        # 保存后本进程也看到其它进程的绑定
+        self.assertEqual(second.affinity, state["affinity"])
+
+    def test_failed_save_keeps_changes(self):
+        pool = _pool(self.state_path)
+        server = pool.acquire("pin_a")["server"]
+        pool.release(server, True)
+        # 状态文件所在目录被同名文件占用, 保存失败
+        blocker = Path(self.tmp.name) / "blocked"
+        blocker.write_text("")
+        pool.state_path = blocker / "proxy_pool.json"
+        asyncio.run(pool.save())
+
+        pool.state_path = self.state_path
+        asyncio.run(pool.save())
+        state = self.read_state()
+        self.assertEqual(state["affinity"], {"pin_a": server})
+        self.assertEqual(state["stats"][server]["results"], [1])
+
+    def test_config_failures_are_not_scored(self):
+        pool = _pool(self.state_path)
+        server = pool.acquire("pin_a")["server"]
+        pool.release(server, False, "sms_func为no关闭, 跳过短信验证码识别环节")
+        self.assertEqual(pool.stats[server]["results"], [])
+        self.assertEqual(pool.in_use[server], 0)
+
+    def test_concurrent_processes_keep_every_change(self):
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_login_many, args=(str(self.state_path), f"p{n}_", 10))
+            for n in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+
+        state = self.read_state()
+        self.assertEqual(len(state["affinity"]), 40)
+        results = sum((state["stats"][server]["results"] for server in SERVERS), [])
+        self.assertEqual(len(results), 40)
+
+
+class ProxyConfigReloadTest(unittest.TestCase):
+    def test_default_proxy_follows_config(self):
+        from core.login import get_default_proxy
+
+        with mock.patch.object(config, "proxy_config", ProxyConfig(server=SERVERS[0])):
+            self.assertEqual(get_default_proxy(), {"server": SERVERS[0]})
+        with mock.patch.object(config, "proxy_config", ProxyConfig(server=SERVERS[1])):
+            self.assertEqual(get_default_proxy(), {"server": SERVERS[1]})
+        with mock.patch.object(config, "proxy_config", None):
+            self.assertIsNone(get_default_proxy())
+
+    def test_proxy_pool_rebuilt_on_config_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pool_config = ProxyPoolConfig(
+                enable=True,
+                proxies=[ProxyConfig(server=SERVERS[0])],
+                state_path=str(Path(tmp) / "proxy_pool.json"),
+            )
+            with mock.patch.object(config, "proxy_pool_config", pool_config):
+                first = get_proxy_pool()
+                self.assertIs(get_proxy_pool(), first)
+                # 热加载原地更新配置对象
+                pool_config.proxies = [ProxyConfig(server=server) for server in SERVERS]
+                second = get_proxy_pool()
+                self.assertIsNot(second, first)
+                self.assertEqual(list(second.proxies), SERVERS)
+                pool_config.enable = False
+                self.assertIsNone(get_proxy_pool())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+from typing import Optional
+
+from aiohttp import web
+
+from core.refresher import HttpExchangeRefresher, Refresher, RefresherChain
+from models import AccountConfig
+
+
+class FakeBrowserRefresher(Refresher):
+    name = "browser"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def refresh(self, user: str, account: AccountConfig) -> Optional[str]:
+        self.calls += 1
+        return "browser_pt_key"
+
+
+def _account(wskey: Optional[str]) -> AccountConfig:
+    return AccountConfig(username="user", password="password", pt_pin="pin", wskey=wskey)
+
+
+class RefresherChainTest(unittest.TestCase):
+    def run_chain(self, accounts):
+        requests = []
+
+        async def exchange(request):
+            requests.append(await request.json())
+            return web.json_response({"pt_key": "http_pt_key"})
+
+        async def run():
+            app = web.Application()
+            app.router.add_post("/exchange", exchange)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            browser = FakeBrowserRefresher()
+            chain = RefresherChain(
+                [HttpExchangeRefresher(f"http://127.0.0.1:{port}/exchange", verify=False), browser]
+            )
+            try:
+                pt_keys = [await chain.refresh("user", account) for account in accounts]
+            finally:
+                await chain.close()
+                await runner.cleanup()
+            return pt_keys, chain, browser
+
+        pt_keys, chain, browser = asyncio.run(run())
+        return pt_keys, chain, browser, requests
+
+    def test_account_without_wskey_skips_http(self):
+        pt_keys, chain, browser, requests = self.run_chain([_account(None), _account("")])
+
+        self.assertEqual(pt_keys, ["browser_pt_key", "browser_pt_key"])
+        self.assertEqual(requests, [])
+        self.assertEqual(chain.stats["http"]["attempts"], 0)
+        self.assertEqual(chain.stats["http"]["skips"], 2)
+        self.assertEqual(browser.calls, 2)
+        self.assertIn("跳过2次", chain.summary())
+
+    def test_account_with_wskey_uses_http(self):
+        pt_keys, chain, browser, requests = self.run_chain([_account("wskey")])
+
+        self.assertEqual(pt_keys, ["http_pt_key"])
+        self.assertEqual(requests, [{"username": "user", "pt_pin": "pin", "wskey": "wskey"}])
+        self.assertEqual(chain.stats["http"]["successes"], 1)
+        self.assertEqual(browser.calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import asyncio
+import socket
+import unittest
+from unittest import mock
+
+from models import QinglongConfig
+from web.tasks import TaskRunner
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TaskRunnerTest(unittest.TestCase):
+    def test_run_without_reachable_panel_fails(self):
+        import main
+
+        panel = QinglongConfig(
+            url=f"http://127.0.0.1:{_closed_port()}",
+            username="admin",
+            password="admin",
+            timeout=2,
+            max_retries=0,
+        )
+
+        async def run():
+            runner = TaskRunner()
+            status = runner.start()
+            await runner._task
+            return runner.get(status.task_id)
+
+        with mock.patch.object(main, "qinglong_datas", [panel]):
+            status = asyncio.run(run())
+
+        self.assertEqual(status.status, "failed")
+        self.assertIn("没有可用的青龙面板", status.message)
+        self.assertIsNotNone(status.end_time)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import unittest
+
+from core.workers import WorkerPool
+from models import AccountConfig
+
+
+def _fake_worker(worker_id, task_queue, result_queue, mode=None):
+    """
+    不启动浏览器的工作进程, 账号名为crash时模拟进程崩溃
+    """
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        user, _ = task
+        if user == "crash":
+            os._exit(1)
+        result_queue.put(
+            {
+                "type": "result",
+                "worker": worker_id,
+                "user": user,
+                "pt_key": f"pt_key_{user}",
+                "error": None,
+                "duration": 0.0,
+            }
+        )
+    result_queue.put({"type": "stats", "worker": worker_id, "stats": {}})
+
+
+def _account(user: str) -> AccountConfig:
+    return AccountConfig(username=user, password="password", pt_pin=f"pin_{user}")
+
+
+class WorkerPoolTest(unittest.TestCase):
+    def run_pool(self, workers, users):
+        async def run():
+            pool = WorkerPool(workers, target=_fake_worker)
+            pool.start()
+            try:
+                for user in users:
+                    pool.submit(user, _account(user))
+                results = []
+                async for result in pool.results():
+                    results.append(result)
+                return results
+            finally:
+                await pool.close(timeout=5)
+
+        return asyncio.run(asyncio.wait_for(run(), 30))
+
+    def test_all_accounts_refreshed(self):
+        results = self.run_pool(2, [f"user{i}" for i in range(6)])
+        self.assertEqual(
+            {result["user"]: result["pt_key"] for result in results},
+            {f"user{i}": f"pt_key_user{i}" for i in range(6)},
+        )
+
+    def test_crashed_worker_fails_its_account_only(self):
+        users = ["crash"] + [f"user{i}" for i in range(5)]
+        results = {result["user"]: result for result in self.run_pool(2, users)}
+
+        self.assertEqual(set(results), set(users))
+        self.assertIsNone(results["crash"]["pt_key"])
+        self.assertEqual(results["crash"]["error"], "刷新工作进程异常退出")
+        for i in range(5):
+            self.assertEqual(results[f"user{i}"]["pt_key"], f"pt_key_user{i}")
+
+    def test_all_workers_crashed_fails_remaining_accounts(self):
+        results = self.run_pool(1, ["crash", "user0", "user1"])
+
+        self.assertEqual([result["user"] for result in results][0], "crash")
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result["pt_key"] is None for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+京东Cookie自动获取项目 - 验证码样本记录模块
+
+本模块在开启记录开关后，把登录过程中遇到的每一次验证码尝试保存到数据集目录，
+用于离线回放和识别器的性能、准确率评测。无论是否开启记录, 每次尝试的结果都会计入运行指标。
+
+数据集目录结构：
+    <dataset_dir>/index.jsonl   每行一条尝试记录
+    <dataset_dir>/images/       按内容sha1命名的图片, 相同图片只保存一份
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Union
+from loguru import logger
+from core.metrics import captcha_attempts
+
+
+class CaptchaRecorder:
+    """
+    验证码样本记录器类
+    一次尝试先通过begin登记, 等验证结果出来后再通过commit落盘
+    """
+
+    def __init__(self, dataset_dir: str = "captcha_dataset", enable: bool = True):
+        """
+        初始化验证码样本记录器
+
+        Args:
+            dataset_dir: 数据集目录
+            enable: 是否启用记录
+        """
+        self.dataset_dir = dataset_dir
+        self.enable = enable
+        self._pending: Optional[Dict[str, Any]] = None
+        self._kind: Optional[str] = None
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.dataset_dir, "index.jsonl")
+
+    @property
+    def images_dir(self) -> str:
+        return os.path.join(self.dataset_dir, "images")
+
+    def _save_image(self, img: Union[bytes, str]) -> str:
+        """
+        保存图片并返回相对数据集目录的路径
+
+        Args:
+            img: 图片bytes、图片文件路径或data url形式的base64字符串
+        """
+        if isinstance(img, str):
+            if os.path.isfile(img):
+                with open(img, "rb") as f:
+                    img = f.read()
+            else:
+                img = base64.b64decode(img.split("base64,", 1)[-1])
+        name = f"{hashlib.sha1(img).hexdigest()}.png"
+        os.makedirs(self.images_dir, exist_ok=True)
+        path = os.path.join(self.images_dir, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(img)
+        return os.path.join("images", name)
+
+    def begin(
+        self,
+        kind: str,
+        images: Dict[str, Union[bytes, str, None]],
+        prompt: Optional[str] = None,
+        bbox: Optional[Dict[str, float]] = None,
+        action: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        登记一次验证码尝试, 未提交的上一次尝试按失败处理
+
+        Args:
+            kind: 验证码类型, slide/shape/color/text/image
+            images: 图片字典, 如 {"background": bytes, "target": "tmp/small_img.png"}
+            prompt: 提示文字
+            bbox: 背景图在页面上的位置和尺寸
+            action: 执行的动作, 如滑动距离或点击坐标
+        """
+        if self._kind is not None:
+            self.commit(False)
+        self._kind = kind
+        if not self.enable:
+            return
+        try:
+            self._pending = {
+                "id": uuid.uuid4().hex,
+                "time": time.time(),
+                "kind": kind,
+                "prompt": prompt,
+                "bbox": bbox,
+                "action": action,
+                "images": {
+                    key: self._save_image(value)
+                    for key, value in images.items()
+                    if value
+                },
+            }
+        except Exception as e:
+            logger.warning(f"记录验证码样本失败: {e}")
+            self._pending = None
+
+    def add_images(self, images: Dict[str, Union[bytes, str, None]]):
+        """
+        为当前尝试补充图片
+
+        Args:
+            images: 图片字典
+        """
+        if self._pending is None:
+            return
+        try:
+            for key, value in images.items():
+                if value:
+                    self._pending["images"][key] = self._save_image(value)
+        except Exception as e:
+            logger.warning(f"记录验证码样本失败: {e}")
+
+    def update_action(self, action: Dict[str, Any]):
+        """
+        补充当前尝试执行的动作
+
+        Args:
+            action: 执行的动作
+        """
+        if self._pending is not None:
+            self._pending["action"] = action
+
+    def commit(self, passed: bool):
+        """
+        提交当前尝试的验证结果并写入数据集
+
+        Args:
+            passed: 是否验证通过
+        """
+        if self._kind is not None:
+            captcha_attempts.inc(type=self._kind, result="passed" if passed else "failed")
+            self._kind = None
+        if self._pending is None:
+            return
+        record, self._pending = self._pending, None
+        record["passed"] = passed
+        try:
+            os.makedirs(self.dataset_dir, exist_ok=True)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning(f"写入验证码样本失败: {e}")
+
+
+def load_dataset(dataset_dir: str) -> List[Dict[str, Any]]:
+    """
+    读取数据集中的所有记录, 并把图片路径替换为图片bytes
+
+    Args:
+        dataset_dir: 数据集目录
+
+    Returns:
+        List[Dict[str, Any]]: 记录列表
+    """
+    records = []
+    with open(os.path.join(dataset_dir, "index.jsonl"), "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            images = {}
+            for key, rel_path in record.get("images", {}).items():
+                with open(os.path.join(dataset_dir, rel_path), "rb") as img:
+                    images[key] = img.read()
+            record["images"] = images
+            records.append(record)
+    return records
+
+
+def get_captcha_recorder() -> CaptchaRecorder:
+    """
+    按全局配置创建验证码样本记录器, 每次验证码流程使用一个独立实例
+
+    Returns:
+        CaptchaRecorder: 验证码样本记录器实例
+    """
+    from config import global_config
+
+    return CaptchaRecorder(
+        dataset_dir=global_config.captcha_dataset_dir,
+        enable=global_config.record_captcha,
+    )
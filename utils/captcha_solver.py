@@ -14,10 +14,6 @@ import random
 from typing import Optional, Tuple, List
 from loguru import logger
 from playwright.async_api import Page
-import cv2
-import numpy as np
-from PIL import Image
-import ddddocr
 
 
 class CaptchaSolver:
@@ -27,6 +23,8 @@ class CaptchaSolver:
         self.custom_ocr = None
 
     def init_models(self):
+        import ddddocr
+
         try:
             self.ocr = ddddocr.DdddOcr(det=False, ocr=False, show_ad=False)
             self.det = ddddocr.DdddOcr(det=True, show_ad=False)
@@ -53,6 +51,8 @@ class CaptchaSolver:
         slider_selector: str = "img.move-img",
         move_solve_type: str = "",
     ) -> bool:
+        from PIL import Image
+
         for i in range(retry_times):
             logger.info(f"第{i + 1}次滑块验证尝试")
             try:
@@ -287,6 +287,8 @@ class CaptchaSolver:
     def _ddddocr_find_bytes_pic(
         self, target_bytes: bytes, background_bytes: bytes
     ) -> int:
+        import ddddocr
+
         det = ddddocr.DdddOcr(det=False, ocr=False, show_ad=False)
         res = det.slide_match(target_bytes, background_bytes, simple_target=True)
         return res["target"][0]
@@ -420,6 +422,9 @@ class CaptchaSolver:
             target_bytes = f.read()
         with open(background_file, "rb") as f:
             background_bytes = f.read()
+
+        import ddddocr
+
         det = ddddocr.DdddOcr(det=False, ocr=False, show_ad=False)
         res = det.slide_match(target_bytes, background_bytes, simple_target=True)
         return res
@@ -433,11 +438,10 @@ class CaptchaSolver:
         button,
         refresh_button,
     ) -> bool:
-        from utils.consts import supported_colors
-        from utils.tools import get_shape_location_by_color
+        from utils.tools import get_shape_location_by_color, resolve_color_name
 
         target_color = word.split("请选出图中")[1].split("的图形")[0]
-        if target_color not in supported_colors:
+        if resolve_color_name(target_color) is None:
             logger.info(f"不支持{target_color}，刷新中")
             await refresh_button.click()
             await asyncio.sleep(random.uniform(2, 4))
@@ -473,6 +477,7 @@ class CaptchaSolver:
         refresh_button,
     ) -> bool:
         import re
+        import cv2
         from utils.tools import (
             get_shape_location_by_type,
             expand_coordinates,
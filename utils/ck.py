@@ -10,6 +10,7 @@ import random
 from utils.tools import send_request, sanitize_header_value, extract_pt_pin
 from typing import List, Dict, Any, Optional
 from core.logger import logger
+from core.metrics import cookie_checks
 
 
 class CheckCkCode(Enum):
@@ -60,6 +61,7 @@ async def check_ck(cookie: str) -> Dict[str, Any]:
         
         if r.get("retcode") == str(CheckCkCode.NOT_LOGIN.value):
             logger.info(f"Cookie检测失败: 账号未登录，pt_pin={pt_pin}")
+            cookie_checks.inc(result="invalid")
             return {
                 "success": False,
                 "code": CheckCkCode.NOT_LOGIN.value,
@@ -69,6 +71,7 @@ async def check_ck(cookie: str) -> Dict[str, Any]:
             }
         
         logger.info(f"Cookie检测成功: 账号正常，pt_pin={pt_pin}")
+        cookie_checks.inc(result="valid")
         return {
             "success": True,
             "code": CheckCkCode.SUCCESS.value,
@@ -79,6 +82,7 @@ async def check_ck(cookie: str) -> Dict[str, Any]:
     except Exception as e:
         pt_pin = extract_pt_pin(cookie)
         logger.error(f"Cookie检测异常: pt_pin={pt_pin}, 错误信息: {str(e)}")
+        cookie_checks.inc(result="error")
         return {
             "success": False,
             "code": CheckCkCode.NETWORK_ERROR.value,
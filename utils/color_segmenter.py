@@ -0,0 +1,169 @@
+"""
+京东Cookie自动获取项目 - 颜色分割模块
+
+本模块用于颜色点选验证码, 对背景图只做一次分析：
+1. 根据 utils.consts.supported_colors 预先生成 H×S×V 的查找表, 每种颜色占一位,
+   颜色范围互相重叠的像素(例如色相125~130同时属于蓝色和紫色)同时带有两种颜色
+2. 转为HSV后一次查表得到每个像素的颜色, 不再对每种颜色单独调用 cv2.inRange
+3. 对图中出现的每种颜色求连通域, 得到各连通域的质心、面积和外接矩形, 忽略占据大半张图的背景
+同一张图片的分析结果按内容缓存, 任意颜色提示都从同一次分析中回答。
+
+本模块依赖cv2和numpy, 只在识别时由 utils.tools 导入。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.consts import supported_colors
+
+# 查找表中各颜色的位, 支持的颜色不超过8种, 查找表使用uint8
+COLOR_NAMES = tuple(supported_colors)
+COLOR_BITS = {name: 1 << i for i, name in enumerate(COLOR_NAMES)}
+
+# 面积(像素数)低于该值的连通域视为噪点
+MIN_AREA = 100
+# 面积超过图片面积该比例的连通域视为背景, 例如浅色背景落在灰色范围内
+MAX_AREA_RATIO = 0.5
+
+_lut: Optional[np.ndarray] = None
+_lut_lock = threading.Lock()
+_cache: "OrderedDict[str, Dict[str, List[dict]]]" = OrderedDict()
+_cache_size = 8
+_cache_lock = threading.Lock()
+
+
+def get_color_lut() -> np.ndarray:
+    """
+    获取颜色查找表, 首次调用时生成
+
+    Returns:
+        np.ndarray: 形状为 (180, 256, 256) 的uint8数组, 按OpenCV的HSV取值索引,
+            值为该HSV所属颜色的位的组合
+    """
+    global _lut
+    with _lut_lock:
+        if _lut is None:
+            lut = np.zeros((180, 256, 256), np.uint8)
+            for name, (lower, upper) in supported_colors.items():
+                lut[
+                    lower[0] : upper[0] + 1,
+                    lower[1] : upper[1] + 1,
+                    lower[2] : upper[2] + 1,
+                ] |= COLOR_BITS[name]
+            _lut = lut
+    return _lut
+
+
+def label_pixels(img: np.ndarray) -> np.ndarray:
+    """
+    给每个像素标注所属的颜色
+
+    Args:
+        img: BGR图像
+
+    Returns:
+        np.ndarray: 与图像同宽高的uint8数组, 值为 COLOR_BITS 中的位的组合
+    """
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    return get_color_lut()[hsv[:, :, 0], hsv[:, :, 1], hsv[:, :, 2]]
+
+
+def analyze_colors(img: np.ndarray, min_area: int = MIN_AREA) -> Dict[str, List[dict]]:
+    """
+    对一张图片做一次颜色分割, 返回每种颜色的连通域
+
+    Args:
+        img: BGR图像
+        min_area: 最小面积
+
+    Returns:
+        Dict[str, List[dict]]: 颜色到连通域列表的字典, 只包含图中出现的颜色,
+            连通域按面积从大到小排列, 每个包含 center(质心)、area、bbox;
+            面积超过 MAX_AREA_RATIO 的背景不计入
+    """
+    labels = label_pixels(img)
+    max_area = MAX_AREA_RATIO * labels.shape[0] * labels.shape[1]
+    present = int(np.bitwise_or.reduce(labels, axis=None))
+    result = {}
+    for name in COLOR_NAMES:
+        bit = COLOR_BITS[name]
+        if not present & bit:
+            continue
+        mask = (labels & bit).astype(bool).view(np.uint8)
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        components = []
+        # 0号连通域是背景
+        for i in range(1, count):
+            area = int(stats[i, cv2.CC_STAT_AREA])
+            if area < min_area or area > max_area:
+                continue
+            components.append(
+                {
+                    "center": (int(round(centroids[i][0])), int(round(centroids[i][1]))),
+                    "area": area,
+                    "bbox": tuple(int(v) for v in stats[i, :4]),
+                }
+            )
+        if components:
+            components.sort(key=lambda component: component["area"], reverse=True)
+            result[name] = components
+    return result
+
+
+def recognize_colors(img_path: str) -> Dict[str, List[dict]]:
+    """
+    分析图片文件中各颜色的连通域, 相同内容的图片只分析一次
+
+    Args:
+        img_path: 图片路径
+
+    Returns:
+        Dict[str, List[dict]]: 见 analyze_colors
+    """
+    with open(img_path, "rb") as f:
+        data = f.read()
+    key = hashlib.sha1(data).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    result = analyze_colors(img) if img is not None else {}
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+    return result
+
+
+def release():
+    """
+    释放颜色查找表(约11MB)和分析结果缓存, 下次识别时重新生成, 供定时任务空闲时释放内存
+    """
+    global _lut
+    with _lut_lock:
+        _lut = None
+    with _cache_lock:
+        _cache.clear()
+
+
+def locate_color(img_path: str, color: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    获取指定颜色面积最大的连通域的质心
+
+    Args:
+        img_path: 图片路径
+        color: supported_colors 中的颜色
+
+    Returns:
+        Tuple[Optional[int], Optional[int]]: 质心坐标, 未找到时为 (None, None)
+    """
+    components = recognize_colors(img_path).get(color)
+    if not components:
+        return None, None
+    return components[0]["center"]
@@ -24,6 +24,17 @@ supported_colors = {
     "黄色": ([25, 50, 50], [35, 255, 255]),
     "红色": ([0, 50, 50], [10, 255, 255]),
 }
+# 不在 supported_colors 中的颜色的参考 HSV 值, 识别时匹配到范围最接近的颜色
+# 白色、黑色等无彩色会匹配到灰色, 而灰色范围包含浅色背景, 所以不在此列出, 遇到时直接刷新
+color_references = {
+    "青色": [90, 255, 255],
+    "天蓝色": [100, 130, 235],
+    "洋红色": [150, 255, 255],
+    "玫红色": [165, 220, 230],
+    "棕色": [15, 180, 120],
+    "褐色": [15, 180, 120],
+    "金色": [24, 255, 230],
+}
 supported_sms_func = ["no", "webhook", "manual_input"]
 supported_voice_func = ["no", "manual_input"]
 # 默认的UA, 可以在config.py里配置
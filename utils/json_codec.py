@@ -0,0 +1,113 @@
+"""
+京东Cookie自动获取项目 - JSON编解码模块
+
+本模块提供统一的JSON编解码入口，安装了orjson时使用orjson，否则回退到标准库json。
+青龙API、通知发送、配置文件读写以及Web接口的响应都通过本模块完成序列化，
+环境变量较多时可以明显减少解析耗时。
+
+可通过环境变量 JSON_CODEC=json 强制使用标准库, 或在运行时调用 use_backend 切换。
+"""
+
+import json
+import os
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_backend = "json"
+
+
+def use_backend(name: str = "auto") -> str:
+    """
+    切换JSON编解码后端
+
+    Args:
+        name: auto、orjson或json, auto表示有orjson时使用orjson
+
+    Returns:
+        str: 实际使用的后端名称
+
+    Raises:
+        ValueError: 后端名称不支持或orjson未安装时抛出异常
+    """
+    global _backend
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in ("orjson", "json"):
+        raise ValueError(f"不支持的JSON后端: {name}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson未安装")
+    _backend = name
+    return _backend
+
+
+def get_backend() -> str:
+    """
+    获取当前使用的JSON编解码后端
+    """
+    return _backend
+
+
+def dumpb(obj: Any, indent: bool = False) -> bytes:
+    """
+    序列化为UTF-8编码的bytes, 非ASCII字符不转义
+
+    Args:
+        obj: 要序列化的对象
+        indent: 是否以2个空格缩进输出
+
+    Returns:
+        bytes: JSON数据
+    """
+    if _backend == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return _stdlib_dumps(obj, indent).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    序列化为str, 非ASCII字符不转义
+
+    Args:
+        obj: 要序列化的对象
+        indent: 是否以2个空格缩进输出
+
+    Returns:
+        str: JSON字符串
+    """
+    if _backend == "orjson":
+        return dumpb(obj, indent).decode("utf-8")
+    return _stdlib_dumps(obj, indent)
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """
+    反序列化JSON数据
+
+    Args:
+        data: JSON字符串或bytes
+
+    Returns:
+        Any: 反序列化后的对象
+    """
+    if _backend == "orjson":
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj: Any, indent: bool) -> str:
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+use_backend(os.environ.get("JSON_CODEC", "auto"))
@@ -0,0 +1,79 @@
+"""
+京东Cookie自动获取项目 - 内存管理模块
+
+本模块提供常驻进程(定时任务)的内存统计和空闲时的资源释放：
+1. 读取当前进程的常驻内存(RSS)
+2. 释放OCR模型、颜色查找表和验证码分析缓存, 执行垃圾回收, 并把空闲的堆内存归还给操作系统
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import sys
+
+from loguru import logger
+
+
+def get_rss_mb() -> float:
+    """
+    获取当前进程的常驻内存
+
+    Returns:
+        float: 常驻内存(MB), 无法获取时返回0
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        # 非Linux系统只能拿到峰值内存, macOS单位为字节, 其它为KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return 0.0
+
+
+def trim_memory() -> bool:
+    """
+    执行垃圾回收, 并调用glibc的malloc_trim把空闲堆内存归还给操作系统
+
+    Returns:
+        bool: 是否调用了malloc_trim
+    """
+    gc.collect()
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        libc.malloc_trim(0)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+def release_idle_resources() -> float:
+    """
+    释放空闲时不需要的资源: 已创建的OCR模型实例、颜色查找表和形状/颜色验证码的分析缓存,
+    然后回收内存
+
+    Returns:
+        float: 释放后的常驻内存(MB)
+    """
+    before = get_rss_mb()
+    # 只有处理过验证码才会导入ocr_manager, 未导入时不触发导入
+    ocr_manager_module = sys.modules.get("utils.ocr_manager")
+    if ocr_manager_module is not None:
+        ocr_manager_module.get_ocr_manager().release()
+    for name in ("utils.color_segmenter", "utils.shape_recognizer"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.release()
+    trim_memory()
+    after = get_rss_mb()
+    logger.info(f"空闲资源已释放, 内存{before:.1f}MB -> {after:.1f}MB")
+    return after
@@ -10,11 +10,12 @@
 """
 
 import os
-from typing import Optional, Dict, Any
-import cv2
-import numpy as np
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from loguru import logger
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class OcrEngine:
     def __init__(self, engine_type: str = "ddddocr"):
@@ -53,7 +54,7 @@ class OcrEngine:
             logger.warning("PaddleOCR未安装，回退到ddddocr")
             self._init_ddddocr()
 
-    def detect(self, image: np.ndarray) -> list:
+    def detect(self, image: "np.ndarray") -> list:
         if self.engine_type == "ddddocr":
             return self._detect_ddddocr(image)
         elif self.engine_type == "paddleocr":
@@ -61,12 +62,14 @@ class OcrEngine:
         else:
             return self._detect_ddddocr(image)
 
-    def _detect_ddddocr(self, image: np.ndarray) -> list:
+    def _detect_ddddocr(self, image: "np.ndarray") -> list:
+        import cv2
+
         _, buffer = cv2.imencode(".jpg", image)
         image_bytes = buffer.tobytes()
         return self._engine.detection(image_bytes)
 
-    def _detect_paddleocr(self, image: np.ndarray) -> list:
+    def _detect_paddleocr(self, image: "np.ndarray") -> list:
         result = self._engine.ocr(image, cls=True)
         boxes = []
         for line in result:
@@ -77,7 +80,7 @@ class OcrEngine:
                 boxes.append([x1, y1, x2, y2])
         return boxes
 
-    def classify(self, image: np.ndarray) -> str:
+    def classify(self, image: "np.ndarray") -> str:
         if self.engine_type == "ddddocr":
             return self._classify_ddddocr(image)
         elif self.engine_type == "paddleocr":
@@ -85,19 +88,21 @@ class OcrEngine:
         else:
             return self._classify_ddddocr(image)
 
-    def _classify_ddddocr(self, image: np.ndarray) -> str:
+    def _classify_ddddocr(self, image: "np.ndarray") -> str:
+        import cv2
+
         _, buffer = cv2.imencode(".jpg", image)
         image_bytes = buffer.tobytes()
         return self._engine.classification(image_bytes, png_fix=True)
 
-    def _classify_paddleocr(self, image: np.ndarray) -> str:
+    def _classify_paddleocr(self, image: "np.ndarray") -> str:
         result = self._engine.ocr(image, cls=True)
         if result and len(result) > 0 and len(result[0]) > 0:
             return result[0][0][0]
         return ""
 
     def slide_match(
-        self, target: np.ndarray, background: np.ndarray, simple_target: bool = True
+        self, target: "np.ndarray", background: "np.ndarray", simple_target: bool = True
     ) -> Dict[str, Any]:
         if self.engine_type == "ddddocr":
             return self._slide_match_ddddocr(target, background, simple_target)
@@ -105,8 +110,9 @@ class OcrEngine:
             return self._slide_match_ddddocr(target, background, simple_target)
 
     def _slide_match_ddddocr(
-        self, target: np.ndarray, background: np.ndarray, simple_target: bool
+        self, target: "np.ndarray", background: "np.ndarray", simple_target: bool
     ) -> Dict[str, Any]:
+        import cv2
         import ddddocr
 
         _, target_buffer = cv2.imencode(".jpg", target)
@@ -66,6 +66,23 @@ class OcrManager:
             )
         return self._my_ocr
 
+    def release(self) -> int:
+        """
+        释放已创建的OCR实例, 下次使用时重新创建
+
+        Returns:
+            int: 释放的实例数量
+        """
+        released = sum(
+            instance is not None for instance in (self._ocr, self._det, self._my_ocr)
+        )
+        self._ocr = None
+        self._det = None
+        self._my_ocr = None
+        if released:
+            logger.info(f"释放OCR实例{released}个")
+        return released
+
 
 _ocr_manager = None
 
@@ -0,0 +1,309 @@
+"""
+京东Cookie自动获取项目 - 形状识别模块
+
+本模块对形状点选验证码的背景图只做一次 灰度/饱和度 -> 高斯模糊 -> Canny -> 找轮廓,
+然后为每个轮廓计算特征并给每种形状打分：
+1. 圆度(4πA/P²)和质心到轮廓距离的变异系数, 区分圆形、六边形和多边形
+2. 凸度(面积/凸包面积)和凸包缺陷, 识别五角星
+3. 凸包的角点数、最小外接矩形的宽高比和填充率, 区分三角形、正方形、长方形和梯形
+4. 与标准形状的Hu矩距离(cv2.matchShapes)
+同一张图片的分析结果按内容缓存, 任意形状提示都从同一次分析中回答。
+
+本模块依赖cv2和numpy, 只在识别时由 utils.tools 导入。
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 识别的形状, 圆环按圆形处理
+SHAPE_TYPES = ("三角形", "正方形", "长方形", "梯形", "六边形", "五角星", "圆形")
+
+# 轮廓面积低于图片面积的该比例时视为噪点
+MIN_AREA_RATIO = 0.002
+# 低于该得分的轮廓不作为答案
+MIN_SCORE = 0.5
+# 规则特征和Hu矩在得分中的权重
+RULE_WEIGHT = 0.7
+
+_cache: "OrderedDict[str, List[dict]]" = OrderedDict()
+_cache_size = 8
+_cache_lock = threading.Lock()
+_templates: Optional[Dict[str, np.ndarray]] = None
+
+
+def _near(value: float, target: float, tolerance: float) -> float:
+    """
+    value越接近target得分越高, 相差tolerance及以上时为0
+    """
+    return max(0.0, 1.0 - abs(value - target) / tolerance)
+
+
+def _ramp(value: float, low: float, high: float) -> float:
+    """
+    value从low到high线性地从0增加到1
+    """
+    if high == low:
+        return float(value >= high)
+    return min(1.0, max(0.0, (value - low) / (high - low)))
+
+
+def _corner_score(corners: int, expected: int) -> float:
+    return {0: 1.0, 1: 0.4}.get(abs(corners - expected), 0.0)
+
+
+def _template_points(shape_type: str, size: int = 100) -> np.ndarray:
+    c, r = size, size * 0.8
+    if shape_type == "圆形":
+        angles = np.linspace(0, 2 * np.pi, 72, endpoint=False)
+        points = [(c + r * np.cos(a), c + r * np.sin(a)) for a in angles]
+    elif shape_type == "三角形":
+        points = [(c, c - r), (c - r, c + r), (c + r, c + r)]
+    elif shape_type == "正方形":
+        points = [(c - r, c - r), (c + r, c - r), (c + r, c + r), (c - r, c + r)]
+    elif shape_type == "长方形":
+        points = [(c - r, c - r / 2), (c + r, c - r / 2), (c + r, c + r / 2), (c - r, c + r / 2)]
+    elif shape_type == "梯形":
+        points = [(c - r / 2, c - r / 2), (c + r / 2, c - r / 2), (c + r, c + r / 2), (c - r, c + r / 2)]
+    elif shape_type == "六边形":
+        angles = np.linspace(0, 2 * np.pi, 6, endpoint=False)
+        points = [(c + r * np.cos(a), c + r * np.sin(a)) for a in angles]
+    else:
+        points = []
+        for k in range(10):
+            radius = r if k % 2 == 0 else r * 0.45
+            angle = -np.pi / 2 + k * np.pi / 5
+            points.append((c + radius * np.cos(angle), c + radius * np.sin(angle)))
+    return np.array(points, np.float32).reshape(-1, 1, 2)
+
+
+def _get_templates() -> Dict[str, np.ndarray]:
+    global _templates
+    if _templates is None:
+        _templates = {shape_type: _template_points(shape_type) for shape_type in SHAPE_TYPES}
+    return _templates
+
+
+def contour_features(contour: np.ndarray) -> Optional[dict]:
+    """
+    计算轮廓的形状特征
+
+    Args:
+        contour: cv2.findContours得到的轮廓
+
+    Returns:
+        Optional[dict]: 特征字典, 轮廓退化(面积或周长为0)时返回None
+    """
+    area = cv2.contourArea(contour)
+    perimeter = cv2.arcLength(contour, True)
+    hull = cv2.convexHull(contour)
+    hull_area = cv2.contourArea(hull)
+    if area <= 0 or perimeter <= 0 or hull_area <= 0:
+        return None
+    moments = cv2.moments(contour)
+    cx, cy = moments["m10"] / moments["m00"], moments["m01"] / moments["m00"]
+
+    # 质心到轮廓各点距离的变异系数, 圆形接近0, 边数越少越大
+    points = contour.reshape(-1, 2).astype(np.float32)
+    distances = np.hypot(points[:, 0] - cx, points[:, 1] - cy)
+    radial_cv = float(distances.std() / distances.mean()) if distances.mean() > 0 else 1.0
+
+    hull_perimeter = cv2.arcLength(hull, True)
+    corners = len(cv2.approxPolyDP(hull, 0.04 * hull_perimeter, True))
+
+    # 深度超过等效半径15%的凸包缺陷, 五角星有5个
+    deep_defects = 0
+    try:
+        hull_indices = cv2.convexHull(contour, returnPoints=False)
+        defects = cv2.convexityDefects(contour, hull_indices)
+    except cv2.error:
+        defects = None
+    if defects is not None:
+        min_depth = 0.15 * math.sqrt(area / math.pi)
+        deep_defects = int((defects.reshape(-1, 4)[:, 3] / 256.0 > min_depth).sum())
+
+    (_, _), (rect_w, rect_h), _ = cv2.minAreaRect(contour)
+    short_side, long_side = sorted((rect_w, rect_h))
+    return {
+        "area": area,
+        "center": (cx, cy),
+        "bbox": cv2.boundingRect(contour),
+        "circularity": 4 * math.pi * area / perimeter ** 2,
+        "solidity": area / hull_area,
+        "radial_cv": radial_cv,
+        "corners": corners,
+        "deep_defects": deep_defects,
+        "aspect": long_side / short_side if short_side > 0 else float("inf"),
+        "extent": area / (rect_w * rect_h) if rect_w * rect_h > 0 else 0.0,
+        "hu_distances": {
+            shape_type: cv2.matchShapes(contour.astype(np.float32), template, cv2.CONTOURS_MATCH_I1, 0)
+            for shape_type, template in _get_templates().items()
+        },
+    }
+
+
+def score_shapes(features: dict) -> Dict[str, float]:
+    """
+    根据轮廓特征给每种形状打分
+
+    Args:
+        features: contour_features 返回的特征
+
+    Returns:
+        Dict[str, float]: 形状到0~1得分的字典
+    """
+    corners = features["corners"]
+    solidity = features["solidity"]
+    aspect = features["aspect"]
+    extent = features["extent"]
+    radial_cv = features["radial_cv"]
+    convex = _ramp(solidity, 0.8, 0.95)
+    quad = _corner_score(corners, 4) * convex * _near(extent, 1.0, 0.3)
+
+    rules = {
+        "圆形": convex
+        * _ramp(features["circularity"], 0.7, 0.85)
+        * _near(radial_cv, 0.0, 0.06)
+        * _ramp(corners, 5, 7),
+        "六边形": convex * _corner_score(corners, 6) * _near(radial_cv, 0.045, 0.04),
+        "三角形": convex * _corner_score(corners, 3) * _near(extent, 0.5, 0.25),
+        "正方形": quad * _near(aspect, 1.0, 0.35),
+        "长方形": quad * _ramp(aspect, 1.15, 1.5),
+        "梯形": convex * _corner_score(corners, 4) * _near(extent, 0.75, 0.15),
+        "五角星": _near(solidity, 0.55, 0.3) * _corner_score(features["deep_defects"], 5),
+    }
+    return {
+        shape_type: round(
+            RULE_WEIGHT * rule
+            + (1 - RULE_WEIGHT) * math.exp(-5 * features["hu_distances"][shape_type]),
+            4,
+        )
+        for shape_type, rule in rules.items()
+    }
+
+
+def analyze_shapes(img: np.ndarray) -> List[dict]:
+    """
+    对一张图片做一次轮廓分析, 返回所有候选形状
+
+    Args:
+        img: BGR图像
+
+    Returns:
+        List[dict]: 候选形状, 按最高得分从高到低排列, 每个包含
+            type(得分最高的形状)、score、scores(各形状得分)、center(质心)、bbox、area
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 1), 60, 60)
+    # 黄色等浅色形状在灰度图上和浅色背景几乎没有差别, 补充饱和度通道的边缘
+    saturation = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)[:, :, 1]
+    edges |= cv2.Canny(cv2.GaussianBlur(saturation, (5, 5), 1), 60, 60)
+    # 闭合边缘上的小缺口, 避免一个形状被拆成多段轮廓
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+
+    min_area = MIN_AREA_RATIO * img.shape[0] * img.shape[1]
+    candidates = []
+    for contour in contours:
+        if cv2.contourArea(contour) < min_area:
+            continue
+        features = contour_features(contour)
+        if features is None:
+            continue
+        scores = score_shapes(features)
+        best = max(scores, key=scores.get)
+        candidates.append(
+            {
+                "type": best,
+                "score": scores[best],
+                "scores": scores,
+                "center": (int(round(features["center"][0])), int(round(features["center"][1]))),
+                "bbox": features["bbox"],
+                "area": features["area"],
+            }
+        )
+    candidates.sort(key=lambda candidate: candidate["score"], reverse=True)
+    return candidates
+
+
+def recognize_shapes(img_path: str) -> List[dict]:
+    """
+    分析图片文件中的所有形状, 相同内容的图片只分析一次
+
+    Args:
+        img_path: 图片路径
+
+    Returns:
+        List[dict]: 候选形状, 见 analyze_shapes
+    """
+    with open(img_path, "rb") as f:
+        data = f.read()
+    key = hashlib.sha1(data).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    candidates = analyze_shapes(img) if img is not None else []
+    with _cache_lock:
+        _cache[key] = candidates
+        while len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+    return candidates
+
+
+def release():
+    """
+    清空分析结果缓存和标准形状模板, 供定时任务空闲时释放内存
+    """
+    global _templates
+    with _cache_lock:
+        _cache.clear()
+    _templates = None
+
+
+def find_shape(
+    candidates: List[dict], shape_type: str, min_score: float = MIN_SCORE
+) -> Optional[dict]:
+    """
+    从候选形状中选出该形状得分最高的一个
+
+    Args:
+        candidates: 候选形状
+        shape_type: 形状, 圆环按圆形处理
+        min_score: 最低得分
+
+    Returns:
+        Optional[dict]: 候选形状, 没有达到最低得分的候选时返回None
+    """
+    shape_type = "圆形" if shape_type == "圆环" else shape_type
+    best = max(
+        candidates,
+        key=lambda candidate: candidate["scores"].get(shape_type, 0),
+        default=None,
+    )
+    if best is None or best["scores"].get(shape_type, 0) < min_score:
+        return None
+    return best
+
+
+def locate_shape(img_path: str, shape_type: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    获取指定形状的中心坐标
+
+    Args:
+        img_path: 图片路径
+        shape_type: 形状
+
+    Returns:
+        Tuple[Optional[int], Optional[int]]: 中心坐标, 未找到时为 (None, None)
+    """
+    candidate = find_shape(recognize_shapes(img_path), shape_type)
+    if candidate is None:
+        return None, None
+    return candidate["center"]
@@ -1,18 +1,15 @@
 import aiohttp
 import asyncio
 import base64
-import cv2
-import ddddocr
 from enum import Enum
 import io
 from loguru import logger
-import numpy as np
 import random
 import os
-from PIL import Image
 import re
-from typing import Dict, Any, Union, List
-from utils.consts import supported_colors
+from typing import Dict, Any, Optional, Union, List
+from utils.consts import supported_colors, color_references
+from utils import json_codec
 
 
 def get_tmp_dir(tmp_dir: str = "./tmp"):
@@ -55,6 +52,8 @@ def ddddocr_find_bytes_pic(target_bytes, background_bytes, return_dict: bool = F
         int: 滚动长度（默认）
         dict: 完整结果字典（当return_dict=True时）
     """
+    import ddddocr
+
     det = ddddocr.DdddOcr(det=False, ocr=False, show_ad=False)
     res = det.slide_match(target_bytes, background_bytes, simple_target=True)
     if return_dict:
@@ -76,10 +75,14 @@ def get_img_bytes(img_src: str) -> bytes:
 
 
 def get_ocr(**kwargs):
+    import ddddocr
+
     return ddddocr.DdddOcr(show_ad=False, **kwargs)
 
 
 def save_img(img_name, img_bytes):
+    from PIL import Image
+
     tmp_dir = get_tmp_dir()
     img_path = os.path.join(tmp_dir, f"{img_name}.png")
     # with open(img_path, 'wb') as file:
@@ -106,15 +109,16 @@ def filter_forbidden_users(user_info: list, fields: list = None) -> list:
 
 def get_forbidden_users_dict(users_list: list, user_datas: dict) -> dict:
     """
-    获取用户phone:信息的列表
+    获取用户phone:信息列表的字典, 同一个pt_pin的多条环境变量都归到该用户下
     """
+    pt_pin_users = {}
+    for key in user_datas:
+        pt_pin_users.setdefault(user_datas[key].pt_pin, key)
     users_dict = {}
     for info in users_list:
-        for key in user_datas:
-            user_pt_pin = user_datas[key]["pt_pin"]
-            if user_pt_pin == extract_pt_pin(info["value"]):
-                users_dict[key] = info
-                break
+        user = pt_pin_users.get(extract_pt_pin(info["value"]))
+        if user is not None:
+            users_dict.setdefault(user, []).append(info)
     return users_dict
 
 
@@ -197,114 +201,77 @@ async def new_solve_slider_captcha(page, slider, distance, slide_difference):
     await asyncio.sleep(3)  # 等待3秒，等待滑块验证结果
 
 
-def sort_rectangle_vertices(vertices):
-    """
-    获取左上、右上、右下、左下顺序的坐标
+def get_shape_location_by_type(img_path, type: str):
     """
-    # 根据 y 坐标对顶点排序
-    vertices = sorted(vertices, key=lambda x: x[1])
+    获取指定形状在图片中的坐标
 
-    # 根据 x 坐标对前两个和后两个顶点分别排序
-    top_left, top_right = sorted(vertices[:2], key=lambda x: x[0])
-    bottom_left, bottom_right = sorted(vertices[2:], key=lambda x: x[0])
+    对图片的所有轮廓按圆度、凸度、凸包缺陷、角点数和Hu矩打分, 返回该形状得分最高的轮廓质心,
+    详见 utils.shape_recognizer。同一张图片只分析一次, 换一个形状提示不会重复计算
+    """
+    from utils.shape_recognizer import locate_shape
 
-    return [top_left, top_right, bottom_right, bottom_left]
+    return locate_shape(img_path, type)
 
 
-def is_trapezoid(vertices):
-    """
-    判断四边形是否为梯形。
-    vertices: 四个顶点按顺序排列的列表。
-    返回值: 如果是梯形返回 True，否则返回 False。
+def resolve_color_name(target_color: str) -> Optional[str]:
     """
-    top_width = abs(vertices[1][0] - vertices[0][0])
-    bottom_width = abs(vertices[2][0] - vertices[3][0])
-    return top_width < bottom_width
+    把验证码提示中的颜色对应到 supported_colors 中的颜色
 
+    不在 supported_colors 中的颜色先去掉"浅""深"等修饰, 再按 color_references 中的参考值
+    匹配HSV范围最接近的颜色
 
-def get_shape_location_by_type(img_path, type: str):
-    """
-    获取指定形状在图片中的坐标
-    """
-    img = cv2.imread(img_path)
-    imgGray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)  # 转灰度图
-    imgBlur = cv2.GaussianBlur(imgGray, (5, 5), 1)  # 高斯模糊
-    imgCanny = cv2.Canny(imgBlur, 60, 60)  # Canny算子边缘检测
-    contours, hierarchy = cv2.findContours(
-        imgCanny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE
-    )  # 寻找轮廓点
-    for obj in contours:
-        perimeter = cv2.arcLength(obj, True)  # 计算轮廓周长
-        approx = cv2.approxPolyDP(obj, 0.02 * perimeter, True)  # 获取轮廓角点坐标
-        CornerNum = len(approx)  # 轮廓角点的数量
-        x, y, w, h = cv2.boundingRect(approx)  # 获取坐标值和宽度、高度
-
-        # 轮廓对象分类
-        if CornerNum == 3:
-            obj_type = "三角形"
-        elif CornerNum == 4:
-            if w == h:
-                obj_type = "正方形"
-            else:
-                approx = sort_rectangle_vertices([vertex[0] for vertex in approx])
-                if is_trapezoid(approx):
-                    obj_type = "梯形"
-                else:
-                    obj_type = "长方形"
-        elif CornerNum == 6:
-            obj_type = "六边形"
-        elif CornerNum == 8:
-            obj_type = "圆形"
-        elif CornerNum == 20:
-            obj_type = "五角星"
-        else:
-            obj_type = "未知"
+    Args:
+        target_color: 提示中的颜色, 例如 "蓝色"、"浅蓝色"、"青色"
+
+    Returns:
+        Optional[str]: supported_colors 中的颜色, 无法对应时返回None
+    """
+    if target_color in supported_colors:
+        return target_color
+    for prefix in ("浅", "深", "淡", "亮", "暗"):
+        if target_color.startswith(prefix) and target_color[1:] in supported_colors:
+            return target_color[1:]
+    reference = color_references.get(target_color)
+    if reference is None:
+        return None
 
-        if obj_type == type:
-            # 获取中心点
-            center_x, center_y = x + w // 2, y + h // 2
-            return center_x, center_y
+    def distance(lower, upper):
+        # 色相是环形的, 0和180相邻
+        if lower[0] <= reference[0] <= upper[0]:
+            dh = 0
+        else:
+            dh = min(
+                (lower[0] - reference[0]) % 180, (reference[0] - upper[0]) % 180
+            )
+        ds = max(lower[1] - reference[1], 0, reference[1] - upper[1])
+        dv = max(lower[2] - reference[2], 0, reference[2] - upper[2])
+        return (dh / 90) ** 2 + (ds / 255) ** 2 + (dv / 255) ** 2
 
-    # 如果获取不到,则返回空
-    return None, None
+    return min(supported_colors, key=lambda name: distance(*supported_colors[name]))
 
 
 def get_shape_location_by_color(img_path, target_color):
     """
     根据颜色获取指定形状在图片中的坐标
-    """
-
-    # 读取图像
-    image = cv2.imread(img_path)
-    # 读取图像并转换为 HSV 色彩空间。
-    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
 
-    # 获取目标颜色的范围
-    lower, upper = supported_colors[target_color]
-    lower = np.array(lower, dtype="uint8")
-    upper = np.array(upper, dtype="uint8")
-
-    # 创建掩码并找到轮廓
-    mask = cv2.inRange(hsv_image, lower, upper)
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    # 遍历轮廓并在中心点画点
-    for contour in contours:
-        # 过滤掉太小的区域
-        if cv2.contourArea(contour) > 100:
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                cX = int(M["m10"] / M["m00"])
-                cY = int(M["m01"] / M["m00"])
-                return cX, cY
+    通过预先生成的HSV查找表一次标注所有像素的颜色, 返回该颜色面积最大的连通域的质心,
+    详见 utils.color_segmenter。同一张图片只分析一次, 不在 supported_colors 中的颜色
+    按 resolve_color_name 匹配最接近的颜色
+    """
+    from utils.color_segmenter import locate_color
 
-    return None, None
+    color = resolve_color_name(target_color)
+    if color is None:
+        return None, None
+    return locate_color(img_path, color)
 
 
 def rgba2rgb(img_name, rgba_img_path, tmp_dir: str = "./tmp"):
     """
     rgba图片转rgb
     """
+    from PIL import Image
+
     tmp_dir = get_tmp_dir(tmp_dir=tmp_dir)
 
     # 打开一个带透明度的RGBA图像
@@ -342,9 +309,19 @@ async def send_call_method(obj, method_name, *args, **kwargs):
         return await method(*args, **kwargs)
 
 
-async def send_msg(send_api, send_type: int, msg: str):
+async def send_msg(send_api, send_type: int, msg: str, duration: float = None):
     """
-    读取配置文件，调用send_call_method发消息
+    读取配置文件，把消息同时发往所有通知地址
+
+    send_api为已启动的NotificationDispatcher时, 消息放进后台队列后立即返回,
+    开启了汇总模式时只缓存消息, 由汇总统一发送;
+    为SendApi时, 等待所有地址发送完成
+
+    Args:
+        send_api: NotificationDispatcher或SendApi实例
+        send_type: 消息类型, 见SendType
+        msg: 消息内容
+        duration: 账号的更新耗时秒数, 用于汇总消息
     """
     from config import is_send_msg
 
@@ -352,14 +329,24 @@ async def send_msg(send_api, send_type: int, msg: str):
         return
 
     from config import send_info, is_send_success_msg, is_send_fail_msg
+    from api.send import NotificationDispatcher
 
     if (send_type == SendType.success.value and is_send_success_msg) or (
         send_type == SendType.fail.value and is_send_fail_msg
     ):
-        for key in send_info:
-            for url in send_info[key]:
-                rep = await send_call_method(send_api, key, url, msg)
-                logger.info(f"发送消息到 {url}, 响应:{rep}")
+        targets = {key: urls for key, urls in send_info.items() if urls}
+        if not targets:
+            return
+        if isinstance(send_api, NotificationDispatcher):
+            if send_api.digest:
+                ok = send_type == SendType.success.value
+                send_api.digest.add(ok, msg, targets, duration)
+                return
+            if send_api.submit(msg, targets):
+                return
+            await send_api.dispatch(msg, targets)
+        else:
+            await NotificationDispatcher(send_api).dispatch(msg, targets)
 
     return
 
@@ -380,6 +367,8 @@ def expand_coordinates(x1, y1, x2, y2, N):
 
 
 def cv2_save_img(img_name, img, tmp_dir: str = "./tmp"):
+    import cv2
+
     tmp_dir = get_tmp_dir(tmp_dir)
     img_path = os.path.join(tmp_dir, f"{img_name}.png")
     cv2.imwrite(img_path, img)
@@ -396,11 +385,11 @@ async def send_request(
     """
     发请求的通用方法
     """
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(json_serialize=json_codec.dumps) as session:
         async with session.request(
             method, url=url, json=data, headers=headers, **kwargs
         ) as response:
-            return await response.json()
+            return await response.json(loads=json_codec.loads)
 
 
 def validate_proxy_config(proxy):
@@ -464,6 +453,21 @@ def extract_pt_pin(value: str) -> Union[str, None]:
     return None
 
 
+def hash_pt_pin(pt_pin: str) -> str:
+    """
+    计算pt_pin的脱敏标识, 用于日志和日志检索, 同一个pt_pin的标识固定不变
+
+    Args:
+        pt_pin: 京东pt_pin
+
+    Returns:
+        str: 12位十六进制标识
+    """
+    import hashlib
+
+    return hashlib.sha256(pt_pin.encode("utf-8")).hexdigest()[:12]
+
+
 def filter_cks(
     env_data: List[Dict[str, Any]], *, status: int = None, id: int = None, **kwargs
 ) -> List[Dict[str, Any]]:
@@ -541,6 +545,9 @@ def crop_center_contour(image_path, output_path, min_area=100, padding=10):
         min_area: 最小轮廓面积阈值，过滤掉噪点
         padding: 裁剪时添加的边距
     """
+    import cv2
+    import numpy as np
+
     # 读取图片
     img = cv2.imread(image_path)
     if img is None:
@@ -1,12 +1,10 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from typing import List
+from typing import Any, Dict, Optional
 import asyncio
-import logging
 from datetime import datetime
-import uuid
 
 from web.models import (
     AppConfig,
@@ -15,13 +13,31 @@ from web.models import (
     GlobalConfig,
     NotificationConfig,
     ProxyConfig,
-    TaskStatus,
     AccountTestResult,
     QinglongTestResult,
 )
+from config.accounts import get_account_repository
 from config.settings import get_config_manager
+from core.progress import get_progress_reporter
+from utils import json_codec
+from web.logstream import get_log_broadcaster
+from web.tasks import TaskBusyError, get_task_runner
 
-app = FastAPI(title="AutoUpdateJdCookie Web管理", version="2.0.0")
+
+class CodecJSONResponse(JSONResponse):
+    """
+    使用json_codec序列化的JSON响应
+    """
+
+    def render(self, content) -> bytes:
+        return json_codec.dumpb(content)
+
+
+app = FastAPI(
+    title="AutoUpdateJdCookie Web管理",
+    version="2.0.0",
+    default_response_class=CodecJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,39 +47,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-active_websockets: List[WebSocket] = []
-task_status: dict = {}
-
-log_queue = asyncio.Queue()
-
-
-class LogHandler(logging.Handler):
-    def emit(self, record):
-        log_entry = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "level": record.levelname,
-            "message": self.format(record),
-        }
-        asyncio.create_task(log_queue.put(log_entry))
-
-
-async def broadcast_logs():
-    while True:
-        log_entry = await log_queue.get()
-        if active_websockets:
-            disconnected = []
-            for websocket in active_websockets:
-                try:
-                    await websocket.send_json(log_entry)
-                except:
-                    disconnected.append(websocket)
-            for ws in disconnected:
-                active_websockets.remove(ws)
-
-
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(broadcast_logs())
+    get_log_broadcaster().install()
+    # 手动修改配置文件后自动重新加载, Web中启动的刷新任务使用最新的配置
+    get_config_manager().start_watching()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    get_log_broadcaster().uninstall()
+    get_config_manager().stop_watching()
 
 
 @app.get("/")
@@ -94,20 +88,76 @@ async def update_config(config: AppConfig):
 
 
 @app.get("/api/accounts")
-async def get_accounts():
+async def get_accounts(
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    keyword: Optional[str] = None,
+):
+    """
+    获取账号, 传入limit或keyword时分页返回 {"items", "total", "offset", "limit"},
+    都不传时返回全部账号(用户名到账号配置的字典), 兼容原来的接口
+    """
     try:
-        config_manager = get_config_manager()
-        config = config_manager.get_config()
-        return config.user_datas
+        repository = get_account_repository()
+        if limit is None and not keyword:
+            return await asyncio.to_thread(repository.export_accounts)
+        if limit is None:
+            limit = get_config_manager().get_config().account_store_config.page_size
+        items, total = await asyncio.to_thread(repository.list, offset, limit, keyword)
+        return {
+            "items": [account for _, account in items],
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/accounts/export")
+async def export_accounts():
+    """
+    导出全部账号, 格式与config.json中的user_datas相同
+    """
+    try:
+        repository = get_account_repository()
+        return {"user_datas": await asyncio.to_thread(repository.export_accounts)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/accounts/import")
+async def import_accounts(data: Dict[str, Any], replace: bool = False):
+    """
+    导入账号, 请求体为config.json或其中的user_datas
+    """
+    accounts = data.get("user_datas", data)
+    try:
+        count = await asyncio.to_thread(
+            get_account_repository().import_accounts, accounts, replace
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "message": f"已导入{count}个账号", "count": count}
+
+
+@app.get("/api/accounts/{username}")
+async def get_account(username: str):
+    try:
+        account = await asyncio.to_thread(get_account_repository().get, username)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if account is None:
+        raise HTTPException(status_code=404, detail="账号不存在")
+    return account
 
 
 @app.post("/api/accounts")
 async def add_account(username: str, account: AccountConfig):
     try:
-        config_manager = get_config_manager()
-        config_manager.add_account(username, account)
+        await asyncio.to_thread(get_account_repository().save, username, account)
         return {"success": True, "message": "账号已添加"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -116,18 +166,32 @@ async def add_account(username: str, account: AccountConfig):
 @app.put("/api/accounts/{username}")
 async def update_account(username: str, account: AccountConfig):
     try:
-        config_manager = get_config_manager()
-        config_manager.update_account(username, account)
+        await asyncio.to_thread(get_account_repository().save, username, account)
         return {"success": True, "message": "账号已更新"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.patch("/api/accounts/{username}")
+async def patch_account(username: str, fields: Dict[str, Any]):
+    """
+    部分更新账号, 请求体只需包含要修改的字段
+    """
+    try:
+        account = await asyncio.to_thread(get_account_repository().update, username, fields)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="账号不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "message": "账号已更新", "account": account}
+
+
 @app.delete("/api/accounts/{username}")
 async def delete_account(username: str):
     try:
-        config_manager = get_config_manager()
-        config_manager.remove_account(username)
+        await asyncio.to_thread(get_account_repository().delete, username)
         return {"success": True, "message": "账号已删除"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -253,15 +317,10 @@ async def update_proxy_config(config: ProxyConfig):
 @app.post("/api/task/start")
 async def start_task():
     try:
-        task_id = str(uuid.uuid4())
-        task_status[task_id] = TaskStatus(
-            task_id=task_id,
-            status="running",
-            message="任务已启动",
-            start_time=datetime.now().isoformat(),
-            logs=[],
-        )
-        return {"success": True, "task_id": task_id}
+        status = get_task_runner().start()
+        return {"success": True, "task_id": status.task_id}
+    except TaskBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -269,31 +328,99 @@ async def start_task():
 @app.post("/api/task/stop")
 async def stop_task(task_id: str):
     try:
-        if task_id in task_status:
-            task_status[task_id].status = "pending"
-            task_status[task_id].message = "任务已停止"
-            task_status[task_id].end_time = datetime.now().isoformat()
-            return {"success": True, "message": "任务已停止"}
-        else:
-            raise HTTPException(status_code=404, detail="任务不存在")
+        stopped = await get_task_runner().stop(task_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="任务不存在")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if stopped:
+        return {"success": True, "message": "任务已停止"}
+    return {"success": False, "message": "任务已结束"}
 
 
 @app.get("/api/task/status/{task_id}")
 async def get_task_status(task_id: str):
-    if task_id in task_status:
-        return task_status[task_id]
-    else:
+    try:
+        return get_task_runner().get(task_id)
+    except KeyError:
         raise HTTPException(status_code=404, detail="任务不存在")
 
 
-@app.get("/ws/logs")
+@app.get("/api/logs/search")
+async def search_logs(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    level: Optional[str] = None,
+    pt_pin: Optional[str] = None,
+    pt_pin_hash: Optional[str] = None,
+    run_id: Optional[str] = None,
+    keyword: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """
+    检索app.log及轮换后的日志, 按时间从新到旧分页返回
+    pt_pin传原始pt_pin, 服务端计算标识后检索; 也可以直接传日志中的pt_pin_hash
+    运行ID即Web任务的task_id, 命令行运行时为日志中的运行ID
+    """
+    from core.logindex import get_log_index
+    from utils.tools import hash_pt_pin
+
+    log_index = get_log_index()
+    if log_index is None:
+        raise HTTPException(status_code=404, detail="未启用日志索引")
+    try:
+        return await asyncio.to_thread(
+            log_index.search,
+            start=start,
+            end=end,
+            level=level,
+            pt_pin=hash_pt_pin(pt_pin) if pt_pin else pt_pin_hash,
+            run_id=run_id,
+            keyword=keyword,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus格式的运行指标
+    """
+    from core.metrics import CONTENT_TYPE, get_metrics_registry
+
+    return Response(content=get_metrics_registry().render(), media_type=CONTENT_TYPE)
+
+
+@app.websocket("/ws/logs")
 async def websocket_logs(websocket: WebSocket):
+    """
+    推送日志, 连接后先回放最近backfill条日志
+    """
+    await websocket.accept()
+    try:
+        backfill = int(websocket.query_params.get("backfill", 100))
+    except ValueError:
+        backfill = 100
+    await get_log_broadcaster().serve(websocket, backfill=backfill)
+
+
+@app.websocket("/ws/progress")
+async def websocket_progress(websocket: WebSocket):
+    """
+    推送刷新进度, 连接后先发送当前快照, 之后逐条推送每个账号的进度事件
+    """
     await websocket.accept()
-    active_websockets.append(websocket)
+    progress = get_progress_reporter()
+    queue = progress.subscribe()
     try:
+        await websocket.send_json({"type": "snapshot", **progress.snapshot()})
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        active_websockets.remove(websocket)
+            await websocket.send_json(await queue.get())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        progress.unsubscribe(queue)
@@ -0,0 +1,186 @@
+"""
+京东Cookie自动获取项目 - Web日志推送模块
+
+本模块把loguru日志推送给Web的websocket客户端：
+1. 作为loguru的sink接收日志, 可以在任意线程调用, 不创建任务、不阻塞写日志的一方
+2. 最近的日志保存在固定长度的环形缓冲区中, 客户端连接时先回放最近N行
+3. 每个客户端有自己的有界发送队列, 队列满时丢弃最旧的日志, 各客户端独立并发发送,
+   慢客户端只影响自己
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+
+
+class LogClient:
+    """
+    websocket客户端的发送队列
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def put(self, entry: dict):
+        """
+        放入一条日志, 队列满时丢弃最旧的一条
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(entry)
+
+
+class LogBroadcaster:
+    """
+    日志推送类
+    """
+
+    def __init__(self, buffer_size: int = 1000, client_queue_size: int = 500):
+        """
+        初始化日志推送
+
+        Args:
+            buffer_size: 环形缓冲区保存的日志条数
+            client_queue_size: 每个客户端发送队列的长度
+        """
+        self.buffer: Deque[dict] = deque(maxlen=buffer_size)
+        self.client_queue_size = client_queue_size
+        self.clients: List[LogClient] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handler_id: Optional[int] = None
+
+    @staticmethod
+    def format_entry(record: dict) -> dict:
+        """
+        把loguru的record转换为推送给前端的日志
+        """
+        return {
+            "timestamp": record["time"].strftime("%Y-%m-%d %H:%M:%S"),
+            "level": record["level"].name,
+            "message": record["message"],
+            "name": record["name"],
+        }
+
+    def sink(self, message):
+        """
+        loguru sink, 可能在任意线程被调用
+        """
+        entry = self.format_entry(message.record)
+        self.buffer.append(entry)
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self.clients:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(entry)
+        else:
+            loop.call_soon_threadsafe(self._fanout, entry)
+
+    def _fanout(self, entry: dict):
+        for client in self.clients:
+            client.put(entry)
+
+    def install(self, level: str = "INFO"):
+        """
+        在当前事件循环中注册loguru sink, 重复调用只注册一次
+
+        Args:
+            level: 推送的最低日志级别
+        """
+        self._loop = asyncio.get_running_loop()
+        if self._handler_id is None:
+            self._handler_id = logger.add(self.sink, level=level, format="{message}")
+
+    def uninstall(self):
+        """
+        移除loguru sink
+        """
+        if self._handler_id is not None:
+            logger.remove(self._handler_id)
+            self._handler_id = None
+        self._loop = None
+
+    def recent(self, limit: Optional[int] = None) -> List[dict]:
+        """
+        获取缓冲区中最近的日志
+
+        Args:
+            limit: 条数, 为空时返回全部
+        """
+        entries = list(self.buffer)
+        return entries if limit is None else entries[-limit:] if limit > 0 else []
+
+    async def _send_loop(self, client: LogClient):
+        while True:
+            entry = await client.queue.get()
+            await client.websocket.send_json(entry)
+
+    @staticmethod
+    async def _receive_loop(websocket: WebSocket):
+        while True:
+            await websocket.receive_text()
+
+    async def serve(self, websocket: WebSocket, backfill: int = 100):
+        """
+        服务一个已accept的websocket连接, 直到客户端断开
+
+        Args:
+            websocket: websocket连接
+            backfill: 连接后先回放的最近日志条数
+        """
+        client = LogClient(websocket, self.client_queue_size)
+        for entry in self.recent(backfill):
+            client.put(entry)
+        self.clients.append(client)
+        tasks = [
+            asyncio.create_task(self._send_loop(client)),
+            asyncio.create_task(self._receive_loop(websocket)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.clients.remove(client)
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                try:
+                    await task
+                except (asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+                    pass
+                except Exception as e:
+                    logger.debug(f"日志推送连接异常: {e!r}")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        推送统计: 缓冲区条数、客户端数、各客户端丢弃的总条数
+        """
+        return {
+            "buffered": len(self.buffer),
+            "clients": len(self.clients),
+            "dropped": sum(client.dropped for client in self.clients),
+        }
+
+
+_log_broadcaster: Optional[LogBroadcaster] = None
+
+
+def get_log_broadcaster() -> LogBroadcaster:
+    """
+    获取日志推送单例
+
+    Returns:
+        LogBroadcaster: 日志推送实例
+    """
+    global _log_broadcaster
+    if _log_broadcaster is None:
+        _log_broadcaster = LogBroadcaster()
+    return _log_broadcaster
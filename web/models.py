@@ -37,6 +37,9 @@ class AccountConfig(BaseModel):
     voice_func: Optional[Literal["no", "manual_input"]] = Field(
         default=None, description="语音验证码处理方式"
     )
+    wskey: Optional[str] = Field(
+        default=None, description="长期登录凭据, 供HTTP兑换接口换取pt_key"
+    )
 
     @field_validator("username")
     @classmethod
@@ -84,6 +87,14 @@ class QinglongConfig(BaseModel):
     token: Optional[str] = Field(default="", description="token")
     username: Optional[str] = Field(default="", description="青龙用户名")
     password: Optional[str] = Field(default="", description="青龙密码")
+    timeout: float = Field(default=30, gt=0, description="青龙接口请求超时秒数")
+    max_retries: int = Field(
+        default=3, ge=0, description="青龙接口连接异常或5xx时的最大重试次数"
+    )
+    retry_delay: float = Field(
+        default=0.5, ge=0, description="青龙接口重试的基础等待秒数, 每次重试翻倍"
+    )
+    pool_size: int = Field(default=10, gt=0, description="青龙接口连接池大小")
 
     @field_validator("url")
     @classmethod
@@ -102,7 +113,35 @@ class GlobalConfig(BaseModel):
     headless: bool = Field(default=True, description="是否启用无头模式")
     cron_expression: str = Field(default="15 0 * * *", description="定时任务Cron表达式")
     user_agent: Optional[str] = Field(default=None, description="User-Agent")
+    jd_login_url: Optional[str] = Field(
+        default=None, description="京东登录页地址, 为空时使用官方登录页"
+    )
     enable_desensitize: bool = Field(default=False, description="是否启用日志脱敏")
+    record_captcha: bool = Field(default=False, description="是否记录验证码样本")
+    captcha_dataset_dir: str = Field(
+        default="captcha_dataset", description="验证码样本数据集目录"
+    )
+    schedule_mode: Literal["inprocess", "subprocess"] = Field(
+        default="inprocess", description="定时任务运行方式, subprocess时每次在子进程中运行"
+    )
+    idle_release_seconds: int = Field(
+        default=60, ge=0, description="定时任务空闲多少秒后释放模型等资源, 0表示不释放"
+    )
+    workers: int = Field(
+        default=1, ge=1, description="刷新工作进程数量, 大于1时启用多进程模式"
+    )
+    enable_log_index: bool = Field(
+        default=False, description="是否为app.log建立检索索引, 供Web日志检索使用"
+    )
+    log_index_path: str = Field(
+        default="tmp/log_index.db", description="日志检索索引文件路径"
+    )
+    enable_json_log: bool = Field(
+        default=False, description="是否同时输出JSON Lines格式的日志(logs/app.jsonl)"
+    )
+    metrics_port: int = Field(
+        default=0, ge=0, le=65535, description="定时任务的Prometheus指标端口, 0表示不开启"
+    )
 
     @field_validator("cron_expression")
     @classmethod
@@ -133,6 +172,18 @@ class NotificationConfig(BaseModel):
     send_serverchan: List[str] = Field(
         default_factory=list, description="Server酱通知地址"
     )
+    send_timeout: float = Field(default=10, gt=0, description="单个通知地址的超时秒数")
+    send_retries: int = Field(default=2, ge=0, description="通知发送失败后的重试次数")
+    send_retry_delay: float = Field(
+        default=1, ge=0, description="通知重试的基础等待秒数, 每次重试翻倍"
+    )
+    send_queue_size: int = Field(default=100, gt=0, description="后台通知队列长度")
+    digest_mode: bool = Field(
+        default=False, description="是否把每个账号的结果合并成一条汇总消息发送"
+    )
+    digest_interval: float = Field(
+        default=0, ge=0, description="汇总消息的发送间隔秒数, 0表示运行结束时发送"
+    )
 
 
 class ProxyConfig(BaseModel):
@@ -160,6 +211,62 @@ class ProxyConfig(BaseModel):
         return v
 
 
+class ProxyPoolConfig(BaseModel):
+    """
+    代理池配置模型
+    用于并行登录时分配多个出口IP
+    """
+
+    enable: bool = Field(default=False, description="是否启用代理池")
+    proxies: List[ProxyConfig] = Field(default_factory=list, description="代理列表")
+    probe_url: str = Field(
+        default="https://plogin.m.jd.com/login/login", description="健康探测地址"
+    )
+    probe_interval: float = Field(default=300, gt=0, description="健康探测间隔秒数")
+    probe_timeout: float = Field(default=10, gt=0, description="健康探测超时秒数")
+    window: int = Field(default=20, ge=1, description="参与评分的最近登录次数")
+    min_score: float = Field(
+        default=0.2, ge=0, le=1, description="账号绑定的代理评分低于该值时重新分配"
+    )
+    state_path: str = Field(
+        default="tmp/proxy_pool.json", description="代理评分和账号绑定的状态文件路径"
+    )
+
+
+class BackoffConfig(BaseModel):
+    """
+    账号失败退避配置模型
+    用于定义账号登录失败后的指数退避与熔断策略
+    """
+
+    enable: bool = Field(default=True, description="是否启用账号失败退避与熔断")
+    state_path: str = Field(
+        default="tmp/account_backoff.json", description="熔断状态文件路径"
+    )
+    base_delays: Dict[str, int] = Field(
+        default_factory=lambda: {
+            "risk": 24 * 3600,
+            "wrong_password": 12 * 3600,
+            "captcha": 1800,
+            "config": 3600,
+            "unknown": 600,
+        },
+        description="各失败类型的基础退避秒数",
+    )
+    thresholds: Dict[str, int] = Field(
+        default_factory=lambda: {
+            "risk": 1,
+            "wrong_password": 1,
+            "captcha": 2,
+            "config": 1,
+            "unknown": 3,
+        },
+        description="各失败类型连续失败多少次后熔断",
+    )
+    max_delay: int = Field(default=7 * 24 * 3600, description="最大退避秒数")
+    jitter: float = Field(default=0.2, ge=0, lt=1, description="退避时间抖动比例")
+
+
 class TaskStatus(BaseModel):
     """
     任务状态模型
@@ -167,11 +274,12 @@ class TaskStatus(BaseModel):
     """
 
     task_id: str
-    status: Literal["pending", "running", "success", "failed"]
+    status: Literal["pending", "running", "success", "failed", "cancelled"]
     message: str
     start_time: Optional[str] = None
     end_time: Optional[str] = None
     logs: List[str] = Field(default_factory=list)
+    progress: Dict[str, Any] = Field(default_factory=dict, description="刷新进度快照")
 
 
 class AccountTestResult(BaseModel):
@@ -197,6 +305,51 @@ class QinglongTestResult(BaseModel):
     env_count: Optional[int] = None
 
 
+class RefresherConfig(BaseModel):
+    """
+    pt_key刷新链配置模型
+    用于配置浏览器登录之前的HTTP兑换阶段
+    """
+
+    enable_http: bool = Field(default=False, description="是否在浏览器登录前先尝试HTTP兑换")
+    exchange_url: str = Field(default="", description="本地HTTP兑换接口地址")
+    timeout: float = Field(default=10, gt=0, description="兑换接口超时秒数")
+    verify: bool = Field(default=True, description="是否检测兑换得到的pt_key有效")
+
+
+class JobQueueConfig(BaseModel):
+    """
+    分布式任务队列配置模型
+    用于多台机器共同刷新同一批账号
+    """
+
+    enable: bool = Field(default=False, description="是否把刷新任务放到任务队列中")
+    backend: Literal["sqlite", "redis"] = Field(default="sqlite", description="队列后端")
+    sqlite_path: str = Field(default="jobs.db", description="SQLite队列文件路径")
+    redis_url: str = Field(
+        default="redis://127.0.0.1:6379/0", description="Redis协议队列地址"
+    )
+    prefix: str = Field(default="jd_cookie", description="队列名前缀")
+    lease_seconds: float = Field(default=300, gt=0, description="任务租约秒数, 过期未续约的任务会被重新分配")
+    heartbeat_interval: float = Field(default=60, gt=0, description="执行中任务的续约间隔秒数")
+    max_attempts: int = Field(default=3, ge=1, description="任务最多被领取的次数")
+    result_timeout: float = Field(default=3600, gt=0, description="协调进程等待全部结果的秒数")
+    poll_interval: float = Field(default=1, gt=0, description="轮询队列的间隔秒数")
+
+
+class AccountStoreConfig(BaseModel):
+    """
+    账号存储配置模型
+    账号较多时可以把账号从config.json移到SQLite中
+    """
+
+    backend: Literal["json", "sqlite"] = Field(
+        default="json", description="账号存储后端, json为config.json中的user_datas"
+    )
+    sqlite_path: str = Field(default="accounts.db", description="SQLite账号库文件路径")
+    page_size: int = Field(default=50, ge=1, le=1000, description="Web账号列表每页条数")
+
+
 class AppConfig(BaseModel):
     """
     应用配置模型
@@ -207,6 +360,9 @@ class AppConfig(BaseModel):
         default_factory=dict, description="用户账号配置"
     )
     qinglong_data: QinglongConfig = Field(..., description="青龙面板配置")
+    qinglong_panels: List[QinglongConfig] = Field(
+        default_factory=list, description="额外的青龙面板配置, 与qinglong_data一起更新"
+    )
     global_config: GlobalConfig = Field(
         default_factory=GlobalConfig, description="全局配置"
     )
@@ -214,3 +370,18 @@ class AppConfig(BaseModel):
         default_factory=NotificationConfig, description="通知配置"
     )
     proxy_config: Optional[ProxyConfig] = Field(default=None, description="代理配置")
+    proxy_pool_config: ProxyPoolConfig = Field(
+        default_factory=ProxyPoolConfig, description="代理池配置"
+    )
+    backoff_config: BackoffConfig = Field(
+        default_factory=BackoffConfig, description="账号失败退避配置"
+    )
+    refresher_config: RefresherConfig = Field(
+        default_factory=RefresherConfig, description="pt_key刷新链配置"
+    )
+    job_queue_config: JobQueueConfig = Field(
+        default_factory=JobQueueConfig, description="分布式任务队列配置"
+    )
+    account_store_config: AccountStoreConfig = Field(
+        default_factory=AccountStoreConfig, description="账号存储配置"
+    )
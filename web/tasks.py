@@ -0,0 +1,144 @@
+"""
+京东Cookie自动获取项目 - Web任务执行模块
+
+本模块在Web进程的事件循环中以后台任务运行刷新流程(main.main)：
+1. 同一时间只允许一个刷新任务运行
+2. 停止任务时取消后台任务, 正在进行的浏览器登录随之中断并关闭浏览器
+3. 任务状态中带有每个账号的进度快照
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from loguru import logger
+
+from core.progress import get_progress_reporter
+from web.models import TaskStatus
+
+
+class TaskBusyError(RuntimeError):
+    """
+    已有刷新任务在运行
+    """
+
+
+class TaskRunner:
+    """
+    刷新任务执行器类
+    """
+
+    def __init__(self, stop_timeout: float = 30):
+        """
+        初始化任务执行器
+
+        Args:
+            stop_timeout: 停止任务时等待清理完成的秒数
+        """
+        self.stop_timeout = stop_timeout
+        self.tasks: Dict[str, TaskStatus] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._task_id: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, mode: Optional[str] = "cron") -> TaskStatus:
+        """
+        启动刷新任务
+
+        Args:
+            mode: 运行模式, 默认cron, 避免在Web进程中等待终端输入验证码
+
+        Returns:
+            TaskStatus: 任务状态
+
+        Raises:
+            TaskBusyError: 已有任务在运行
+        """
+        if self.running:
+            raise TaskBusyError(f"任务{self._task_id}正在运行")
+        task_id = str(uuid.uuid4())
+        self.tasks[task_id] = TaskStatus(
+            task_id=task_id,
+            status="running",
+            message="任务已启动",
+            start_time=datetime.now().isoformat(),
+            logs=[],
+        )
+        get_progress_reporter().reset(task_id)
+        self._task_id = task_id
+        self._task = asyncio.create_task(self._run(task_id, mode))
+        return self.tasks[task_id]
+
+    async def _run(self, task_id: str, mode: Optional[str]):
+        from main import main
+
+        status = self.tasks[task_id]
+        try:
+            await main(mode=mode, run_id=task_id)
+            status.status = "success"
+            status.message = "任务已完成"
+        except asyncio.CancelledError:
+            status.status = "cancelled"
+            status.message = "任务已停止"
+        except Exception as e:
+            logger.error(f"刷新任务{task_id}异常: {e}")
+            status.status = "failed"
+            status.message = str(e)
+        finally:
+            status.end_time = datetime.now().isoformat()
+            status.progress = get_progress_reporter().snapshot()
+
+    async def stop(self, task_id: str) -> bool:
+        """
+        停止刷新任务, 等待浏览器等资源清理完成
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            bool: 任务正在运行并已停止返回True, 任务已结束返回False
+
+        Raises:
+            KeyError: 任务不存在
+        """
+        if task_id not in self.tasks:
+            raise KeyError(task_id)
+        if task_id != self._task_id or not self.running:
+            return False
+        self._task.cancel()
+        done, _ = await asyncio.wait([self._task], timeout=self.stop_timeout)
+        if not done:
+            logger.warning(f"刷新任务{task_id}在{self.stop_timeout}秒内未完成清理")
+        return True
+
+    def get(self, task_id: str) -> TaskStatus:
+        """
+        获取任务状态, 运行中的任务附带最新进度
+
+        Raises:
+            KeyError: 任务不存在
+        """
+        status = self.tasks[task_id]
+        if task_id == self._task_id and self.running:
+            status.progress = get_progress_reporter().snapshot()
+        return status
+
+
+_task_runner: Optional[TaskRunner] = None
+
+
+def get_task_runner() -> TaskRunner:
+    """
+    获取任务执行器单例
+
+    Returns:
+        TaskRunner: 任务执行器实例
+    """
+    global _task_runner
+    if _task_runner is None:
+        _task_runner = TaskRunner()
+    return _task_runner